@@ -2,9 +2,13 @@
 非同期ワーカー - 重い処理を並列実行するためのワーカー
 """
 import asyncio
+import heapq
+import itertools
+import os
 import threading
 import concurrent.futures
-from typing import Callable, Any, Dict
+from contextlib import contextmanager
+from typing import Callable, Any, Dict, List, Tuple
 from pathlib import Path
 import logging
 from datetime import datetime
@@ -79,5 +83,56 @@ class AsyncWorker:
         """リソースのクリーンアップ"""
         self.executor.shutdown(wait=True)
 
+class PriorityGate:
+    """同時実行数を制限し、待っている処理を優先度（数値が小さいほど優先）の順に通すゲート
+
+    優先度 0 の処理には reserved 個の予備枠があり、他の処理で枠が埋まっていても待たずに実行できる
+    """
+    
+    def __init__(self, max_concurrent: int, reserved: int = 0):
+        """
+        Args:
+            max_concurrent: 同時に実行できる数
+            reserved: 優先度 0 の処理だけが使える予備枠の数
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.reserved = max(0, reserved)
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        
+    def _capacity(self, priority: int) -> int:
+        return self.max_concurrent + (self.reserved if priority <= 0 else 0)
+        
+    @contextmanager
+    def slot(self, priority: int = 1):
+        """枠が空くまで待ってから実行（同じ優先度は到着順）"""
+        entry = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            if self._waiting[0] != entry or self._running >= self._capacity(priority):
+                logger.info(f"実行待ち（優先度 {priority}, 実行中 {self._running}, 待ち {len(self._waiting)}）")
+            self._condition.wait_for(
+                lambda: self._waiting[0] == entry and self._running < self._capacity(priority)
+            )
+            heapq.heappop(self._waiting)
+            self._running += 1
+            # 次に待っている処理も枠があれば通れるようにする
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+                
+    def snapshot(self) -> Dict[str, int]:
+        with self._condition:
+            return {"running": self._running, "waiting": len(self._waiting), "max_concurrent": self.max_concurrent}
+
 # グローバルワーカーインスタンス
-async_worker = AsyncWorker(max_workers=6)  # 6つの並列ワーカー
\ No newline at end of file
+async_worker = AsyncWorker(max_workers=6)  # 6つの並列ワーカー
+
+# 動画レンダリングの同時実行数（プレビューは予備枠を使い、本番のレンダリングより先に実行する）
+render_gate = PriorityGate(max_concurrent=int(os.getenv("VIDEO_MAX_CONCURRENT_RENDERS", "2")), reserved=1)
\ No newline at end of file
@@ -1,12 +1,15 @@
 import sys
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import concurrent.futures
+import io
 import json
-import requests
+import multiprocessing
 import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
 from scipy.io import wavfile
-from scipy import signal
-import librosa
 import soundfile as sf
 import noisereduce as nr
 
@@ -14,14 +17,47 @@ import noisereduce as nr
 sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
 
 from voicevox_generator import VoicevoxGenerator
+from voicevox_client import get_client, get_voicevox_url
+from api.core.tts_cache import AudioQueryCache, TTSCache
+from api.core.audio_manifest import AudioManifest, measure_audio_file
+from api.core.beep_detector import BeepDetector, is_beep_detection_enabled
+from api.core.duration_fitter import DurationFitter
+from api.core.duration_predictor import (
+    LINE_GAP,
+    predict_query_duration,
+    predict_slide_duration,
+    predict_total_duration,
+)
+from api.core.filter_bank import get_filter_bank
+from api.core.line_chunker import concatenate_wav_chunks, get_chunk_max_chars, get_chunk_pause, split_text
+from api.core.spectral_gate import (
+    DENOISE_MODE_FAST,
+    DENOISE_MODE_NOISEREDUCE,
+    FastSpectralGate,
+    NoiseProfileCache,
+    get_denoise_mode,
+)
+from api.core.speaker_warmup import speaker_warmup
+from api.core.synthesis_scheduler import SynthesisScheduler, get_schedule
+
+# 後処理の内容を変えた場合はこの値を更新して古いキャッシュを無効化する
+AUDIO_PROCESSING_VERSION = "1"
+
+# 合成音声のサンプリングレート（24kHzに統一）
+OUTPUT_SAMPLING_RATE = 24000
 
 class ImprovedAudioProcessor:
     """ビーン音除去とクリック音除去の改善されたプロセッサー"""
     
-    def __init__(self, sample_rate=24000):
+    def __init__(self, sample_rate=24000, noise_profile_dir=None):
         self.sample_rate = sample_rate
         # ビーン音の周波数帯域（分析結果に基づく）
         self.beep_freq_range = (800, 3500)
+        # 高速モード用のスペクトルゲートと話者ごとのノイズプロファイル
+        self.fast_gate = FastSpectralGate()
+        self.noise_profiles = NoiseProfileCache(noise_profile_dir)
+        # ゲートが必要な音声かを判定する検出器
+        self.beep_detector = BeepDetector(beep_freq_ranges=((300, 500), self.beep_freq_range))
         
     def remove_click_noise(self, audio_data):
         """VOICEVOXのクリック音を除去（テンポ維持）"""
@@ -33,21 +69,28 @@ class ImprovedAudioProcessor:
         if len(audio_diff) > 0:
             sudden_changes = np.abs(audio_diff) > np.std(audio_diff) * 5
             
-            # 2. 急激な変化部分をスムージング
-            for i in np.where(sudden_changes)[0]:
-                if i > 5 and i < len(audio_data) - 5:
-                    # 前後5サンプルの平均で補間
-                    audio_data[i] = np.mean(audio_data[i-5:i+5])
+            # 2. 急激な変化部分を前後5サンプルの平均で補間（移動平均をマスクで適用）
+            #    平均は補間前の値から計算するため、近接したクリックが互いに影響しない
+            n = len(audio_data)
+            indices = np.flatnonzero(sudden_changes)
+            indices = indices[(indices > 5) & (indices < n - 5)]
+            if len(indices) > 0:
+                cumsum = np.concatenate(([0.0], np.cumsum(audio_data, dtype=np.float64)))
+                window_means = (cumsum[indices + 5] - cumsum[indices - 5]) / 10
+                audio_data[indices] = window_means
         
         return audio_data
     
-    def apply_spectral_gating(self, audio_data, sr=None):
+    def apply_spectral_gating(self, audio_data, sr=None, denoise_mode=None, noise_profile_key=None):
         """スペクトルゲーティングによるビープ音除去（改善版）"""
         if len(audio_data) == 0:
             return audio_data
             
         if sr is None:
             sr = self.sample_rate
+        
+        if get_denoise_mode(denoise_mode) == DENOISE_MODE_FAST:
+            return self.apply_fast_spectral_gating(audio_data, sr, noise_profile_key)
             
         try:
             # 2段階処理で強いビープ音にも対応
@@ -81,33 +124,35 @@ class ImprovedAudioProcessor:
             
         except Exception as e:
             print(f"スペクトルゲーティングエラー: {e}")
-            # エラー時は元データをそのまま返す
-            return audio_data
+            # エラー時は簡易ノッチフィルタで代替
+            return self.apply_beep_notch_filter_fallback(audio_data, sr)
     
-    def apply_beep_notch_filter_fallback(self, audio_data):
-        """フォールバック用の簡易ノッチフィルタ"""
+    def apply_fast_spectral_gating(self, audio_data, sr, noise_profile_key=None):
+        """1回のSTFTで2段階ゲートを適用（ノイズプロファイルは話者ごとにキャッシュ）"""
+        try:
+            noise_profile = None
+            if noise_profile_key:
+                noise_profile = self.noise_profiles.get_or_estimate(
+                    noise_profile_key, self.fast_gate, audio_data, sr
+                )
+            return self.fast_gate.apply(audio_data, sr, noise_profile)
+        except Exception as e:
+            print(f"高速スペクトルゲーティングエラー: {e}")
+            return self.apply_beep_notch_filter_fallback(audio_data, sr)
+    
+    def apply_beep_notch_filter_fallback(self, audio_data, sr=None):
+        """フォールバック用の簡易ノッチフィルタ（300-500Hzのノッチ＋10kHzローパスを1パスで適用）"""
         if len(audio_data) == 0:
             return audio_data
-            
-        # 低周波ビープ音をターゲット（300-500Hz）
-        target_freqs = [300, 350, 400, 450, 500]
         
-        for freq in target_freqs:
-            try:
-                # 低周波用に調整したQ値
-                Q = 20.0  # 低周波では少し広めに
-                w = freq / (self.sample_rate / 2)
-                
-                if w >= 1.0:
-                    continue
-                    
-                b, a = signal.iirnotch(w, Q)
-                audio_data = signal.filtfilt(b, a, audio_data.astype(np.float64))
-            except Exception as e:
-                print(f"ノッチフィルタエラー（{freq}Hz）: {e}")
-                continue
+        if sr is None:
+            sr = self.sample_rate
         
-        return audio_data.astype(np.float32)
+        try:
+            return get_filter_bank(sr).apply_notch_lowpass(audio_data)
+        except Exception as e:
+            print(f"ノッチフィルタエラー: {e}")
+            return np.asarray(audio_data, dtype=np.float32)
     
     def smart_fade(self, audio_data, fade_in_ms=50, fade_out_ms=50):
         """スマートフェード：音声の特性に応じて最適化"""
@@ -133,54 +178,199 @@ class ImprovedAudioProcessor:
             
         return audio_data
     
-    def process_voicevox_audio(self, input_path, output_path=None):
-        """VOICEVOXの音声を後処理（noisereduceのみ使用）"""
+    def process_audio_array(self, audio_data, sr, denoise_mode=None, noise_profile_key=None, detect_beeps=False):
+        """デコード済みの音声（float32・モノラル）を後処理（スペクトルゲートのみ使用）
+
+        detect_beeps が True の場合はビープ音・クリック音を検出した音声のみゲートを掛ける。
+        戻り値は (処理後の音声, 処理内容の記録)
+        """
+        report = {"denoise": "applied"}
+        if detect_beeps:
+            analysis = self.beep_detector.analyze(audio_data, sr)
+            report = {
+                "denoise": "applied" if analysis["needs_denoise"] else "skipped",
+                "beep_score": analysis["beep_score"],
+                "edge_score": analysis["edge_score"],
+            }
+        
+        # スペクトルゲートのみでビープ音除去
+        if report["denoise"] == "applied":
+            audio_data = self.apply_spectral_gating(audio_data, sr, denoise_mode, noise_profile_key)
+        
+        # 音量正規化（クリッピング防止）
+        max_val = np.max(np.abs(audio_data))
+        if max_val > 0:
+            audio_data = audio_data * 0.95 / max_val
+        
+        return audio_data, report
+    
+    def process_voicevox_bytes(
+        self,
+        wav_bytes,
+        output_path,
+        denoise_mode=None,
+        noise_profile_key=None,
+        detect_beeps=False
+    ):
+        """VOICEVOXの合成結果（WAVのバイト列）をメモリ上で後処理し、一度だけ書き込む
+
+        戻り値は処理内容の記録（ゲートを掛けたか、検出スコア）
+        """
+        output_path = Path(output_path)
+        report = {"denoise": "none"}
+        # 書き込み中のファイルを読まれないよう一時ファイル経由で置き換える
+        # （キャッシュとハードリンクされている既存ファイルも書き換えずに済む）
+        tmp_path = output_path.with_name(f".{output_path.name}.tmp")
         try:
-            # 音声を読み込み（元のサンプリングレートを維持）
-            audio_data, sr = librosa.load(input_path, sr=None, mono=True)
+            audio_data, sr = sf.read(io.BytesIO(wav_bytes), dtype="float32")
+            if audio_data.ndim > 1:
+                audio_data = audio_data.mean(axis=1)
             
             if len(audio_data) == 0:
-                print(f"警告: 空の音声ファイル {input_path}")
-                return input_path
-            
-            # noisereduceのみでビープ音除去
-            audio_data = self.apply_spectral_gating(audio_data, sr)
-            
-            # 音量正規化（クリッピング防止）
-            max_val = np.max(np.abs(audio_data))
-            if max_val > 0:
-                audio_data = audio_data * 0.95 / max_val
-            
-            # 保存
-            if output_path is None:
-                output_path = input_path  # 上書き
-                
-            # soundfileで保存（元のサンプリングレート維持）
-            sf.write(output_path, audio_data, sr)
-            print(f"音声後処理完了: {output_path} (SR: {sr}Hz)")
-            
-            return output_path
+                print(f"警告: 空の音声データ {output_path}")
+                tmp_path.write_bytes(wav_bytes)
+            else:
+                audio_data, report = self.process_audio_array(
+                    audio_data, sr, denoise_mode, noise_profile_key, detect_beeps
+                )
+                sf.write(tmp_path, audio_data, sr, format="WAV")
+                print(f"音声後処理完了: {output_path} (SR: {sr}Hz, ノイズ除去: {report['denoise']})")
             
         except Exception as e:
-            print(f"音声後処理エラー {input_path}: {e}")
-            return input_path  # エラー時は元ファイルを返す
+            print(f"音声後処理エラー {output_path}: {e}")
+            # エラー時は合成結果をそのまま保存
+            tmp_path.write_bytes(wav_bytes)
+        
+        os.replace(tmp_path, output_path)
+        return report
+    
+    def process_voicevox_audio(self, input_path, output_path=None, denoise_mode=None, noise_profile_key=None):
+        """VOICEVOXの音声ファイルを後処理（ファイルから読み込む場合）"""
+        if output_path is None:
+            output_path = input_path  # 上書き
+        with open(input_path, "rb") as f:
+            wav_bytes = f.read()
+        self.process_voicevox_bytes(wav_bytes, output_path, denoise_mode, noise_profile_key)
+        return output_path
+
+
+# 後処理用のプロセスプール（noisereduceのFFT処理をGILの外で複数コアに分散）
+_postprocess_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_postprocess_pool_lock = threading.Lock()
+# ワーカープロセス内のプロセッサー（ノイズプロファイルの保存先ごと）
+_worker_processors: Dict[Optional[str], ImprovedAudioProcessor] = {}
+
+
+def get_postprocess_pool(max_workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """プロセス内で共有される後処理用プロセスプールを取得"""
+    global _postprocess_pool
+    with _postprocess_pool_lock:
+        if _postprocess_pool is None:
+            # APIサーバーはスレッドを多用するため fork ではなく spawn で起動する
+            _postprocess_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _postprocess_pool
+
+
+def _reset_postprocess_pool() -> None:
+    """ワーカーが異常終了したプールを破棄（次回の取得時に作り直す）"""
+    global _postprocess_pool
+    with _postprocess_pool_lock:
+        if _postprocess_pool is not None:
+            _postprocess_pool.shutdown(wait=False, cancel_futures=True)
+            _postprocess_pool = None
+
+
+def postprocess_wav_bytes(
+    wav_bytes: bytes,
+    output_path: str,
+    denoise_mode: Optional[str] = None,
+    noise_profile_key: Optional[str] = None,
+    detect_beeps: bool = False,
+    noise_profile_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """プロセスプールで実行される後処理（プロセスごとにプロセッサーを使い回す）
+
+    spawn で起動したワーカーは作業ディレクトリに依存しないよう、ノイズプロファイルの保存先を引数で受け取る
+    """
+    processor = _worker_processors.get(noise_profile_dir)
+    if processor is None:
+        processor = ImprovedAudioProcessor(noise_profile_dir=noise_profile_dir)
+        _worker_processors[noise_profile_dir] = processor
+    return processor.process_voicevox_bytes(
+        wav_bytes, output_path, denoise_mode, noise_profile_key, detect_beeps
+    )
+
 
 class AudioGenerator:
-    def __init__(self, job_id: str, base_dir: Path):
+    def __init__(
+        self,
+        job_id: str,
+        base_dir: Path,
+        max_concurrency: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        denoise_mode: Optional[str] = None,
+        detect_beeps: Optional[bool] = None,
+        schedule: Optional[str] = None,
+        style_concurrency: Optional[int] = None,
+        chunk_max_chars: Optional[int] = None
+    ):
         self.job_id = job_id
         self.base_dir = base_dir
         self.audio_dir = base_dir / "audio" / job_id
         self.audio_dir.mkdir(parents=True, exist_ok=True)
-        self.voicevox_url = os.getenv("VOICEVOX_URL", "http://localhost:50021")
+        self.voicevox_url = get_voicevox_url()
+        # 接続プールとリトライを持つ共有クライアント（複数エンジン指定時はロードバランサ）
+        self.voicevox = get_client(self.voicevox_url)
+        # VOICEVOXへの同時リクエスト数（1で従来どおりの逐次処理）
+        # 未指定時は全エンジン合計の同時リクエスト数まで並列化する
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("VOICEVOX_MAX_CONCURRENCY") or self.voicevox.max_concurrency)
+        self.max_concurrency = max(1, max_concurrency)
+        # 話者ごとのノイズプロファイルの保存先（他のキャッシュと同じく base_dir の下）
+        self.noise_profile_dir = Path(
+            os.getenv("NOISE_PROFILE_CACHE_DIR", str(base_dir / "cache" / "noise_profiles"))
+        )
         # 改善されたオーディオプロセッサーを初期化
-        self.audio_processor = ImprovedAudioProcessor()
+        self.audio_processor = ImprovedAudioProcessor(noise_profile_dir=self.noise_profile_dir)
+        # ノイズ除去モード（noisereduce: 従来の2段階処理 / fast: 1回のSTFTで処理）
+        self.denoise_mode = get_denoise_mode(denoise_mode)
+        # ビープ音・クリック音を検出した音声のみノイズ除去する（0で全音声に適用）
+        self.detect_beeps = is_beep_detection_enabled(detect_beeps)
+        # 合成順序（grouped: スタイルごとにまとめる / interleaved: 対話の順）
+        self.schedule = get_schedule(schedule)
+        # 1スタイルあたりの同時リクエスト数（0で制限なし、grouped のみ）
+        if style_concurrency is None:
+            style_concurrency = int(os.getenv("VOICEVOX_STYLE_CONCURRENCY", "0"))
+        self.style_concurrency = max(0, style_concurrency)
+        # 長い行を文単位に分割して並列に合成する閾値（0で分割しない）とチャンク間の無音
+        self.chunk_max_chars = get_chunk_max_chars(chunk_max_chars)
+        self.chunk_pause = get_chunk_pause()
+        # 後処理のプロセス数（0の場合は合成スレッド内で処理）
+        self.postprocess_workers = int(
+            os.getenv("AUDIO_POSTPROCESS_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        # ジョブ横断の合成済み音声キャッシュ
+        if use_cache is None:
+            use_cache = os.getenv("TTS_CACHE_ENABLED", "1") != "0"
+        self.tts_cache = None
+        # audio_query の結果キャッシュ（パラメータだけ変えた再合成でテキスト解析を省略）
+        self.query_cache = None
+        if use_cache:
+            self.tts_cache = TTSCache(Path(os.getenv("TTS_CACHE_DIR", str(base_dir / "cache" / "tts"))))
+            self.query_cache = AudioQueryCache(
+                Path(os.getenv("AUDIO_QUERY_CACHE_DIR", str(base_dir / "cache" / "audio_query")))
+            )
+        self.engine_version = "unknown"
         
     def check_voicevox_status(self) -> bool:
-        """VOICEVOXが起動しているか確認"""
+        """VOICEVOXが起動しているか確認（エンジンバージョンも取得）"""
         try:
-            response = requests.get(f"{self.voicevox_url}/version")
-            return response.status_code == 200
-        except:
+            self.engine_version = self.voicevox.version()
+            return True
+        except Exception:
             return False
     
     def generate_audio_files(
@@ -188,15 +378,128 @@ class AudioGenerator:
         speed_scale: float = 1.0,
         pitch_scale: float = 0.0,
         intonation_scale: float = 1.2,
-        volume_scale: float = 1.0
+        volume_scale: float = 1.0,
+        max_concurrency: Optional[int] = None,
+        speed_factors: Optional[Dict[str, float]] = None
     ) -> int:
-        """対話音声を生成"""
+        """対話音声を生成（前回から変更・追加された行のみを並列に合成）
+
+        戻り値は対話全体の音声ファイル数
+        """
         
         # VOICEVOXチェック
         if not self.check_voicevox_status():
             raise Exception("VOICEVOXが起動していません")
         
-        # 対話データを読み込み
+        # 対話データを読み込み、合成する行を一覧化
+        tasks = self._build_tasks(
+            self._load_dialogue_data(), speed_scale, pitch_scale, intonation_scale, volume_scale, speed_factors
+        )
+        
+        # 前回の合成結果と比較し、変更・追加された行だけを合成する
+        manifest = AudioManifest(self.audio_dir)
+        entries, pending = self._reuse_previous_audio(manifest, tasks)
+        
+        if max_concurrency is None:
+            max_concurrency = self.max_concurrency
+        # 分割した行はチャンクごとに1リクエストになる
+        max_concurrency = max(1, min(max_concurrency, sum(len(task["chunks"]) for task in pending) or 1))
+        print(
+            f"音声生成: {len(tasks)} 行中 {len(pending)} 行を同時実行数 {max_concurrency} で合成します"
+            f"（順序: {self.schedule}）"
+        )
+        # 未読み込みのスタイルは合成前に初期化しておく（通常はアップロード時に完了済み）
+        cold_candidates = [
+            task["speaker_id"] for task in pending
+            if self.tts_cache is None or not self.tts_cache.contains(task["synthesis_key"])
+        ]
+        speaker_warmup.warm_up(cold_candidates, self.voicevox.engine_urls)
+        
+        # 合成と後処理をパイプラインで実行
+        #  - 合成（スレッド）: キャッシュ確認 → audio_query → synthesis（I/O待ちが中心）
+        #  - 後処理（プロセス）: メモリ上でデコード → ノイズ除去 → 一度だけ書き込み（CPU処理が中心）
+        cache_hits = 0
+        denoise_skipped = 0
+        try:
+            # 分割した行はチャンクごとに投入し、全チャンクがそろったら連結して後処理する
+            units, chunk_results, chunk_hits = self._expand_chunks(pending, entries)
+            cache_hits += chunk_hits
+            
+            # 同じスタイルの行をまとめて投入し、エンジン側のスタイル切り替えを減らす
+            scheduler = SynthesisScheduler(
+                units, max_concurrency, self.schedule, self.style_concurrency
+            )
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                synth_futures = {}
+                
+                def submit_synthesis():
+                    for task in scheduler.next_tasks():
+                        synth_futures[executor.submit(self._synthesize_line, task)] = task
+                
+                submit_synthesis()
+                post_futures: Dict[concurrent.futures.Future, Tuple[Dict[str, Any], bytes]] = {}
+                try:
+                    while synth_futures or post_futures:
+                        done, _ = concurrent.futures.wait(
+                            list(synth_futures) + list(post_futures),
+                            return_when=concurrent.futures.FIRST_COMPLETED
+                        )
+                        for future in done:
+                            if future in synth_futures:
+                                task = synth_futures.pop(future)
+                                scheduler.task_done(task)
+                                submit_synthesis()
+                                wav_bytes = future.result()
+                                if "chunk_index" in task:
+                                    parts = chunk_results[task["audio_filename"]]
+                                    parts[task["chunk_index"]] = wav_bytes
+                                    if any(part is None for part in parts):
+                                        continue
+                                    del chunk_results[task["audio_filename"]]
+                                    task = task["line_task"]
+                                    wav_bytes = concatenate_wav_chunks(parts, self.chunk_pause)
+                                if wav_bytes is None:
+                                    # キャッシュヒット（後処理済みの音声をそのまま使う）
+                                    cache_hits += 1
+                                    self._finish_line(task, entries, from_cache=True)
+                                else:
+                                    post_futures[self._submit_postprocess(executor, task, wav_bytes)] = (task, wav_bytes)
+                                continue
+                            
+                            task, wav_bytes = post_futures.pop(future)
+                            try:
+                                report = future.result()
+                            except BrokenProcessPool as e:
+                                # ワーカープロセスが異常終了した場合はスレッドで処理し直す
+                                print(f"後処理プロセスが異常終了しました（スレッドで再処理します）: {e}")
+                                _reset_postprocess_pool()
+                                report = self.audio_processor.process_voicevox_bytes(
+                                    wav_bytes, self.audio_dir / task["audio_filename"],
+                                    self.denoise_mode, task["noise_profile_key"], self.detect_beeps
+                                )
+                            if report["denoise"] == "skipped":
+                                denoise_skipped += 1
+                            self._finish_line(task, entries, from_cache=False, report=report)
+                except Exception:
+                    # 1行でも失敗した場合は未着手の行をキャンセルしてエラーを伝播
+                    for future in list(synth_futures) + list(post_futures):
+                        future.cancel()
+                    raise
+        finally:
+            # 失敗時も完了済みの行は記録し、再実行時に再利用できるようにする
+            manifest.save(entries)
+        
+        if self.tts_cache is not None:
+            print(f"音声生成: キャッシュヒット {cache_hits}/{len(pending)} 行")
+        if self.detect_beeps:
+            synthesized = len(pending) - cache_hits
+            print(f"音声生成: ノイズ除去を省略 {denoise_skipped}/{synthesized} 行（ビープ音・クリック音なし）")
+        
+        return len(tasks)
+    
+    def _load_dialogue_data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """対話データを読み込み（ジョブ固有のデータがなければデフォルトを使用）"""
         # まずジョブ固有のデータを探す
         job_dialogue_path = self.base_dir / "data" / self.job_id / "dialogue_narration_katakana.json"
         if job_dialogue_path.exists():
@@ -211,6 +514,21 @@ class AudioGenerator:
         print(f"音声生成: 対話データを読み込みました - {dialogue_data_path}")
         print(f"音声生成: スライド数 = {len(dialogue_data)}")
         
+        return dialogue_data
+    
+    def _build_tasks(
+        self,
+        dialogue_data: Dict[str, List[Dict[str, Any]]],
+        speed_scale: float = 1.0,
+        pitch_scale: float = 0.0,
+        intonation_scale: float = 1.2,
+        volume_scale: float = 1.0,
+        speed_factors: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """対話データとメタデータから合成する行の一覧を作成
+
+        speed_factors は目標時間への合わせ込みで求めた話者ごとの話速の係数
+        """
         # メタデータからスピーカー設定を読み込む
         metadata_path = self.base_dir / "uploads" / self.job_id / "metadata.json"
         speaker_info = {}
@@ -232,9 +550,8 @@ class AudioGenerator:
                 "speaker2": 3     # ずんだもん
             }
         
-        audio_count = 0
-        
-        # 各スライドの音声を生成
+        # 合成する行を一覧化（ファイル名は従来どおり slide_XXX_YYY_speaker.wav）
+        tasks = []
         for slide_key, dialogues in dialogue_data.items():
             if not dialogues:
                 continue
@@ -253,29 +570,12 @@ class AudioGenerator:
                 # ファイル名を生成
                 slide_num = slide_key.replace("slide_", "")
                 try:
-                    slide_num_int = int(slide_num)
-                    audio_filename = f"slide_{slide_num_int:03d}_{idx+1:03d}_{speaker_name}.wav"
+                    slide_num = int(slide_num)
+                    audio_filename = f"slide_{slide_num:03d}_{idx+1:03d}_{speaker_name}.wav"
                 except ValueError:
                     # 数値に変換できない場合はそのまま使用
                     audio_filename = f"slide_{slide_num}_{idx+1:03d}_{speaker_name}.wav"
                 
-                # 音声クエリの作成
-                query_data = {
-                    "text": text,
-                    "speaker": speaker_id
-                }
-                
-                query_response = requests.post(
-                    f"{self.voicevox_url}/audio_query",
-                    params=query_data
-                )
-                
-                if query_response.status_code != 200:
-                    raise Exception(f"音声クエリの作成に失敗: {query_response.status_code}")
-                
-                # 音声合成パラメータを調整
-                synthesis_data = query_response.json()
-                
                 # キャラクターごとの速度調整
                 current_speaker_info = speaker_info.get(speaker, {})
                 # メタデータに速度が設定されている場合はそれを使用
@@ -286,40 +586,395 @@ class AudioGenerator:
                     current_speed_scale = speed_scale
                     if current_speaker_info.get("name") == "九州そら":
                         current_speed_scale = speed_scale * 1.2
+                # 目標時間に合わせるための係数（duration_fit.json）
+                if speed_factors:
+                    current_speed_scale *= speed_factors.get(speaker, 1.0)
                 
-                # 標準パラメータ（noisereduceに任せる）
-                synthesis_data["speedScale"] = current_speed_scale
-                synthesis_data["pitchScale"] = pitch_scale
-                synthesis_data["intonationScale"] = intonation_scale
-                synthesis_data["volumeScale"] = volume_scale
-                
-                # 音声の前後に短い無音を追加（クリック音防止）
-                synthesis_data["prePhonemeLength"] = 0.1  # 音声前の無音（秒）
-                synthesis_data["postPhonemeLength"] = 0.1  # 音声後の無音（秒）
+                synthesis_params = {
+                    "speedScale": current_speed_scale,
+                    "pitchScale": pitch_scale,
+                    "intonationScale": intonation_scale,
+                    "volumeScale": volume_scale,
+                    # 音声の前後に短い無音を追加（クリック音防止）
+                    "prePhonemeLength": 0.1,  # 音声前の無音（秒）
+                    "postPhonemeLength": 0.1,  # 音声後の無音（秒）
+                }
+                normalized_text = TTSCache.normalize_text(text)
+                processing = {"processing": AUDIO_PROCESSING_VERSION}
+                if self.denoise_mode != DENOISE_MODE_NOISEREDUCE:
+                    processing["denoise"] = self.denoise_mode
+                if self.detect_beeps:
+                    processing["beep_detection"] = True
+                # 長い行は文単位のチャンクに分けて合成する（分割した行だけキーが変わる）
+                chunks = split_text(normalized_text, self.chunk_max_chars)
+                if len(chunks) > 1:
+                    processing["chunking"] = {"max_chars": self.chunk_max_chars, "pause": self.chunk_pause}
                 
-                synthesis_response = requests.post(
-                    f"{self.voicevox_url}/synthesis",
-                    params={
-                        "speaker": speaker_id,
-                        "outputSamplingRate": 24000  # 24kHzに統一
-                    },
-                    json=synthesis_data
+                tasks.append({
+                    "text": normalized_text,
+                    "slide": slide_num,
+                    "line": idx + 1,
+                    "speaker": speaker,
+                    "speaker_id": speaker_id,
+                    "audio_filename": audio_filename,
+                    "params": synthesis_params,
+                    # 同じキーなら同じ音声になる（マニフェストとキャッシュで共用）
+                    "synthesis_key": TTSCache.make_key(
+                        normalized_text,
+                        speaker_id,
+                        self.engine_version,
+                        {**synthesis_params, "outputSamplingRate": OUTPUT_SAMPLING_RATE},
+                        extra=processing
+                    ),
+                    # ノイズプロファイルは話者（スタイル）・エンジン・後処理のバージョンごとに共有
+                    "noise_profile_key": f"speaker{speaker_id}_{self.engine_version}_p{AUDIO_PROCESSING_VERSION}",
+                    "chunks": chunks,
+                })
+        
+        return tasks
+    
+    def _expand_chunks(
+        self,
+        pending: List[Dict[str, Any]],
+        entries: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, List[Optional[bytes]]], int]:
+        """分割した行をチャンク単位のタスクに展開
+
+        分割した行のキャッシュはここで確認する（ヒットした行は合成しない）。
+        戻り値は (合成するタスク, 行ごとのチャンクの合成結果の入れ物, キャッシュヒット数)
+        """
+        units = []
+        chunk_results: Dict[str, List[Optional[bytes]]] = {}
+        cache_hits = 0
+        for task in pending:
+            chunks = task["chunks"]
+            if len(chunks) == 1:
+                units.append(task)
+                continue
+            if self.tts_cache is not None:
+                if self.tts_cache.get(task["synthesis_key"], self.audio_dir / task["audio_filename"]):
+                    cache_hits += 1
+                    self._finish_line(task, entries, from_cache=True)
+                    continue
+            chunk_results[task["audio_filename"]] = [None] * len(chunks)
+            for i, chunk in enumerate(chunks):
+                units.append({
+                    **task,
+                    "text": chunk,
+                    "params": self._chunk_params(task["params"], i, len(chunks)),
+                    "chunk_index": i,
+                    "line_task": task,
+                })
+        if chunk_results:
+            print(
+                f"音声生成: {len(chunk_results)} 行を {self.chunk_max_chars} 文字以内に分割し、"
+                f"{sum(1 for unit in units if 'chunk_index' in unit)} チャンクとして合成します"
+            )
+        return units, chunk_results, cache_hits
+    
+    @staticmethod
+    def _chunk_params(params: Dict[str, Any], index: int, count: int) -> Dict[str, Any]:
+        """チャンクの合成パラメータ（前後の無音は行の先頭と末尾だけに付け、チャンク間は一定の無音で連結する）"""
+        params = dict(params)
+        if index > 0:
+            params["prePhonemeLength"] = 0.0
+        if index < count - 1:
+            params["postPhonemeLength"] = 0.0
+        return params
+    
+    def predict_durations(
+        self,
+        speed_scale: float = 1.0,
+        pitch_scale: float = 0.0,
+        intonation_scale: float = 1.2,
+        volume_scale: float = 1.0,
+        max_concurrency: Optional[int] = None,
+        transition_type: str = "crossfade",
+        transition_duration: float = 0.4,
+        speed_factors: Optional[Dict[str, float]] = None,
+        line_gap: float = LINE_GAP
+    ) -> Dict[str, Any]:
+        """合成せずに各行・各スライド・動画全体の長さを予測（audio_query のみ実行）
+
+        行の長さは合成と同じパラメータ（話者ごとの話速、分割時のチャンク間の無音）で計算する
+        """
+        if not self.check_voicevox_status():
+            raise Exception("VOICEVOXが起動していません")
+        
+        dialogue_data = self._load_dialogue_data()
+        tasks = self._build_tasks(
+            dialogue_data, speed_scale, pitch_scale, intonation_scale, volume_scale, speed_factors
+        )
+        
+        # audio_query をまとめて並列に取得（同じテキスト・スピーカーは1回、キャッシュ済みはリクエストしない）
+        query_keys = list(dict.fromkeys(
+            (chunk, task["speaker_id"]) for task in tasks for chunk in task["chunks"]
+        ))
+        if max_concurrency is None:
+            max_concurrency = self.max_concurrency
+        queries: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(query_keys) or 1))) as executor:
+            futures = {executor.submit(self._get_audio_query, text, speaker_id): (text, speaker_id) for text, speaker_id in query_keys}
+            for future in concurrent.futures.as_completed(futures):
+                queries[futures[future]] = future.result()
+        
+        lines = []
+        line_durations: Dict[Any, List[float]] = {}
+        for task in tasks:
+            chunks = task["chunks"]
+            duration = sum(
+                predict_query_duration(queries[(chunk, task["speaker_id"])], self._chunk_params(task["params"], i, len(chunks)))
+                for i, chunk in enumerate(chunks)
+            ) + self.chunk_pause * (len(chunks) - 1)
+            line_durations.setdefault(task["slide"], []).append(duration)
+            lines.append({
+                "slide": task["slide"],
+                "line": task["line"],
+                "speaker": task["speaker"],
+                "file": task["audio_filename"],
+                "text": task["text"],
+                "speed_scale": task["params"]["speedScale"],
+                "duration": round(duration, 3),
+            })
+        
+        # 対話のないスライドも動画には含まれるため、対話データの全スライドを積み上げる
+        slides = []
+        for slide_key in dialogue_data:
+            slide_num = slide_key.replace("slide_", "")
+            try:
+                slide_num = int(slide_num)
+            except ValueError:
+                pass
+            durations = line_durations.get(slide_num, [])
+            slides.append({
+                "slide": slide_num,
+                "lines": len(durations),
+                "speech_duration": round(sum(durations), 3),
+                "duration": round(predict_slide_duration(durations, line_gap), 3),
+            })
+        
+        total = predict_total_duration(
+            (slide["duration"] for slide in slides), transition_type, transition_duration
+        )
+        print(f"音声長の予測: {len(tasks)} 行, audio_query {len(query_keys)} 件, 合計 {total:.1f} 秒")
+        return {
+            "lines": lines,
+            "slides": slides,
+            "speech_duration": round(sum(line["duration"] for line in lines), 3),
+            "total_duration": round(total, 3),
+            "audio_queries": len(query_keys),
+        }
+    
+    def fit_to_target(
+        self,
+        target_seconds: float,
+        fitter: DurationFitter,
+        speed_scale: float = 1.0,
+        pitch_scale: float = 0.0,
+        intonation_scale: float = 1.2,
+        volume_scale: float = 1.0,
+        max_concurrency: Optional[int] = None,
+        transition_type: str = "crossfade",
+        transition_duration: float = 0.4
+    ) -> Dict[str, Any]:
+        """予測した長さから目標時間に合わせる話速の係数と行間を求める（合成・LLMの呼び出しはしない）"""
+        options = {
+            "speed_scale": speed_scale,
+            "pitch_scale": pitch_scale,
+            "intonation_scale": intonation_scale,
+            "volume_scale": volume_scale,
+            "max_concurrency": max_concurrency,
+            "transition_type": transition_type,
+            "transition_duration": transition_duration,
+        }
+        plan = fitter.fit(self.predict_durations(**options), target_seconds, transition_type, transition_duration)
+        # 係数を掛けた話速で予測し直し、フレーム単位の丸めまで含めた長さを記録する（audio_query はキャッシュ済み）
+        fitted = self.predict_durations(
+            **options, speed_factors=plan["speed_factors"], line_gap=plan["line_gap"]
+        )
+        plan["predicted_after"] = fitted["total_duration"]
+        plan["status"] = fitter.status(plan["predicted_after"], target_seconds)
+        print(
+            f"目標時間への合わせ込み: {plan['predicted_before']:.1f}秒 → {plan['predicted_after']:.1f}秒 "
+            f"（目標 {target_seconds:.1f}秒, 話速 {plan['speed_scales']}, 行間 {plan['line_gap']}秒, {plan['status']}）"
+        )
+        return plan
+    
+    def _finish_line(
+        self,
+        task: Dict[str, Any],
+        entries: List[Dict[str, Any]],
+        from_cache: bool,
+        report: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """出力済みの行をキャッシュとマニフェストに登録"""
+        output_path = self.audio_dir / task["audio_filename"]
+        if not from_cache and self.tts_cache is not None:
+            self.tts_cache.put(task["synthesis_key"], output_path)
+        # ノイズ除去の判定結果（キャッシュから取得した行は不明）
+        measurement = measure_audio_file(output_path)
+        measurement["postprocess"] = report
+        entries.append(self._manifest_entry(task, measurement))
+    
+    def _manifest_entry(self, task: Dict[str, Any], measurement: Dict[str, Any]) -> Dict[str, Any]:
+        """タスクと音声ファイルの実測値からマニフェストのエントリを作成"""
+        return {
+            "file": task["audio_filename"],
+            "slide": task["slide"],
+            "line": task["line"],
+            "speaker": task["speaker"],
+            "speaker_id": task["speaker_id"],
+            "text": task["text"],
+            "synthesis_key": task["synthesis_key"],
+            **measurement,
+        }
+    
+    def _reused_measurement(self, old_entry: Dict[str, Any], filename: str) -> Dict[str, Any]:
+        """再利用するファイルの実測値（前回の記録があれば再計測しない）"""
+        path = self.audio_dir / filename
+        if all(k in old_entry for k in ("samples", "sample_rate", "duration", "sha256")):
+            return {
+                "path": str(path.resolve()),
+                "samples": old_entry["samples"],
+                "sample_rate": old_entry["sample_rate"],
+                "duration": old_entry["duration"],
+                "sha256": old_entry["sha256"],
+                "postprocess": old_entry.get("postprocess"),
+            }
+        return {**measure_audio_file(path), "postprocess": old_entry.get("postprocess")}
+    
+    def _reuse_previous_audio(
+        self,
+        manifest: AudioManifest,
+        tasks: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """前回のマニフェストと比較して既存ファイルを再利用する
+
+        - 同じファイル名・同じ内容の行はそのまま使う
+        - 行の挿入・削除で番号がずれた行はファイル名を付け替える
+        - どの行からも参照されない古いWAVは削除する
+        戻り値は (再利用した行のマニフェストエントリ, 合成が必要なタスク)
+        """
+        previous = {}
+        for entry in manifest.load():
+            if (self.audio_dir / entry.get("file", "")).is_file():
+                previous[entry["file"]] = entry
+        
+        entries: List[Dict[str, Any]] = []
+        claimed = set()
+        remaining = []
+        
+        # 1. 同じファイル名で内容も同じ行はそのまま再利用
+        for task in tasks:
+            old = previous.get(task["audio_filename"])
+            if old is not None and old.get("synthesis_key") == task["synthesis_key"]:
+                claimed.add(task["audio_filename"])
+                entries.append(self._manifest_entry(task, self._reused_measurement(old, task["audio_filename"])))
+            else:
+                remaining.append(task)
+        
+        # 2. 同じ内容の未使用ファイルがあれば付け替え（番号の振り直し）
+        available: Dict[str, List[str]] = {}
+        for filename, entry in previous.items():
+            if filename not in claimed:
+                available.setdefault(entry.get("synthesis_key"), []).append(filename)
+        
+        renames = []
+        pending = []
+        for task in remaining:
+            candidates = available.get(task["synthesis_key"])
+            if candidates:
+                source = candidates.pop(0)
+                claimed.add(source)
+                renames.append((source, task))
+            else:
+                pending.append(task)
+        
+        # 付け替え先が別の付け替え元と衝突しないよう、一時名を経由して移動
+        staged = []
+        for source, task in renames:
+            temp_path = self.audio_dir / f".{source}.renaming"
+            os.replace(self.audio_dir / source, temp_path)
+            staged.append((temp_path, previous[source], task))
+        for temp_path, old, task in staged:
+            os.replace(temp_path, self.audio_dir / task["audio_filename"])
+            entries.append(self._manifest_entry(task, self._reused_measurement(old, task["audio_filename"])))
+        
+        # 3. 今回の対話で使われないWAVを削除
+        targets = {task["audio_filename"] for task in tasks}
+        removed = 0
+        for wav_path in self.audio_dir.glob("slide_*.wav"):
+            if wav_path.name not in targets:
+                wav_path.unlink()
+                removed += 1
+        
+        print(
+            f"音声生成: 再利用 {len(tasks) - len(remaining)} 行, 番号変更 {len(renames)} 行, "
+            f"合成 {len(pending)} 行, 削除 {removed} ファイル"
+        )
+        return entries, pending
+    
+    def _synthesize_line(self, task: Dict[str, Any]) -> Optional[bytes]:
+        """1行分の音声を合成（ワーカースレッドで実行）
+
+        キャッシュにヒットした場合は出力ファイルを配置して None を返し、
+        それ以外は後処理前のWAVのバイト列を返す
+        """
+        speaker_id = task["speaker_id"]
+        text = task["text"]
+        
+        # キャッシュにあれば合成せずに再利用（分割した行は展開時に確認済み）
+        if self.tts_cache is not None and "chunk_index" not in task:
+            if self.tts_cache.get(task["synthesis_key"], self.audio_dir / task["audio_filename"]):
+                return None
+        
+        # 音声クエリの作成（キャッシュがあればテキスト解析を省略）
+        synthesis_data = self._get_audio_query(text, speaker_id)
+        
+        # 音声合成パラメータを調整（標準パラメータ、noisereduceに任せる）
+        synthesis_data.update(task["params"])
+        
+        return self.voicevox.synthesis(
+            synthesis_data,
+            speaker_id,
+            output_sampling_rate=OUTPUT_SAMPLING_RATE
+        )
+    
+    def _submit_postprocess(
+        self,
+        executor: concurrent.futures.ThreadPoolExecutor,
+        task: Dict[str, Any],
+        wav_bytes: bytes
+    ) -> concurrent.futures.Future:
+        """合成結果の後処理を投入（プロセスプールが使えない場合は合成用スレッドで処理）"""
+        output_path = self.audio_dir / task["audio_filename"]
+        if self.postprocess_workers > 0:
+            try:
+                pool = get_postprocess_pool(self.postprocess_workers)
+                return pool.submit(
+                    postprocess_wav_bytes, wav_bytes, str(output_path),
+                    self.denoise_mode, task["noise_profile_key"], self.detect_beeps,
+                    str(self.noise_profile_dir)
                 )
-                
-                if synthesis_response.status_code != 200:
-                    raise Exception(f"音声合成に失敗: {synthesis_response.status_code}")
-                
-                # ファイルに保存
-                output_path = self.audio_dir / audio_filename
-                with open(output_path, "wb") as f:
-                    f.write(synthesis_response.content)
-                
-                # 改善されたオーディオ処理を適用（ビーン音除去）
-                self.audio_processor.process_voicevox_audio(output_path)
-                
-                audio_count += 1
+            except (BrokenProcessPool, RuntimeError) as e:
+                print(f"後処理プロセスプールが利用できません（スレッドで処理します）: {e}")
+                _reset_postprocess_pool()
+        return executor.submit(
+            self.audio_processor.process_voicevox_bytes, wav_bytes, output_path,
+            self.denoise_mode, task["noise_profile_key"], self.detect_beeps
+        )
+    
+    def _get_audio_query(self, text: str, speaker_id: int) -> Dict[str, Any]:
+        """audio_query を取得（テキストとスピーカーが同じならキャッシュを再利用）"""
+        if self.query_cache is not None:
+            query = self.query_cache.get(text, speaker_id, self.engine_version)
+            if query is not None:
+                return query
         
-        return audio_count
+        query = self.voicevox.audio_query(text, speaker_id)
+        if self.query_cache is not None:
+            self.query_cache.put(text, speaker_id, self.engine_version, query)
+        return query
     
     def apply_noise_reduction(self, audio_path: Path):
         """高周波ノイズをフィルタリングで除去"""
@@ -347,19 +1002,8 @@ class AudioGenerator:
             # エラーが発生しても処理を継続
     
     def _apply_lowpass_filter(self, audio_data: np.ndarray, sample_rate: int) -> np.ndarray:
-        """ローパスフィルタを適用して高周波ノイズを除去"""
-        # カットオフ周波数：10kHz（音声の高域成分も保持）
-        cutoff_freq = 10000
-        nyquist_freq = sample_rate / 2
-        
-        # ナイキスト周波数で正規化
-        normalized_cutoff = cutoff_freq / nyquist_freq
-        
-        # Butterworthフィルタを作成（次数を4に下げて自然な音質を維持）
-        b, a = signal.butter(4, normalized_cutoff, btype='low')
-        
-        # フィルタを適用（lfilterを使用して境界処理を改善）
-        filtered_audio = signal.lfilter(b, a, audio_data.astype(np.float64))
-        
-        # データ型を元に戻す
-        return filtered_audio
\ No newline at end of file
+        """ローパスフィルタ（10kHz, 4次Butterworth）を適用して高周波ノイズを除去
+
+        フィルタはサンプリングレートごとに一度だけ設計し、lfilterと同じく片方向で適用する
+        """
+        return get_filter_bank(sample_rate).apply_lowpass(audio_data)
@@ -0,0 +1,109 @@
+"""
+音声マニフェスト - ジョブごとに「どの行をどの内容で合成したか」を記録する
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import soundfile as sf
+
+
+class AudioManifest:
+    """audio/<job_id>/manifest.json の読み書き
+
+    各エントリは1行分の音声ファイルに対応し、少なくとも以下を持つ:
+        file: ファイル名（slide_XXX_YYY_speaker.wav）
+        slide: スライド番号
+        line: スライド内の行番号（1始まり）
+        speaker: 話者キー（speaker1 / speaker2 など）
+        speaker_id: VOICEVOXのスタイルID
+        text: 合成したテキスト
+        synthesis_key: テキスト・スピーカー・合成パラメータのハッシュ
+        path: ファイルの絶対パス
+        samples: サンプル数
+        sample_rate: サンプリングレート
+        duration: 長さ（秒）
+        sha256: ファイル内容のハッシュ
+        postprocess: 後処理の記録（denoise: applied/skipped、ビープ音・クリック音の検出スコア）
+            キャッシュから取得した行は None
+
+    動画作成・動画時間の概算・タイムライン表示はこの実測値を使い、
+    音声ディレクトリの走査やファイルのデコードを省略する。
+    """
+
+    FILENAME = "manifest.json"
+    VERSION = 1
+
+    def __init__(self, audio_dir: Path):
+        self.audio_dir = Path(audio_dir)
+        self.path = self.audio_dir / self.FILENAME
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> List[Dict[str, Any]]:
+        """エントリ一覧を読み込む（存在しない・壊れている場合は空）"""
+        if not self.path.exists():
+            return []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("entries", [])
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"音声マニフェストの読み込みエラー: {e}")
+            return []
+
+    def save(self, entries: List[Dict[str, Any]]) -> None:
+        """エントリ一覧を保存（スライド・行の順に並べ替えてアトミックに書き込む）"""
+        entries = sorted(entries, key=lambda e: (_slide_sort_key(e.get("slide")), e.get("line", 0)))
+        tmp_path = self.path.with_name(f"{self.FILENAME}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "entries": entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def entries_by_position(self) -> Dict[tuple, Dict[str, Any]]:
+        """(スライド番号, 行番号) をキーにしたエントリ"""
+        return {
+            (slide_num, entry.get("line")): entry
+            for slide_num, slide_entries in self.entries_by_slide().items()
+            for entry in slide_entries
+        }
+
+    def entries_by_slide(self) -> Dict[int, List[Dict[str, Any]]]:
+        """スライド番号ごとに行順のエントリ一覧を返す"""
+        result: Dict[int, List[Dict[str, Any]]] = {}
+        for entry in self.load():
+            try:
+                slide_num = int(entry["slide"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            result.setdefault(slide_num, []).append(entry)
+        for slide_entries in result.values():
+            slide_entries.sort(key=lambda e: e.get("line", 0))
+        return result
+
+
+def measure_audio_file(path: Path) -> Dict[str, Any]:
+    """音声ファイルの実測値（サンプル数・長さ・内容ハッシュ）を取得"""
+    path = Path(path)
+    info = sf.info(str(path))
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return {
+        "path": str(path.resolve()),
+        "samples": int(info.frames),
+        "sample_rate": int(info.samplerate),
+        "duration": round(info.frames / info.samplerate, 4),
+        "sha256": digest.hexdigest(),
+    }
+
+
+def _slide_sort_key(slide: Optional[Any]):
+    try:
+        return (0, int(slide), "")
+    except (TypeError, ValueError):
+        return (1, 0, str(slide))
@@ -0,0 +1,101 @@
+"""
+ビープ音・クリック音検出 - ノイズ除去が必要な音声だけを判定する
+
+VOICEVOXの出力はほとんどがクリーンなため、間引いたフレームのFFT統計だけで
+狭帯域のビープ音と音声の端のクリック音を検出し、スペクトルゲートを掛けるかどうかを決める。
+"""
+import os
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def is_beep_detection_enabled(enabled: Optional[bool] = None) -> bool:
+    """ビープ音検出を使うか（引数 > 環境変数 AUDIO_BEEP_DETECTION > 有効）"""
+    if enabled is not None:
+        return enabled
+    return os.getenv("AUDIO_BEEP_DETECTION", "1") != "0"
+
+
+class BeepDetector:
+    """音声ごとにスペクトルゲートが必要かを判定する簡易解析
+
+    - 狭帯域エネルギー: 静かなフレームの平均パワースペクトルで、対象帯域の
+      最大値が帯域の中央値をどれだけ上回るか（dB）。定常的なビープ音は鋭いピークになる
+    - 端の過渡成分: 先頭・末尾の区間の最大の振幅変化が、全体の振幅変化の標準偏差の何倍か
+    """
+
+    def __init__(
+        self,
+        beep_freq_ranges: Sequence[Tuple[float, float]] = ((300, 500), (800, 3500)),
+        n_fft: int = 1024,
+        frame_step_ms: float = 40,
+        quiet_fraction: float = 0.25,
+        beep_threshold_db: float = 15.0,
+        silence_floor_db: float = -90.0,
+        edge_ms: float = 50,
+        edge_threshold: float = 8.0,
+    ):
+        self.beep_freq_ranges = tuple(beep_freq_ranges)
+        self.n_fft = n_fft
+        self.frame_step_ms = frame_step_ms
+        self.quiet_fraction = quiet_fraction
+        self.beep_threshold_db = beep_threshold_db
+        self.silence_floor_db = silence_floor_db
+        self.edge_ms = edge_ms
+        self.edge_threshold = edge_threshold
+        self._window = np.hanning(n_fft).astype(np.float32)
+
+    def _frames(self, audio_data: np.ndarray, sr: int) -> np.ndarray:
+        """重ならないよう間引いたフレーム（frame_step_ms ごとに n_fft サンプル）"""
+        step = max(self.n_fft, int(sr * self.frame_step_ms / 1000))
+        if len(audio_data) < self.n_fft:
+            audio_data = np.pad(audio_data, (0, self.n_fft - len(audio_data)))
+        windows = np.lib.stride_tricks.sliding_window_view(audio_data, self.n_fft)[::step]
+        return windows * self._window
+
+    def beep_score(self, audio_data: np.ndarray, sr: int) -> float:
+        """静かなフレームでの狭帯域ピークの高さ（dB）"""
+        frames = self._frames(audio_data, sr)
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+        # 発話区間の倍音を避けるため、エネルギーの小さいフレームのみ使う
+        energy = power.sum(axis=1)
+        n_quiet = max(1, int(len(energy) * self.quiet_fraction))
+        quiet_psd = power[np.argsort(energy)[:n_quiet]].mean(axis=0)
+        psd_db = 10 * np.log10(np.maximum(quiet_psd / (np.sum(self._window) ** 2), 1e-20))
+
+        freqs = np.fft.rfftfreq(self.n_fft, 1 / sr)
+        score = 0.0
+        for low, high in self.beep_freq_ranges:
+            band = psd_db[(freqs >= low) & (freqs <= min(high, sr / 2))]
+            if len(band) < 3 or band.max() < self.silence_floor_db:
+                continue
+            score = max(score, float(band.max() - np.median(band)))
+        return score
+
+    def edge_score(self, audio_data: np.ndarray, sr: int) -> float:
+        """先頭・末尾の急激な振幅変化の大きさ（全体の振幅変化の標準偏差に対する倍率）"""
+        diff = np.diff(audio_data)
+        if len(diff) == 0:
+            return 0.0
+        std = float(np.std(diff))
+        if std == 0:
+            return 0.0
+        edge = max(1, int(sr * self.edge_ms / 1000))
+        edges = np.concatenate([diff[:edge], diff[-edge:]])
+        return float(np.max(np.abs(edges)) / std)
+
+    def analyze(self, audio_data: np.ndarray, sr: int) -> Dict[str, Any]:
+        """スペクトルゲートが必要かを判定
+
+        戻り値: {"needs_denoise": bool, "beep_score": dB, "edge_score": 倍率}
+        """
+        if len(audio_data) == 0:
+            return {"needs_denoise": False, "beep_score": 0.0, "edge_score": 0.0}
+        beep = self.beep_score(audio_data, sr)
+        edge = self.edge_score(audio_data, sr)
+        return {
+            "needs_denoise": beep >= self.beep_threshold_db or edge >= self.edge_threshold,
+            "beep_score": round(beep, 2),
+            "edge_score": round(edge, 2),
+        }
@@ -0,0 +1,196 @@
+"""
+目標時間への合わせ込み - 対話を作り直さずに話速と行間で動画の長さを target_duration に合わせる
+
+音声長の予測（duration_predictor）を元に、
+1. 話速（speedScale）に掛ける係数を上下限の範囲で求める（全体で共通 / 話者ごと）
+2. それでも合わない場合は行間の無音の長さを上下限の範囲で調整する
+3. それでも長すぎる場合のみ、削るべきスライドと秒数を一覧にする（LLMでの短縮用）
+音声生成で適用した計画は data/<job_id>/duration_fit.json に保存し、動画作成で行間に使う。
+音声を生成せずに作成しただけの計画（/duration-fit）は duration_fit_preview.json に分けて保存する。
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from api.core.duration_predictor import LINE_GAP, predict_slide_duration, predict_total_duration
+
+FIT_MODE_GLOBAL = "global"  # 全話者に同じ係数を掛ける
+FIT_MODE_PER_SPEAKER = "per_speaker"  # 話者ごとに上下限で頭打ちにし、残りを他の話者で吸収する
+FIT_MODES = (FIT_MODE_GLOBAL, FIT_MODE_PER_SPEAKER)
+
+FILENAME = "duration_fit.json"
+PREVIEW_FILENAME = "duration_fit_preview.json"  # 適用前の計画（適用済みの計画を上書きしない）
+
+# 1スライドから削る時間の上限（スライドの発話時間に対する割合）
+MAX_TRIM_RATIO = 0.3
+# 二分探索の反復回数
+_ITERATIONS = 40
+
+
+def _bisect(func: Callable[[float], float], target: float, low: float, high: float, increasing: bool) -> float:
+    """単調な func について func(x) = target となる x を [low, high] から探す（範囲外なら端を返す）"""
+    for _ in range(_ITERATIONS):
+        mid = (low + high) / 2
+        if (func(mid) < target) == increasing:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+class DurationFitter:
+    """予測した行の長さから話速の係数と行間を求める"""
+
+    def __init__(
+        self,
+        min_speed: Optional[float] = None,
+        max_speed: Optional[float] = None,
+        min_gap: Optional[float] = None,
+        max_gap: Optional[float] = None,
+        tolerance: Optional[float] = None,
+        mode: str = FIT_MODE_GLOBAL
+    ):
+        if mode not in FIT_MODES:
+            raise ValueError(f"不明な合わせ込みモード: {mode}（{', '.join(FIT_MODES)} のいずれか）")
+        # 話者ごとの最終的な speedScale の上下限（聞き取りやすさの範囲）
+        self.min_speed = min_speed if min_speed is not None else float(os.getenv("DURATION_FIT_MIN_SPEED", "0.85"))
+        self.max_speed = max_speed if max_speed is not None else float(os.getenv("DURATION_FIT_MAX_SPEED", "1.3"))
+        # 行間の無音の上下限（秒）
+        self.min_gap = min_gap if min_gap is not None else float(os.getenv("DURATION_FIT_MIN_GAP", "0.1"))
+        self.max_gap = max_gap if max_gap is not None else float(os.getenv("DURATION_FIT_MAX_GAP", "0.5"))
+        # 目標時間との許容誤差（割合）
+        self.tolerance = tolerance if tolerance is not None else float(os.getenv("DURATION_FIT_TOLERANCE", "0.02"))
+        self.mode = mode
+
+    def status(self, duration: float, target_seconds: float) -> str:
+        """目標時間に対する判定（fitted / too_long / too_short）"""
+        if abs(duration - target_seconds) <= target_seconds * self.tolerance:
+            return "fitted"
+        return "too_long" if duration > target_seconds else "too_short"
+
+    def fit(
+        self,
+        prediction: Dict[str, Any],
+        target_seconds: float,
+        transition_type: str = "crossfade",
+        transition_duration: float = 0.4
+    ) -> Dict[str, Any]:
+        """AudioGenerator.predict_durations の結果から合わせ込みの計画を作成
+
+        行の長さは話速に反比例するものとして計算する（前後の無音も話速で伸縮する）
+        """
+        lines = prediction["lines"]
+        slide_order = [slide["slide"] for slide in prediction["slides"]]
+        base_speeds: Dict[str, float] = {}
+        for line in lines:
+            base_speeds.setdefault(line["speaker"], line.get("speed_scale") or 1.0)
+
+        def factors_for(scale: float) -> Dict[str, float]:
+            if self.mode == FIT_MODE_PER_SPEAKER:
+                return {
+                    speaker: min(max(base * scale, self.min_speed), self.max_speed) / base
+                    for speaker, base in base_speeds.items()
+                }
+            return {speaker: scale for speaker in base_speeds}
+
+        def slide_durations(factors: Dict[str, float], gap: float) -> Dict[Any, float]:
+            by_slide: Dict[Any, List[float]] = {slide: [] for slide in slide_order}
+            for line in lines:
+                by_slide.setdefault(line["slide"], []).append(line["duration"] / factors[line["speaker"]])
+            return {slide: predict_slide_duration(durations, gap) for slide, durations in by_slide.items()}
+
+        def total(factors: Dict[str, float], gap: float) -> float:
+            return predict_total_duration(
+                slide_durations(factors, gap).values(), transition_type, transition_duration
+            )
+
+        before = total(factors_for(1.0), LINE_GAP)
+
+        # 1. 話速の係数（係数が大きいほど短くなる）
+        if base_speeds:
+            if self.mode == FIT_MODE_PER_SPEAKER:
+                low = self.min_speed / max(base_speeds.values())
+                high = self.max_speed / min(base_speeds.values())
+            else:
+                # 全話者が上下限に収まる範囲
+                low = max(self.min_speed / base for base in base_speeds.values())
+                high = min(self.max_speed / base for base in base_speeds.values())
+                if low > high:
+                    low = high = 1.0
+            scale = _bisect(lambda x: total(factors_for(x), LINE_GAP), target_seconds, low, high, increasing=False)
+        else:
+            scale = 1.0
+        factors = factors_for(scale)
+        gap = LINE_GAP
+        after = total(factors, gap)
+
+        # 2. 行間の無音（話速だけで合わない場合）
+        if abs(after - target_seconds) > target_seconds * self.tolerance:
+            gap = _bisect(lambda x: total(factors, x), target_seconds, self.min_gap, self.max_gap, increasing=True)
+            after = total(factors, gap)
+
+        # 3. それでも長すぎる場合は削るスライドを選ぶ（発話の長いスライドから）
+        slides_to_trim = []
+        overshoot = after - target_seconds
+        if overshoot > target_seconds * self.tolerance:
+            durations = slide_durations(factors, gap)
+            speech = {slide: 0.0 for slide in slide_order}
+            for line in lines:
+                speech[line["slide"]] = speech.get(line["slide"], 0.0) + line["duration"] / factors[line["speaker"]]
+            remaining = overshoot
+            for slide in sorted(speech, key=speech.get, reverse=True):
+                if remaining <= 0:
+                    break
+                trim = min(speech[slide] * MAX_TRIM_RATIO, remaining)
+                if trim <= 0:
+                    continue
+                slides_to_trim.append({
+                    "slide": slide,
+                    "duration": round(durations[slide], 3),
+                    "trim_seconds": round(trim, 3),
+                })
+                remaining -= trim
+            order = {slide: index for index, slide in enumerate(slide_order)}
+            slides_to_trim.sort(key=lambda item: order.get(item["slide"], len(order)))
+
+        return {
+            "mode": self.mode,
+            "status": self.status(after, target_seconds),
+            "target_duration": round(target_seconds, 3),
+            "predicted_before": round(before, 3),
+            "predicted_after": round(after, 3),
+            # 話者ごとの speedScale に掛ける係数と、掛けた後の speedScale
+            "speed_factors": {speaker: round(factor, 4) for speaker, factor in factors.items()},
+            "speed_scales": {
+                speaker: round(base_speeds[speaker] * factor, 4) for speaker, factor in factors.items()
+            },
+            "line_gap": round(gap, 3),
+            "transition_type": transition_type,
+            "transition_duration": transition_duration,
+            "slides_to_trim": slides_to_trim,
+        }
+
+
+def duration_fit_path(base_dir: Path, job_id: str, preview: bool = False) -> Path:
+    return base_dir / "data" / job_id / (PREVIEW_FILENAME if preview else FILENAME)
+
+
+def save_duration_fit(base_dir: Path, job_id: str, plan: Dict[str, Any], preview: bool = False) -> None:
+    """合わせ込みの計画を保存（一時ファイルから置き換え、preview=True は適用前の計画）"""
+    path = duration_fit_path(base_dir, job_id, preview)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_duration_fit(base_dir: Path, job_id: str, preview: bool = False) -> Optional[Dict[str, Any]]:
+    """保存済みの計画を読み込み（なければ None）"""
+    path = duration_fit_path(base_dir, job_id, preview)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
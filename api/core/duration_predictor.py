@@ -0,0 +1,67 @@
+"""
+合成前の音声長の予測 - audio_query のモーラの長さから合成結果の長さを計算する
+
+VOICEVOXは音素ごとの長さ（子音・母音・ポーズ・前後の無音）を話速で割り、
+フレーム（24kHzで256サンプル）単位に丸めて合成する。audio_query には全音素の長さが
+含まれるため、同じ計算をすれば合成せずに出力の長さが分かる。
+動画の長さは narration_timeline と同じ規則（行間・スライド末尾の無音、転場の重なり）で積み上げる。
+"""
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# srcディレクトリをパスに追加
+sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
+
+# スライド構成（行間・末尾の余白・転場の重なり）は実際のタイムラインと同じ定義を使う
+from narration_timeline import LINE_GAP, SILENT_SLIDE_DURATION, SLIDE_TAIL, transition_overlap
+
+# VOICEVOXの音響特徴量のフレームレート（24000Hz / 256サンプル）
+FRAME_RATE = 24000 / 256
+
+
+def _to_frames(seconds: float, speed_scale: float) -> int:
+    return int(round(seconds / speed_scale * FRAME_RATE))
+
+
+def predict_query_duration(query: Dict[str, Any], params: Optional[Dict[str, Any]] = None) -> float:
+    """audio_query（と上書きする合成パラメータ）から合成結果の長さ（秒）を計算"""
+    if params:
+        query = {**query, **params}
+    speed_scale = query.get("speedScale") or 1.0
+
+    frames = _to_frames(query.get("prePhonemeLength", 0.1), speed_scale)
+    frames += _to_frames(query.get("postPhonemeLength", 0.1), speed_scale)
+    for accent_phrase in query.get("accent_phrases", []):
+        moras = list(accent_phrase.get("moras", []))
+        if accent_phrase.get("pause_mora"):
+            moras.append(accent_phrase["pause_mora"])
+        for mora in moras:
+            if mora.get("consonant_length") is not None:
+                frames += _to_frames(mora["consonant_length"], speed_scale)
+            frames += _to_frames(mora.get("vowel_length", 0.0), speed_scale)
+    return frames / FRAME_RATE
+
+
+def predict_slide_duration(line_durations: List[float], line_gap: float = LINE_GAP) -> float:
+    """スライド1枚の長さ（行 + 行間の無音 + 末尾の余白）"""
+    if not line_durations:
+        return SILENT_SLIDE_DURATION
+    return sum(line_durations) + line_gap * (len(line_durations) - 1) + SLIDE_TAIL
+
+
+def predict_total_duration(
+    slide_durations: Iterable[float],
+    transition_type: str = "crossfade",
+    transition_duration: float = 0.4
+) -> float:
+    """動画全体の長さ（転場でスライドが重なる分を差し引く）"""
+    total = 0.0
+    previous = None
+    for duration in slide_durations:
+        if previous is None:
+            total = duration
+        else:
+            total += duration - transition_overlap(transition_type, transition_duration, previous, duration)
+        previous = duration
+    return total
@@ -0,0 +1,90 @@
+"""
+フィルタバンク - ノッチフィルタとローパスフィルタをサンプリングレートごとに一度だけ設計する
+
+ビープ音用のノッチ（300〜500Hz）と高周波ノイズ用のローパス（10kHz）を
+二次セクション（SOS）の縦続接続にまとめ、1回の sosfiltfilt で適用する。
+"""
+import threading
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+from scipy import signal
+
+# 低周波ビープ音をターゲット（300-500Hz）
+NOTCH_FREQS = (300, 350, 400, 450, 500)
+# 低周波用に調整したQ値（低周波では少し広めに）
+NOTCH_Q = 20.0
+# カットオフ周波数：10kHz（音声の高域成分も保持）
+LOWPASS_CUTOFF = 10000
+# Butterworthフィルタの次数（次数を4に下げて自然な音質を維持）
+LOWPASS_ORDER = 4
+
+
+class FilterBank:
+    """サンプリングレートごとに設計済みのSOSフィルタを保持する"""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        notch_freqs: Sequence[float] = NOTCH_FREQS,
+        notch_q: float = NOTCH_Q,
+        lowpass_cutoff: float = LOWPASS_CUTOFF,
+        lowpass_order: int = LOWPASS_ORDER
+    ):
+        self.sample_rate = sample_rate
+        nyquist = sample_rate / 2
+
+        sections = [
+            signal.tf2sos(*signal.iirnotch(freq, notch_q, fs=sample_rate))
+            for freq in notch_freqs
+            if freq < nyquist
+        ]
+        self.notch_sos = np.vstack(sections) if sections else np.empty((0, 6))
+
+        if lowpass_cutoff < nyquist:
+            self.lowpass_sos = signal.butter(lowpass_order, lowpass_cutoff, btype="low", fs=sample_rate, output="sos")
+        else:
+            self.lowpass_sos = np.empty((0, 6))
+
+        # ノッチとローパスを縦続接続した1つのフィルタ
+        self.notch_lowpass_sos = np.vstack([self.notch_sos, self.lowpass_sos])
+        self._notch_lowpass_sos32 = self.notch_lowpass_sos.astype(np.float32)
+
+    def apply_notch_lowpass(self, audio_data: np.ndarray) -> np.ndarray:
+        """ノッチ＋ローパスをゼロ位相（前後両方向）で1パス適用（float32で処理）"""
+        if len(self.notch_lowpass_sos) == 0 or len(audio_data) == 0:
+            return np.asarray(audio_data, dtype=np.float32)
+        # sosfiltfilt のパディング長より短い音声はパディングを縮める
+        padlen = min(3 * (2 * len(self.notch_lowpass_sos) + 1), len(audio_data) - 1)
+        return signal.sosfiltfilt(
+            self._notch_lowpass_sos32, np.asarray(audio_data, dtype=np.float32), padlen=padlen
+        ).astype(np.float32)
+
+    def apply_lowpass(self, audio_data: np.ndarray) -> np.ndarray:
+        """ローパスのみを因果的（片方向）に適用（lfilter相当、境界で位相が変わらない）"""
+        if len(self.lowpass_sos) == 0:
+            return np.asarray(audio_data, dtype=np.float32)
+        return signal.sosfilt(
+            self.lowpass_sos.astype(np.float32), np.asarray(audio_data, dtype=np.float32)
+        ).astype(np.float32)
+
+
+_filter_banks: Dict[Tuple[int, Tuple[float, ...], float, float, int], FilterBank] = {}
+_filter_banks_lock = threading.Lock()
+
+
+def get_filter_bank(
+    sample_rate: int,
+    notch_freqs: Sequence[float] = NOTCH_FREQS,
+    notch_q: float = NOTCH_Q,
+    lowpass_cutoff: float = LOWPASS_CUTOFF,
+    lowpass_order: int = LOWPASS_ORDER
+) -> FilterBank:
+    """設定ごとに共有されるフィルタバンクを取得（設計はプロセス内で一度だけ）"""
+    key = (int(sample_rate), tuple(notch_freqs), notch_q, lowpass_cutoff, lowpass_order)
+    with _filter_banks_lock:
+        bank = _filter_banks.get(key)
+        if bank is None:
+            bank = FilterBank(int(sample_rate), notch_freqs, notch_q, lowpass_cutoff, lowpass_order)
+            _filter_banks[key] = bank
+        return bank
@@ -216,6 +216,8 @@ class JobProcessor:
             bgm_volume = 0.15
             transition_type = "crossfade"
             transition_duration = 0.4
+            render_engine = None
+            render_profile = None
             
             if video_settings_path.exists():
                 try:
@@ -226,6 +228,8 @@ class JobProcessor:
                         bgm_volume = video_settings.get("bgm_volume", 0.15)
                         transition_type = video_settings.get("transition_type", "crossfade")
                         transition_duration = video_settings.get("transition_duration", 0.4)
+                        render_engine = video_settings.get("render_engine")
+                        render_profile = video_settings.get("render_profile")
                 except Exception as e:
                     logger.warning(f"動画設定の読み込みエラー: {e}")
             
@@ -246,7 +250,9 @@ class JobProcessor:
                 bgm_path=bgm_path,
                 bgm_volume=bgm_volume,
                 transition_type=transition_type,
-                transition_duration=transition_duration
+                transition_duration=transition_duration,
+                render_engine=render_engine,
+                render_profile=render_profile
             )
             
             # データベースに状態を保存
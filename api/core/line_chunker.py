@@ -0,0 +1,109 @@
+"""
+長い行の分割合成 - 1行を文・読点の単位に分けて並列に合成し、一定の間を挟んで連結する
+
+VOICEVOXの合成時間とメモリは入力の長さに対して線形以上に増えるため、LLMが出力した
+長い行をそのまま送ると1リクエストが長時間エンジンを占有する。閾値を超える行だけを
+。！？ で、それでも長い文は 、 で分割し、チャンクごとに合成してから1つのWAVにまとめる。
+"""
+import io
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+import soundfile as sf
+
+# NFKC正規化後のテキストを分割するため半角の記号も含める
+SENTENCE_DELIMITERS = "。！？!?"
+CLAUSE_DELIMITERS = "、，,"
+
+# チャンク間の無音（秒）
+DEFAULT_CHUNK_PAUSE = 0.15
+# チャンク境界のクリック音を防ぐフェード（秒）
+CHUNK_EDGE_FADE = 0.005
+
+# 読み上げる文字（かな・漢字・英数字）を含まない断片は前のチャンクに付ける
+_SPEAKABLE = re.compile(r"\w")
+
+
+def get_chunk_max_chars(max_chars: Optional[int] = None) -> int:
+    """分割する行の長さの閾値（引数 > 環境変数 TTS_CHUNK_MAX_CHARS > 0=分割しない）"""
+    if max_chars is None:
+        max_chars = int(os.getenv("TTS_CHUNK_MAX_CHARS", "0"))
+    return max(0, max_chars)
+
+
+def get_chunk_pause(pause: Optional[float] = None) -> float:
+    """チャンク間の無音の長さ（引数 > 環境変数 TTS_CHUNK_PAUSE_MS > 150ms）"""
+    if pause is None:
+        pause_ms = os.getenv("TTS_CHUNK_PAUSE_MS")
+        pause = int(pause_ms) / 1000 if pause_ms else DEFAULT_CHUNK_PAUSE
+    return max(0.0, pause)
+
+
+def _split_after(text: str, delimiters: str) -> List[str]:
+    """区切り文字の直後で分割（連続する区切り文字は前の断片に含める）"""
+    escaped = re.escape(delimiters)
+    return re.findall(rf"[^{escaped}]*[{escaped}]+|[^{escaped}]+", text)
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """閾値を超える行を max_chars 文字以内のチャンクに分割
+
+    まず文末（。！？）で分け、それでも長い文は読点（、）で分ける。
+    短い断片は閾値の範囲で前後とまとめ、リクエスト数が増えすぎないようにする。
+    区切り文字のない長い断片はそのまま1チャンクになる
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+
+    pieces = []
+    for sentence in _split_after(text, SENTENCE_DELIMITERS):
+        if len(sentence) > max_chars:
+            pieces.extend(_split_after(sentence, CLAUSE_DELIMITERS))
+        else:
+            pieces.append(sentence)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and (len(chunks[-1]) + len(piece) <= max_chars or not _SPEAKABLE.search(piece)):
+            chunks[-1] += piece
+        else:
+            chunks.append(piece)
+    # 先頭が記号だけのチャンクは次のチャンクにまとめる
+    if len(chunks) > 1 and not _SPEAKABLE.search(chunks[0]):
+        chunks[1] = chunks[0] + chunks[1]
+        chunks.pop(0)
+    return chunks
+
+
+def concatenate_wav_chunks(parts: List[bytes], pause: float = DEFAULT_CHUNK_PAUSE) -> bytes:
+    """チャンクごとのWAVを一定の無音を挟んで連結し、1つのWAV（16bit PCM）にする"""
+    arrays = []
+    sample_rate = None
+    for wav_bytes in parts:
+        data, sr = sf.read(io.BytesIO(wav_bytes), dtype="float32")
+        if sample_rate is not None and sr != sample_rate:
+            raise ValueError(f"チャンクのサンプリングレートが一致しません: {sr} != {sample_rate}")
+        sample_rate = sr
+        arrays.append(data)
+
+    fade_len = int(sample_rate * CHUNK_EDGE_FADE)
+    silence = np.zeros((int(round(sample_rate * pause)),) + arrays[0].shape[1:], dtype=np.float32)
+    pieces = []
+    for i, data in enumerate(arrays):
+        n = min(fade_len, len(data) // 2)
+        if n > 0 and len(arrays) > 1:
+            data = data.copy()
+            ramp = np.linspace(0.0, 1.0, n, dtype=np.float32).reshape((-1,) + (1,) * (data.ndim - 1))
+            if i > 0:
+                data[:n] *= ramp
+            if i < len(arrays) - 1:
+                data[-n:] *= ramp[::-1]
+        if i > 0:
+            pieces.append(silence)
+        pieces.append(data)
+
+    buffer = io.BytesIO()
+    sf.write(buffer, np.concatenate(pieces), sample_rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
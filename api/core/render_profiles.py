@@ -0,0 +1,64 @@
+"""
+レンダリングプロファイル - 用途ごとの解像度・符号化設定・転場/BGMの有無をまとめた設定
+
+preview は編集中に対話の聞こえ方と見え方を確認するための低解像度・高速な出力で、
+最終出力（standard）を上書きしないよう別ファイルに書き出し、本番のレンダリングより先に実行する。
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+PROFILE_PREVIEW = "preview"
+PROFILE_STANDARD = "standard"
+PROFILE_ARCHIVAL = "archival"
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    name: str
+    max_size: Optional[Tuple[int, int]] = None  # 出力フレームの最大サイズ（None はスライド画像のまま）
+    preset: str = "faster"  # x264 のプリセット
+    video_bitrate: str = "1500k"
+    audio_bitrate: str = "192k"
+    still_fps: Optional[float] = None  # 静止区間のフレームレート（None は環境変数 VIDEO_STILL_FPS）
+    transitions: bool = True  # False の場合は転場なしで連結
+    bgm: bool = True  # False の場合はBGMを付けない
+    render_engine: Optional[str] = None  # 固定するレンダリングエンジン（None はリクエスト・環境変数に従う）
+    priority: int = 1  # 小さいほど先にレンダリングする
+    output_suffix: str = ""  # 出力ファイル名 <job_id><suffix>.mp4
+
+
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    PROFILE_PREVIEW: RenderProfile(
+        name=PROFILE_PREVIEW,
+        max_size=(640, 360),
+        preset="ultrafast",
+        video_bitrate="500k",
+        audio_bitrate="96k",
+        still_fps=1,
+        transitions=False,
+        bgm=False,
+        # 区間キャッシュにより、対話を編集したスライドだけを再エンコードする
+        render_engine="ffmpeg_segmented",
+        priority=0,
+        output_suffix="_preview",
+    ),
+    # 従来の設定
+    PROFILE_STANDARD: RenderProfile(name=PROFILE_STANDARD),
+    PROFILE_ARCHIVAL: RenderProfile(
+        name=PROFILE_ARCHIVAL,
+        preset="slow",
+        video_bitrate="4000k",
+        audio_bitrate="256k",
+        still_fps=0,
+        priority=2,
+    ),
+}
+
+
+def get_render_profile(name: Optional[str] = None) -> RenderProfile:
+    """レンダリングプロファイルを取得（引数 > 環境変数 VIDEO_RENDER_PROFILE > standard）"""
+    name = (name or os.getenv("VIDEO_RENDER_PROFILE") or PROFILE_STANDARD).lower()
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"不明なレンダリングプロファイル: {name}（{', '.join(RENDER_PROFILES)} のいずれか）")
+    return RENDER_PROFILES[name]
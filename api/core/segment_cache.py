@@ -0,0 +1,64 @@
+"""
+動画区間キャッシュ - ffmpeg_segmented で符号化したスライド・転場の区間を再利用する
+
+キーは区間の見た目を決める入力（画像の内容・フレーム数・解像度・fps・符号化パラメータ・
+転場とフェードアウトの位置）のハッシュで、1枚のスライドの対話を編集した場合や
+失敗後に再実行した場合は、入力が変わった区間だけを再エンコードすればよい。
+ナレーションは区間に含めず連結時に多重化するため、音声の変更はその行のスライドの
+長さ（フレーム数）が変わった区間にだけ影響する。
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from api.core.tts_cache import _FileCopyCache, _hash_payload
+
+# 区間の組み立て方（フィルタ）を変えた場合に古いキャッシュを使わないためのバージョン
+SEGMENT_FORMAT_VERSION = 1
+
+
+class SegmentCache(_FileCopyCache):
+    """エンコード済み区間（MP4）のコンテンツアドレス型キャッシュ"""
+
+    suffix = ".mp4"
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None):
+        if cache_dir is None:
+            cache_dir = Path(os.getenv("VIDEO_SEGMENT_CACHE_DIR", str(Path.cwd() / "cache" / "segments")))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("VIDEO_SEGMENT_CACHE_MAX_MB", "4096")) * 1024 * 1024
+        super().__init__(cache_dir, max_bytes)
+        # 画像のハッシュ（パス・更新時刻・サイズが同じ間は読み直さない）
+        self._image_hashes: Dict[Any, str] = {}
+        self._image_lock = threading.Lock()
+
+    def image_hash(self, path: str) -> str:
+        """画像ファイルの内容のハッシュ"""
+        stat = os.stat(path)
+        memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._image_lock:
+            cached = self._image_hashes.get(memo_key)
+        if cached:
+            return cached
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        value = digest.hexdigest()
+        with self._image_lock:
+            self._image_hashes[memo_key] = value
+        return value
+
+    @staticmethod
+    def make_key(segment: Dict[str, Any]) -> str:
+        """FFmpegVideoCreator.segment_signature の内容からキャッシュキーを生成"""
+        return _hash_payload({"version": SEGMENT_FORMAT_VERSION, **segment})
+
+
+def get_segment_cache(base_dir: Path) -> Optional[SegmentCache]:
+    """区間キャッシュを取得（環境変数 VIDEO_SEGMENT_CACHE_ENABLED=0 で無効）"""
+    if os.getenv("VIDEO_SEGMENT_CACHE_ENABLED", "1") == "0":
+        return None
+    return SegmentCache(Path(os.getenv("VIDEO_SEGMENT_CACHE_DIR", str(base_dir / "cache" / "segments"))))
@@ -0,0 +1,113 @@
+"""
+VOICEVOXスタイルのウォームアップ - 使用するスタイルのモデルを事前に読み込む
+
+VOICEVOXはスタイルごとのモデルを初回合成時に読み込むため、アップロード時点で
+分かっているスタイルを先に初期化しておき、音声生成中に読み込み待ちが発生しないようにする。
+エンジンごとにどのスタイルが読み込み済みかを記録し、システム状態APIで公開する。
+複数のエンジンを使う場合は、どのエンジンに振り分けられてもよいよう全エンジンで初期化する。
+"""
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+# srcディレクトリをパスに追加
+sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
+
+from voicevox_client import get_client, get_voicevox_urls
+
+STATE_WARMING = "warming"
+STATE_WARM = "warm"
+STATE_FAILED = "failed"
+
+
+class SpeakerWarmup:
+    """エンジン（URL）× スタイルIDごとのウォームアップ状態を管理"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        # ウォームアップ中のスタイルの完了待ち用
+        self._events: Dict[tuple, threading.Event] = {}
+
+    def _set_state(self, engine_url: str, style_id: int, state: str, **info) -> None:
+        with self._lock:
+            self._states.setdefault(engine_url, {})[style_id] = {
+                "state": state,
+                "updated_at": datetime.now().isoformat(),
+                **info,
+            }
+
+    def _warm_one(self, engine_url: str, style_id: int) -> bool:
+        """1スタイルを初期化（他のスレッドが初期化中なら完了を待つ）"""
+        key = (engine_url, style_id)
+        with self._lock:
+            event = self._events.get(key)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._events[key] = event
+        if not owner:
+            event.wait()
+            return self.is_warm(style_id, engine_url)
+
+        # 振り分けを介さず、このエンジンに直接送る
+        client = get_client(engine_url)
+        try:
+            # エンジンの再起動で読み込み状態が消えている場合があるため毎回確認する
+            if client.is_initialized_speaker(style_id):
+                self._set_state(engine_url, style_id, STATE_WARM, seconds=0.0)
+                return True
+            self._set_state(engine_url, style_id, STATE_WARMING)
+            start = time.time()
+            client.initialize_speaker(style_id)
+            elapsed = round(time.time() - start, 2)
+            self._set_state(engine_url, style_id, STATE_WARM, seconds=elapsed)
+            print(f"VOICEVOXスタイル {style_id} を初期化しました（{elapsed}秒, {engine_url}）")
+            return True
+        except Exception as e:
+            self._set_state(engine_url, style_id, STATE_FAILED, error=str(e))
+            print(f"VOICEVOXスタイル {style_id} の初期化エラー（{engine_url}）: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._events.pop(key, None)
+            event.set()
+
+    def warm_up(
+        self,
+        style_ids: Iterable[int],
+        engine_urls: Union[str, Iterable[str], None] = None
+    ) -> Dict[int, bool]:
+        """スタイルを初期化（同期、読み込み済みのスタイルはすぐに戻る）
+
+        engine_urls を省略すると VOICEVOX_URL の全エンジンが対象。
+        戻り値はスタイルIDごとの成否（全エンジンで初期化できた場合に True）
+        """
+        if engine_urls is None or isinstance(engine_urls, str):
+            engine_urls = get_voicevox_urls(engine_urls)
+        style_ids = list(dict.fromkeys(style_ids))
+        results = {style_id: True for style_id in style_ids}
+        for engine_url in engine_urls:
+            for style_id in style_ids:
+                results[style_id] = self._warm_one(engine_url.rstrip("/"), style_id) and results[style_id]
+        return results
+
+    def is_warm(self, style_id: int, engine_url: Optional[str] = None) -> bool:
+        engine_url = (engine_url or get_voicevox_urls()[0]).rstrip("/")
+        with self._lock:
+            return self._states.get(engine_url, {}).get(style_id, {}).get("state") == STATE_WARM
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """エンジンごとのスタイルの状態（システム状態API用）"""
+        with self._lock:
+            return {
+                engine_url: {str(style_id): dict(info) for style_id, info in styles.items()}
+                for engine_url, styles in self._states.items()
+            }
+
+
+# アプリ全体で共有するインスタンス
+speaker_warmup = SpeakerWarmup()
@@ -0,0 +1,212 @@
+"""
+高速スペクトルゲート - 1回のSTFTで2段階のノイズゲートを適用する
+
+noisereduce を2回呼ぶ従来の処理（定常ゲート → 非定常ゲート）と同じ考え方で、
+STFT/ISTFTを1回にまとめ、定常ノイズのプロファイルは話者ごとに推定してキャッシュする。
+"""
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+from scipy import signal
+from scipy.ndimage import uniform_filter1d
+
+# ノイズ除去モード
+DENOISE_MODE_NOISEREDUCE = "noisereduce"  # 従来の2段階noisereduce
+DENOISE_MODE_FAST = "fast"  # 1回のSTFTで2段階ゲートを適用
+DENOISE_MODES = (DENOISE_MODE_NOISEREDUCE, DENOISE_MODE_FAST)
+
+# これより短い音声から推定したプロファイルはキャッシュしない（静かなフレームが少なく推定が不安定なため）
+MIN_PROFILE_SECONDS = 1.0
+
+
+def get_denoise_mode(mode: Optional[str] = None) -> str:
+    """ノイズ除去モードを取得（引数 > 環境変数 AUDIO_DENOISE_MODE > noisereduce）"""
+    mode = (mode or os.getenv("AUDIO_DENOISE_MODE") or DENOISE_MODE_NOISEREDUCE).lower()
+    if mode not in DENOISE_MODES:
+        raise ValueError(f"不明なノイズ除去モード: {mode}（{', '.join(DENOISE_MODES)} のいずれか）")
+    return mode
+
+
+def _smoothing_kernel(n_grad_freq: int, n_grad_time: int) -> np.ndarray:
+    """マスク平滑化用の三角窓カーネル（noisereduceと同じ形）"""
+    freq = np.concatenate([
+        np.linspace(0, 1, n_grad_freq + 1, endpoint=False),
+        np.linspace(1, 0, n_grad_freq + 2),
+    ])[1:-1]
+    time = np.concatenate([
+        np.linspace(0, 1, n_grad_time + 1, endpoint=False),
+        np.linspace(1, 0, n_grad_time + 2),
+    ])[1:-1]
+    kernel = np.outer(freq, time)
+    return (kernel / np.sum(kernel)).astype(np.float32)
+
+
+class FastSpectralGate:
+    """1回のSTFTで定常ゲートと非定常ゲートを適用するスペクトルゲート
+
+    パラメータは従来の2段階noisereduceの設定に合わせている。
+    """
+
+    def __init__(
+        self,
+        n_fft: int = 2048,
+        hop_length: int = 512,
+        stationary_prop_decrease: float = 0.85,
+        stationary_n_std: float = 1.5,
+        stationary_freq_smooth_hz: float = 200,
+        stationary_time_smooth_ms: float = 50,
+        nonstationary_prop_decrease: float = 0.5,
+        nonstationary_thresh: float = 2.0,
+        nonstationary_slope: float = 10.0,
+        nonstationary_time_constant_s: float = 2.0,
+        nonstationary_freq_smooth_hz: float = 800,
+        nonstationary_time_smooth_ms: float = 150,
+    ):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.stationary_prop_decrease = stationary_prop_decrease
+        self.stationary_n_std = stationary_n_std
+        self.stationary_freq_smooth_hz = stationary_freq_smooth_hz
+        self.stationary_time_smooth_ms = stationary_time_smooth_ms
+        self.nonstationary_prop_decrease = nonstationary_prop_decrease
+        self.nonstationary_thresh = nonstationary_thresh
+        self.nonstationary_slope = nonstationary_slope
+        self.nonstationary_time_constant_s = nonstationary_time_constant_s
+        self.nonstationary_freq_smooth_hz = nonstationary_freq_smooth_hz
+        self.nonstationary_time_smooth_ms = nonstationary_time_smooth_ms
+        self._kernels: Dict[tuple, np.ndarray] = {}
+
+    def _stft(self, audio_data: np.ndarray, sr: int) -> np.ndarray:
+        _, _, spec = signal.stft(
+            audio_data, fs=sr, window="hann", nperseg=self.n_fft,
+            noverlap=self.n_fft - self.hop_length, boundary="even", padded=True
+        )
+        return spec
+
+    def _kernel(self, sr: int, freq_smooth_hz: float, time_smooth_ms: float) -> np.ndarray:
+        key = (sr, freq_smooth_hz, time_smooth_ms)
+        kernel = self._kernels.get(key)
+        if kernel is None:
+            n_grad_freq = max(1, int(freq_smooth_hz / (sr / self.n_fft)))
+            n_grad_time = max(1, int(time_smooth_ms / (self.hop_length / sr * 1000)))
+            kernel = _smoothing_kernel(n_grad_freq, n_grad_time)
+            self._kernels[key] = kernel
+        return kernel
+
+    def estimate_noise_profile(self, audio_data: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
+        """音声の静かなフレーム（前後の無音など）から周波数ごとのノイズ統計を推定"""
+        magnitude = np.abs(self._stft(audio_data, sr))
+        mag_db = 20 * np.log10(np.maximum(magnitude, 1e-10))
+        # エネルギーの小さい20%のフレームをノイズとみなす（最低でも数フレーム）
+        frame_energy = np.sum(magnitude ** 2, axis=0)
+        n_frames = max(4, int(len(frame_energy) * 0.2))
+        quiet = np.argsort(frame_energy)[:n_frames]
+        noise_db = mag_db[:, quiet]
+        return {
+            "mean_db": noise_db.mean(axis=1).astype(np.float32),
+            "std_db": noise_db.std(axis=1).astype(np.float32),
+        }
+
+    def apply(
+        self,
+        audio_data: np.ndarray,
+        sr: int,
+        noise_profile: Optional[Dict[str, np.ndarray]] = None
+    ) -> np.ndarray:
+        """2段階ゲートを適用（noise_profile 未指定時はこの音声から推定）"""
+        n_samples = len(audio_data)
+        spec = self._stft(audio_data, sr)
+        magnitude = np.abs(spec)
+
+        if noise_profile is None:
+            noise_profile = self.estimate_noise_profile(audio_data, sr)
+
+        # ステップ1: 定常ノイズ（ビープ音）のゲート（ノイズプロファイルとの比較）
+        mag_db = 20 * np.log10(np.maximum(magnitude, 1e-10))
+        threshold = noise_profile["mean_db"] + noise_profile["std_db"] * self.stationary_n_std
+        mask1 = (mag_db > threshold[:, None]).astype(np.float32)
+        mask1 = signal.fftconvolve(
+            mask1, self._kernel(sr, self.stationary_freq_smooth_hz, self.stationary_time_smooth_ms), mode="same"
+        )
+        gain = mask1 * self.stationary_prop_decrease + (1.0 - self.stationary_prop_decrease)
+
+        # ステップ2: 非定常ノイズのゲート（ステップ1適用後の振幅を時間方向に平滑化した値との比較）
+        magnitude = magnitude * gain
+        time_frames = max(1, int(self.nonstationary_time_constant_s * sr / self.hop_length))
+        smoothed = uniform_filter1d(magnitude, size=time_frames, axis=1, mode="nearest")
+        above = (magnitude - smoothed) / np.maximum(smoothed, 1e-10)
+        mask2 = 1.0 / (1.0 + np.exp(-self.nonstationary_slope * (above - self.nonstationary_thresh)))
+        mask2 = signal.fftconvolve(
+            mask2.astype(np.float32),
+            self._kernel(sr, self.nonstationary_freq_smooth_hz, self.nonstationary_time_smooth_ms),
+            mode="same"
+        )
+        gain = gain * (mask2 * self.nonstationary_prop_decrease + (1.0 - self.nonstationary_prop_decrease))
+
+        _, denoised = signal.istft(
+            spec * gain, fs=sr, window="hann", nperseg=self.n_fft,
+            noverlap=self.n_fft - self.hop_length, boundary=True
+        )
+        return denoised[:n_samples].astype(np.float32)
+
+
+class NoiseProfileCache:
+    """話者ごとのノイズプロファイルのキャッシュ（メモリ＋ディスク）
+
+    同じ話者（スタイル）の音声はエンジン由来のノイズがほぼ同じため、
+    最初の1行で推定したプロファイルをその後の行・ジョブで使い回す。
+    キーには話者・エンジンのバージョン・後処理のバージョンを含め、後処理を変えた場合は作り直す。
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """
+        :param cache_dir: 保存先（未指定の場合はメモリのみ、後処理のプロセスにも明示的に渡すこと）
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._memory: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{re.sub(r'[^A-Za-z0-9._-]', '_', key)}.npz"
+
+    def get_or_estimate(
+        self,
+        key: str,
+        gate: FastSpectralGate,
+        audio_data: np.ndarray,
+        sr: int
+    ) -> Dict[str, np.ndarray]:
+        """キャッシュ済みのプロファイルを返す（なければこの音声から推定して登録）"""
+        key = f"{key}_{sr}_{gate.n_fft}"
+        with self._lock:
+            profile = self._memory.get(key)
+        if profile is not None:
+            return profile
+
+        path = self._path(key) if self.cache_dir is not None else None
+        try:
+            if path is None:
+                raise FileNotFoundError(key)
+            with np.load(path) as data:
+                profile = {"mean_db": data["mean_db"], "std_db": data["std_db"]}
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            profile = gate.estimate_noise_profile(audio_data, sr)
+            if len(audio_data) < MIN_PROFILE_SECONDS * sr:
+                # 短い音声の推定値で以後の全ジョブを処理しないよう、この音声にだけ使う
+                return profile
+            if path is not None:
+                try:
+                    self.cache_dir.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+                    np.savez(tmp_path, **profile)
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    print(f"ノイズプロファイルの保存エラー: {e}")
+
+        with self._lock:
+            self._memory[key] = profile
+        return profile
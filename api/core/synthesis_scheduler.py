@@ -0,0 +1,71 @@
+"""
+音声合成のスケジューラ - VOICEVOXへのリクエスト順序を決める
+
+対話の順（speaker1, speaker2, speaker1, ...）のまま合成するとリクエストごとに
+スタイルが切り替わり、エンジン側でモデルの初期化やキャッシュの入れ替えが発生する。
+grouped モードでは同じスタイルの行をまとめて合成する（出力ファイル名は変わらない）。
+"""
+import os
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+SCHEDULE_GROUPED = "grouped"  # スタイルごとにまとめて合成
+SCHEDULE_INTERLEAVED = "interleaved"  # 対話の順に合成（従来の順序）
+SCHEDULES = (SCHEDULE_GROUPED, SCHEDULE_INTERLEAVED)
+
+
+def get_schedule(schedule: Optional[str] = None) -> str:
+    """合成順序を取得（引数 > 環境変数 VOICEVOX_SCHEDULE > grouped）"""
+    schedule = (schedule or os.getenv("VOICEVOX_SCHEDULE") or SCHEDULE_GROUPED).lower()
+    if schedule not in SCHEDULES:
+        raise ValueError(f"不明な合成順序: {schedule}（{', '.join(SCHEDULES)} のいずれか）")
+    return schedule
+
+
+class SynthesisScheduler:
+    """同時実行数の範囲で次に投入するタスクを選ぶ
+
+    - interleaved: 対話の順に投入する
+    - grouped: 最初に登場した順のスタイルごとにまとめて投入する。
+      per_style_concurrency を指定すると1スタイルあたりの同時実行数を制限し、
+      余ったスロットで次のスタイルを並行して合成する
+    """
+
+    def __init__(
+        self,
+        tasks: List[Dict[str, Any]],
+        max_in_flight: int,
+        schedule: str = SCHEDULE_GROUPED,
+        per_style_concurrency: int = 0
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.schedule = schedule
+        self.per_style_concurrency = per_style_concurrency if schedule == SCHEDULE_GROUPED else 0
+        self._in_flight: Dict[Any, int] = {}
+        self._total_in_flight = 0
+
+        # スタイルごとの待ち行列（interleaved は1つの行列にまとめる）
+        self._queues: "OrderedDict[Any, Deque[Dict[str, Any]]]" = OrderedDict()
+        for task in tasks:
+            key = task["speaker_id"] if schedule == SCHEDULE_GROUPED else None
+            self._queues.setdefault(key, deque()).append(task)
+
+    def next_tasks(self) -> List[Dict[str, Any]]:
+        """今投入できるタスクを取り出す"""
+        selected = []
+        for key, queue in self._queues.items():
+            while queue and self._total_in_flight < self.max_in_flight:
+                if self.per_style_concurrency and self._in_flight.get(key, 0) >= self.per_style_concurrency:
+                    break
+                selected.append(queue.popleft())
+                self._in_flight[key] = self._in_flight.get(key, 0) + 1
+                self._total_in_flight += 1
+            if self._total_in_flight >= self.max_in_flight:
+                break
+        return selected
+
+    def task_done(self, task: Dict[str, Any]) -> None:
+        """合成が完了したタスクを通知（スロットを空ける）"""
+        key = task["speaker_id"] if self.schedule == SCHEDULE_GROUPED else None
+        self._in_flight[key] -= 1
+        self._total_in_flight -= 1
@@ -0,0 +1,241 @@
+"""
+音声合成キャッシュ - ジョブを横断して合成済み音声・音声クエリを再利用する
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def normalize_text(text: str) -> str:
+    """キャッシュキー用にテキストを正規化（NFKC・前後空白除去・空白の畳み込み）"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def _hash_payload(payload: Dict[str, Any]) -> str:
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class _FileLRUCache:
+    """ファイル単位のサイズ上限付きLRUキャッシュ（LRUの順序はファイルの更新時刻で管理）"""
+
+    suffix = ""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def _touch(self, entry: Path) -> None:
+        # LRU用に更新時刻を更新
+        os.utime(entry, None)
+
+    def _store(self, key: str, write_func) -> None:
+        """一時ファイルに書き出してからアトミックに登録"""
+        entry = self._entry_path(key)
+        if entry.exists():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry.with_name(f"{entry.name}.{threading.get_ident()}.tmp")
+        try:
+            write_func(tmp_path)
+            os.replace(tmp_path, entry)
+        except Exception as e:
+            print(f"キャッシュ登録エラー ({self.cache_dir}): {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total_bytes()
+            else:
+                self._total_bytes += entry.stat().st_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan_total_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.cache_dir.glob(f"*/*{self.suffix}"))
+
+    def _evict(self) -> None:
+        """更新時刻の古いものから上限の90%以下になるまで削除（ロック取得済みで呼ぶ）"""
+        entries = []
+        for p in self.cache_dir.glob(f"*/*{self.suffix}"):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        self._total_bytes = total
+        if removed:
+            print(f"キャッシュ ({self.cache_dir}): {removed} 件を削除しました（{total / 1024 / 1024:.1f}MB）")
+
+
+class _FileCopyCache(_FileLRUCache):
+    """ファイルをそのまま登録・取り出すキャッシュ"""
+
+    def contains(self, key: str) -> bool:
+        return self._entry_path(key).exists()
+
+    def get(self, key: str, dest: Path) -> bool:
+        """キャッシュにヒットした場合は dest にハードリンク（不可ならコピー）して True を返す"""
+        entry = self._entry_path(key)
+        if not entry.exists():
+            return False
+        try:
+            self._touch(entry)
+            dest = Path(dest)
+            if dest.exists() or dest.is_symlink():
+                dest.unlink()
+            try:
+                os.link(entry, dest)
+            except OSError:
+                # 別ファイルシステム等でリンクできない場合はコピー
+                shutil.copy2(entry, dest)
+            return True
+        except FileNotFoundError:
+            # 取得中に追い出された場合はミス扱い
+            return False
+
+    def put(self, key: str, src: Path) -> None:
+        """ファイルをキャッシュに登録（コピーして登録するため src はその後変更してよい）"""
+        self._store(key, lambda tmp_path: shutil.copyfile(src, tmp_path))
+
+
+class TTSCache(_FileCopyCache):
+    """合成済み音声のコンテンツアドレス型キャッシュ
+
+    キーは正規化したテキスト・スピーカーID・エンジンバージョン・合成パラメータの
+    ハッシュで、同じ内容の行であればジョブが違ってもキャッシュにヒットする。
+    """
+
+    suffix = ".wav"
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None):
+        if cache_dir is None:
+            cache_dir = Path(os.getenv("TTS_CACHE_DIR", str(Path.cwd() / "cache" / "tts")))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("TTS_CACHE_MAX_MB", "2048")) * 1024 * 1024
+        super().__init__(cache_dir, max_bytes)
+
+    normalize_text = staticmethod(normalize_text)
+
+    @staticmethod
+    def make_key(
+        text: str,
+        speaker_id: int,
+        engine_version: str,
+        params: Dict[str, Any],
+        extra: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """キャッシュキーを生成"""
+        return _hash_payload({
+            "text": normalize_text(text),
+            "speaker": speaker_id,
+            "engine_version": engine_version,
+            "params": params,
+            "extra": extra or {},
+        })
+
+
+class AudioQueryCache(_FileLRUCache):
+    """audio_query の結果（アクセント句・モーラ）のキャッシュ
+
+    audio_query の内容はテキストとスピーカーのみで決まるため、話速や抑揚などの
+    パラメータを変えて再合成する場合はテキスト解析を省略できる。
+    """
+
+    suffix = ".json"
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_bytes: Optional[int] = None,
+        max_memory_entries: Optional[int] = None,
+    ):
+        if cache_dir is None:
+            cache_dir = Path(os.getenv("AUDIO_QUERY_CACHE_DIR", str(Path.cwd() / "cache" / "audio_query")))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("AUDIO_QUERY_CACHE_MAX_MB", "256")) * 1024 * 1024
+        if max_memory_entries is None:
+            max_memory_entries = int(os.getenv("AUDIO_QUERY_CACHE_MEMORY_ENTRIES", "2048"))
+        super().__init__(cache_dir, max_bytes)
+        # ワーカースレッドから並行して参照されるため、メモリ上のLRUも self._lock で保護する
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            query = self._memory.get(key)
+            if query is not None:
+                self._memory.move_to_end(key)
+            return query
+
+    def _memory_put(self, key: str, query: Dict[str, Any]) -> None:
+        if self.max_memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = query
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def make_key(text: str, speaker_id: int, engine_version: str) -> str:
+        return _hash_payload({
+            "text": normalize_text(text),
+            "speaker": speaker_id,
+            "engine_version": engine_version,
+        })
+
+    def get(self, text: str, speaker_id: int, engine_version: str) -> Optional[Dict[str, Any]]:
+        """キャッシュされたクエリを取得（呼び出し側で変更してよいようにコピーを返す）"""
+        key = self.make_key(text, speaker_id, engine_version)
+        query = self._memory_get(key)
+        if query is None:
+            entry = self._entry_path(key)
+            try:
+                with open(entry, "r", encoding="utf-8") as f:
+                    query = json.load(f)
+                self._touch(entry)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            self._memory_put(key, query)
+        return copy.deepcopy(query)
+
+    def put(self, text: str, speaker_id: int, engine_version: str, query: Dict[str, Any]) -> None:
+        key = self.make_key(text, speaker_id, engine_version)
+        self._memory_put(key, copy.deepcopy(query))
+
+        def write(tmp_path: Path) -> None:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(query, f, ensure_ascii=False)
+
+        self._store(key, write)
@@ -1,11 +1,34 @@
+import os
 import sys
+import uuid
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # srcディレクトリをパスに追加
 sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
 
 from dialogue_video_creator import DialogueVideoCreator
+from ffmpeg_video_creator import FFmpegVideoCreator, is_ffmpeg_available
+from api.core.async_worker import render_gate
+from api.core.audio_manifest import AudioManifest
+from api.core.duration_fitter import load_duration_fit
+from api.core.duration_predictor import LINE_GAP
+from api.core.render_profiles import get_render_profile
+from api.core.segment_cache import get_segment_cache
+
+RENDER_ENGINE_MOVIEPY = "moviepy"  # moviepyでフレームごとに合成（従来の方式）
+RENDER_ENGINE_FFMPEG = "ffmpeg"  # ffmpegのフィルタグラフで直接レンダリング（静止画スライド向け）
+RENDER_ENGINE_FFMPEG_SEGMENTED = "ffmpeg_segmented"  # スライド・転場の区間ごとに並列エンコードして連結
+RENDER_ENGINES = (RENDER_ENGINE_MOVIEPY, RENDER_ENGINE_FFMPEG, RENDER_ENGINE_FFMPEG_SEGMENTED)
+
+
+def get_render_engine(render_engine: Optional[str] = None) -> str:
+    """レンダリングエンジンを取得（引数 > 環境変数 VIDEO_RENDER_ENGINE > moviepy）"""
+    render_engine = (render_engine or os.getenv("VIDEO_RENDER_ENGINE") or RENDER_ENGINE_MOVIEPY).lower()
+    if render_engine not in RENDER_ENGINES:
+        raise ValueError(f"不明なレンダリングエンジン: {render_engine}（{', '.join(RENDER_ENGINES)} のいずれか）")
+    return render_engine
+
 
 class VideoCreator:
     def __init__(self, job_id: str, base_dir: Path):
@@ -23,9 +46,16 @@ class VideoCreator:
         bgm_path: Optional[str] = None,
         bgm_volume: float = 0.15,
         transition_type: str = "crossfade",
-        transition_duration: float = 0.4
+        transition_duration: float = 0.4,
+        render_engine: Optional[str] = None,
+        render_profile: Optional[str] = None
     ) -> str:
-        """動画を作成"""
+        """動画を作成（render_profile で解像度・符号化設定・転場/BGMの有無と出力先が変わる）"""
+        profile = get_render_profile(render_profile)
+        if not profile.transitions:
+            transition_type = "none"
+        if not profile.bgm:
+            bgm_enabled = False
         
         # スライド画像のパスを取得
         image_paths = []
@@ -44,29 +74,12 @@ class VideoCreator:
         if not image_paths:
             raise Exception("スライド画像が見つかりません")
         
-        # 音声ファイル情報を構築
-        dialogue_audio_info = {}
-        
-        for i, image_path in enumerate(image_paths):
-            slide_num = int(Path(image_path).stem.split("_")[1])
-            slide_key = f"slide_{slide_num}"
-            dialogue_audio_info[slide_key] = []
-            
-            # 該当するスライドの音声ファイルを探す
-            audio_files = sorted(self.audio_dir.glob(f"slide_{slide_num:03d}_*_*.wav"))
-            
-            print(f"スライド {slide_num} ({slide_key}): 音声ファイル {len(audio_files)} 個見つかりました")
-            
-            for audio_file in audio_files:
-                # ファイル名から話者を特定
-                parts = audio_file.stem.split("_")
-                if len(parts) >= 4:
-                    speaker = parts[3]
-                    dialogue_audio_info[slide_key].append({
-                        "speaker": speaker,
-                        "audio_path": str(audio_file)
-                    })
-                    print(f"  - {audio_file.name}: speaker={speaker}")
+        # 音声ファイル情報を構築（マニフェストがあればディレクトリを走査しない）
+        manifest = AudioManifest(self.audio_dir)
+        if manifest.exists():
+            dialogue_audio_info = self._audio_info_from_manifest(manifest, image_paths)
+        else:
+            dialogue_audio_info = self._audio_info_from_files(image_paths)
         
         # BGMパスの解決
         resolved_bgm_path = None
@@ -79,7 +92,6 @@ class VideoCreator:
                 bgm_file = bgm_lib_dir / bgm_path
                 if not bgm_file.exists():
                     # 環境変数からも試す
-                    import os
                     env_bgm = os.getenv("VIDEO_BGM_PATH")
                     if env_bgm and Path(env_bgm).exists():
                         bgm_file = Path(env_bgm)
@@ -90,19 +102,106 @@ class VideoCreator:
             else:
                 print(f"警告: BGMファイルが見つかりません: {bgm_path}")
         
-        # 動画作成
-        creator = DialogueVideoCreator(
-            bgm_path=resolved_bgm_path if bgm_enabled else None,
-            bgm_volume=bgm_volume
-        )
-        output_path = self.output_dir / f"{self.job_id}.mp4"
+        # 目標時間に合わせて音声を生成した場合は、計画どおりの行間で並べる
+        line_gap = LINE_GAP
+        duration_fit = load_duration_fit(self.base_dir, self.job_id)
+        if duration_fit and duration_fit.get("applied"):
+            line_gap = duration_fit["line_gap"]
+            print(f"目標時間への合わせ込みを適用: 行間 {line_gap}秒")
+        
+        # 動画作成（ffmpegが見つからない場合は moviepy で作成）
+        render_engine = get_render_engine(profile.render_engine or render_engine)
+        if render_engine != RENDER_ENGINE_MOVIEPY and not is_ffmpeg_available():
+            print("警告: ffmpegが見つからないため moviepy で動画を作成します")
+            render_engine = RENDER_ENGINE_MOVIEPY
+        print(f"レンダリングエンジン: {render_engine} プロファイル: {profile.name}")
+        if render_engine == RENDER_ENGINE_MOVIEPY:
+            creator = DialogueVideoCreator(
+                bgm_path=resolved_bgm_path if bgm_enabled else None,
+                bgm_volume=bgm_volume,
+                line_gap=line_gap,
+                max_size=profile.max_size,
+                preset=profile.preset,
+                video_bitrate=profile.video_bitrate,
+                audio_bitrate=profile.audio_bitrate
+            )
+        else:
+            creator = FFmpegVideoCreator(
+                bgm_path=resolved_bgm_path if bgm_enabled else None,
+                bgm_volume=bgm_volume,
+                line_gap=line_gap,
+                segmented=render_engine == RENDER_ENGINE_FFMPEG_SEGMENTED,
+                # 入力が変わっていない区間は前回のエンコード結果を再利用する
+                segment_cache=get_segment_cache(self.base_dir) if render_engine == RENDER_ENGINE_FFMPEG_SEGMENTED else None,
+                still_fps=profile.still_fps,
+                max_size=profile.max_size,
+                preset=profile.preset,
+                video_bitrate=profile.video_bitrate,
+                audio_bitrate=profile.audio_bitrate
+            )
+        output_path = self.output_dir / f"{self.job_id}{profile.output_suffix}.mp4"
+        # 同じジョブのレンダリングが重なっても互いの出力を壊さないよう、一時ファイルに書き出してから置き換える
+        temp_output_path = self.output_dir / f"{self.job_id}{profile.output_suffix}.{uuid.uuid4().hex}.part.mp4"
+
+        # 同時に実行するレンダリング数を制限し、プレビューを本番のレンダリングより先に通す
+        try:
+            with render_gate.slot(profile.priority):
+                creator.create_dialogue_video(
+                    image_paths,
+                    dialogue_audio_info,
+                    str(temp_output_path),
+                    transition_type=transition_type,
+                    transition_duration=transition_duration
+                )
+            os.replace(temp_output_path, output_path)
+        finally:
+            temp_output_path.unlink(missing_ok=True)
+
+        return str(output_path)
+
+    def _audio_info_from_manifest(self, manifest: AudioManifest, image_paths: List[str]) -> Dict[str, List[Dict]]:
+        """音声マニフェストからスライドごとの音声情報を構築"""
+        entries_by_slide = manifest.entries_by_slide()
+        dialogue_audio_info = {}
+        
+        for image_path in image_paths:
+            slide_num = int(Path(image_path).stem.split("_")[1])
+            slide_key = f"slide_{slide_num}"
+            dialogue_audio_info[slide_key] = [
+                {
+                    "speaker": entry["speaker"],
+                    "audio_path": str(self.audio_dir / entry["file"]),
+                    "duration": entry.get("duration"),
+                }
+                for entry in entries_by_slide.get(slide_num, [])
+            ]
+            print(f"スライド {slide_num} ({slide_key}): 音声 {len(dialogue_audio_info[slide_key])} 行（マニフェスト）")
+        
+        return dialogue_audio_info
+    
+    def _audio_info_from_files(self, image_paths: List[str]) -> Dict[str, List[Dict]]:
+        """音声ファイル名からスライドごとの音声情報を構築（マニフェストがない旧ジョブ用）"""
+        dialogue_audio_info = {}
         
-        creator.create_dialogue_video(
-            image_paths,
-            dialogue_audio_info,
-            str(output_path),
-            transition_type=transition_type,
-            transition_duration=transition_duration
-        )
+        for image_path in image_paths:
+            slide_num = int(Path(image_path).stem.split("_")[1])
+            slide_key = f"slide_{slide_num}"
+            dialogue_audio_info[slide_key] = []
+            
+            # 該当するスライドの音声ファイルを探す
+            audio_files = sorted(self.audio_dir.glob(f"slide_{slide_num:03d}_*_*.wav"))
+            
+            print(f"スライド {slide_num} ({slide_key}): 音声ファイル {len(audio_files)} 個見つかりました")
+            
+            for audio_file in audio_files:
+                # ファイル名から話者を特定
+                parts = audio_file.stem.split("_")
+                if len(parts) >= 4:
+                    speaker = parts[3]
+                    dialogue_audio_info[slide_key].append({
+                        "speaker": speaker,
+                        "audio_path": str(audio_file)
+                    })
+                    print(f"  - {audio_file.name}: speaker={speaker}")
         
-        return str(output_path)
\ No newline at end of file
+        return dialogue_audio_info
@@ -32,6 +32,31 @@ class GenerateAudioRequest(BaseModel):
     pitch_scale: float = 0.0
     intonation_scale: float = 1.2  # デフォルトで表現豊かに
     volume_scale: float = 1.0
+    max_concurrency: Optional[int] = None  # VOICEVOXへの同時リクエスト数（未指定時は環境変数 VOICEVOX_MAX_CONCURRENCY）
+    denoise_mode: Optional[str] = None  # ノイズ除去モード "noisereduce" / "fast"（未指定時は環境変数 AUDIO_DENOISE_MODE）
+    fit_to_target: bool = False  # 話速と行間を調整して目標時間（target_duration）に合わせる
+    fit_mode: str = "global"  # 話速の調整方法 "global"（全話者共通）/ "per_speaker"（話者ごとに上下限で頭打ち）
+
+
+class DurationDryRunRequest(BaseModel):
+    """音声長の予測リクエスト（合成せずに audio_query のみで計算）"""
+    speed_scale: float = 1.0
+    pitch_scale: float = 0.0
+    intonation_scale: float = 1.2
+    volume_scale: float = 1.0
+    max_concurrency: Optional[int] = None  # VOICEVOXへの同時リクエスト数
+    # 動画全体の長さの計算に使う転場設定（CreateVideoRequest と同じ）
+    transition_type: str = "crossfade"
+    transition_duration: float = 0.4
+
+
+class DurationFitRequest(DurationDryRunRequest):
+    """目標時間への合わせ込みの計画リクエスト（未指定の上下限は環境変数 DURATION_FIT_*）"""
+    mode: str = "global"  # "global" / "per_speaker"
+    min_speed: Optional[float] = None
+    max_speed: Optional[float] = None
+    min_gap: Optional[float] = None
+    max_gap: Optional[float] = None
 
 
 class CreateVideoRequest(BaseModel):
@@ -45,6 +70,17 @@ class CreateVideoRequest(BaseModel):
     # 転場効果設定
     transition_type: str = "crossfade"  # 転場タイプ: "crossfade", "slide", "zoom", "fade", "none"
     transition_duration: float = 0.4  # 転場時間（秒）
+    # レンダリングエンジン: "moviepy"（従来）/ "ffmpeg"（静止画をffmpegで直接レンダリング）
+    # / "ffmpeg_segmented"（スライド・転場の区間ごとに並列エンコード）、未指定時は環境変数 VIDEO_RENDER_ENGINE
+    render_engine: Optional[str] = None
+    # レンダリングプロファイル: "standard"（従来の画質）/ "archival"（高画質）、未指定時は環境変数 VIDEO_RENDER_PROFILE
+    # 編集中の確認用の "preview" は /preview-video で作成する
+    render_profile: Optional[str] = None
+
+
+class PreviewVideoRequest(BaseModel):
+    """プレビュー動画作成リクエスト（低解像度・転場なし・BGMなし）"""
+    slide_numbers: Optional[list[int]] = None  # 指定しない場合は全スライド
 
 
 class GenerateDialogueRequest(BaseModel):
@@ -4,7 +4,7 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Response
 from fastapi.responses import FileResponse
 from fastapi import Form
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 from pathlib import Path
 import shutil
@@ -16,14 +16,19 @@ import asyncio
 import threading
 
 from api.models.job import (
-    JobStatus, JobCreateResponse, GenerateAudioRequest, 
-    CreateVideoRequest, GenerateDialogueRequest, UpdateDialogueRequest,
+    JobStatus, JobCreateResponse, GenerateAudioRequest, DurationDryRunRequest, DurationFitRequest,
+    CreateVideoRequest, PreviewVideoRequest, GenerateDialogueRequest, UpdateDialogueRequest,
     SlideImportanceRequest
 )
 from api.core.status_codes import StatusCode
 from api.core.job_processor import JobProcessor
 from api.core.async_worker import async_worker
 from api.core.knowledge_extractor import extract_text_from_knowledge_file
+from api.core.audio_manifest import AudioManifest
+from api.core.tts_cache import normalize_text
+from api.core.spectral_gate import DENOISE_MODES
+from api.core.speaker_warmup import speaker_warmup
+from api.core.duration_fitter import FIT_MODES, DurationFitter, load_duration_fit, save_duration_fit
 
 # データベースサービスをインポート
 from api.database.job_service import JobService
@@ -215,6 +220,9 @@ async def upload_pdf(
     thread.daemon = True
     thread.start()
     
+    # 使用するスタイルを先に読み込み、音声生成時の初回合成の遅延をなくす
+    background_tasks.add_task(speaker_warmup.warm_up, [speaker1_id, speaker2_id])
+    
     return JobCreateResponse(job_id=job_id)
 
 
@@ -243,9 +251,9 @@ async def delete_job(job_id: str):
     if job_dir.exists():
         shutil.rmtree(job_dir)
     
-    output_file = OUTPUT_DIR / f"{job_id}.mp4"
-    if output_file.exists():
-        output_file.unlink()
+    for output_file in (OUTPUT_DIR / f"{job_id}.mp4", OUTPUT_DIR / f"{job_id}_preview.mp4"):
+        if output_file.exists():
+            output_file.unlink()
     
     # ジョブ情報削除
     del jobs_db[job_id]
@@ -499,7 +507,8 @@ async def generate_complete_video(job_id: str):
             progress=85
         )
         
-        video_path = video_creator.create_video()
+        # レンダリングはブロッキングのため（枠待ちを含む）スレッドで実行し、イベントループを止めない
+        video_path = await asyncio.to_thread(video_creator.create_video)
         
         # 動画ファイナライズ
         # データベースに状態を保存
@@ -533,16 +542,40 @@ async def generate_complete_video(job_id: str):
 
 
 # 動画時間の概算関数
-def estimate_video_duration(dialogue_data: Dict[str, List[Dict]]) -> float:
-    """対話データから動画時間を概算"""
+def estimate_video_duration(dialogue_data: Dict[str, List[Dict]], job_id: Optional[str] = None) -> float:
+    """対話データから動画時間を概算
+
+    job_id を指定し音声マニフェストがある場合、テキストが変わっていない行は
+    合成済み音声の実測の長さを使う（残りの行のみ文字数から概算）
+    """
+    measured = {}
+    if job_id:
+        measured = AudioManifest(Path.cwd() / "audio" / job_id).entries_by_position()
+    
     total_chars = 0
     total_dialogues = 0
+    measured_duration = 0.0
     
     for slide_key, dialogues in dialogue_data.items():
-        for dialogue in dialogues:
+        try:
+            slide_num = int(slide_key.replace("slide_", ""))
+        except ValueError:
+            slide_num = None
+        
+        for idx, dialogue in enumerate(dialogues):
             text = dialogue.get("text", "")
-            total_chars += len(text)
             total_dialogues += 1
+            
+            entry = measured.get((slide_num, idx + 1))
+            if (
+                entry is not None
+                and entry.get("duration") is not None
+                and entry.get("speaker") == dialogue.get("speaker")
+                and entry.get("text") == normalize_text(text)
+            ):
+                measured_duration += entry["duration"]
+            else:
+                total_chars += len(text)
     
     # 概算:
     # - 日本語の読み上げ速度: 約300-350文字/分（VOICEVOXのデフォルト速度）
@@ -550,7 +583,7 @@ def estimate_video_duration(dialogue_data: Dict[str, List[Dict]]) -> float:
     # - 対話間の間隔: 0.3秒 × 対話数
     
     chars_per_second = 5.5  # 330文字/分 ÷ 60秒
-    text_duration = total_chars / chars_per_second
+    text_duration = total_chars / chars_per_second + measured_duration
     
     slide_count = len(dialogue_data)
     slide_transition_duration = slide_count * 0.5
@@ -561,6 +594,25 @@ def estimate_video_duration(dialogue_data: Dict[str, List[Dict]]) -> float:
     return round(total_seconds, 1)
 
 
+def job_transition_settings(job_id: str) -> Tuple[str, float]:
+    """ジョブの転場設定（video_settings.json > 最後に作成した合わせ込みの計画 > 既定値）"""
+    settings = {}
+    video_settings_path = Path.cwd() / "data" / job_id / "video_settings.json"
+    if video_settings_path.exists():
+        try:
+            with open(video_settings_path, 'r', encoding='utf-8') as f:
+                settings = json.load(f)
+        except Exception as e:
+            print(f"動画設定の読み込みエラー: {e}")
+    if not settings.get("transition_type"):
+        settings = load_duration_fit(Path.cwd(), job_id, preview=True) or {}
+    transition_duration = settings.get("transition_duration")
+    return (
+        settings.get("transition_type") or "crossfade",
+        float(transition_duration) if transition_duration is not None else 0.4
+    )
+
+
 def format_duration(seconds: float) -> str:
     """秒数を分:秒形式にフォーマット"""
     minutes = int(seconds // 60)
@@ -586,6 +638,18 @@ async def generate_audio(
             detail="スライド変換または対話スクリプトの準備が完了していません"
         )
     
+    if request.denoise_mode and request.denoise_mode.lower() not in DENOISE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"denoise_mode は {', '.join(DENOISE_MODES)} のいずれかを指定してください"
+        )
+    
+    if request.fit_mode not in FIT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"fit_mode は {', '.join(FIT_MODES)} のいずれかを指定してください"
+        )
+    
     # ステータス更新
     job.status = "generating_audio"
     job.status_code = StatusCode.AUDIO_GENERATING
@@ -599,7 +663,11 @@ async def generate_audio(
         request.speed_scale,
         request.pitch_scale,
         request.intonation_scale,
-        request.volume_scale
+        request.volume_scale,
+        request.max_concurrency,
+        request.denoise_mode,
+        request.fit_to_target,
+        request.fit_mode
     )
     
     return {"message": "音声生成を開始しました"}
@@ -623,6 +691,21 @@ async def create_video(
             detail="音声生成が完了していません"
         )
     
+    from api.core.video_creator import RENDER_ENGINES
+    from api.core.render_profiles import PROFILE_PREVIEW, RENDER_PROFILES
+    
+    if request.render_engine and request.render_engine.lower() not in RENDER_ENGINES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"render_engine は {', '.join(RENDER_ENGINES)} のいずれかを指定してください"
+        )
+    final_profiles = [name for name in RENDER_PROFILES if name != PROFILE_PREVIEW]
+    if request.render_profile and request.render_profile.lower() not in final_profiles:
+        raise HTTPException(
+            status_code=400,
+            detail=f"render_profile は {', '.join(final_profiles)} のいずれかを指定してください（プレビューは /preview-video）"
+        )
+    
     # ステータス更新
     job.status = "creating_video"
     job.status_code = StatusCode.VIDEO_CREATING
@@ -638,12 +721,79 @@ async def create_video(
         request.bgm_path,
         request.bgm_volume,
         request.transition_type,
-        request.transition_duration
+        request.transition_duration,
+        request.render_engine,
+        request.render_profile
     )
     
     return {"message": "動画作成を開始しました"}
 
 
+@router.post("/{job_id}/preview-video")
+async def create_preview_video(job_id: str, request: PreviewVideoRequest):
+    """編集中の確認用のプレビュー動画を作成（低解像度・転場なし・BGMなし、本番のレンダリングより優先）
+
+    完成した動画とは別の output/<job_id>_preview.mp4 に書き出し、ジョブの状態は変更しない
+    """
+    from api.core.video_creator import VideoCreator
+    from api.core.render_profiles import PROFILE_PREVIEW
+    
+    if job_id not in jobs_db:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    
+    job = jobs_db[job_id]
+    
+    # 対話の編集後や再生成中は音声が現在の対話と一致しないため、生成済みの状態に限る
+    if job.status not in ["audio_ready", "completed"]:
+        raise HTTPException(
+            status_code=400,
+            detail="音声生成が完了していません"
+        )
+    
+    audio_dir = Path.cwd() / "audio" / job_id
+    if not audio_dir.exists() or not any(audio_dir.glob("*.wav")):
+        raise HTTPException(status_code=400, detail="音声生成が完了していません")
+    
+    creator = VideoCreator(job_id, Path.cwd())
+    started_at = datetime.now()
+    try:
+        # レンダリングはブロッキングのためスレッドで実行
+        await asyncio.to_thread(
+            creator.create_video,
+            request.slide_numbers,
+            render_profile=PROFILE_PREVIEW
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"プレビュー動画の作成に失敗しました: {e}")
+    
+    return {
+        "message": "プレビュー動画を作成しました",
+        "preview_url": f"/api/jobs/{job_id}/preview-video",
+        "elapsed_seconds": round((datetime.now() - started_at).total_seconds(), 2)
+    }
+
+
+@router.get("/{job_id}/preview-video")
+async def download_preview_video(job_id: str):
+    """最後に作成したプレビュー動画を取得"""
+    if job_id not in jobs_db:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    
+    video_path = OUTPUT_DIR / f"{job_id}_preview.mp4"
+    
+    if not video_path.exists():
+        raise HTTPException(
+            status_code=404,
+            detail="プレビュー動画が見つかりません"
+        )
+    
+    return FileResponse(
+        path=video_path,
+        media_type="video/mp4",
+        filename=f"preview_{job_id}.mp4"
+    )
+
+
 @router.get("/{job_id}/download")
 async def download_video(job_id: str):
     """完成した動画をダウンロード"""
@@ -790,6 +940,112 @@ async def get_audio_file(job_id: str, filename: str):
     )
 
 
+@router.get("/{job_id}/audio-manifest")
+async def get_audio_manifest(job_id: str):
+    """合成済み音声の一覧（行ごとの実測の長さ）を取得"""
+    manifest = AudioManifest(Path.cwd() / "audio" / job_id)
+    if not manifest.exists():
+        raise HTTPException(status_code=404, detail="音声マニフェストが見つかりません")
+    
+    entries = [
+        {key: value for key, value in entry.items() if key != "path"}
+        for entry in manifest.load()
+    ]
+    return {
+        "entries": entries,
+        "total_audio_seconds": round(sum(e.get("duration") or 0.0 for e in entries), 2)
+    }
+
+
+@router.post("/{job_id}/duration-dry-run")
+async def duration_dry_run(job_id: str, request: DurationDryRunRequest):
+    """合成せずに各行・各スライド・動画全体の長さを予測（audio_query のモーラの長さから計算）"""
+    from api.core.audio_generator import AudioGenerator
+    
+    if job_id not in jobs_db:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    
+    job = jobs_db[job_id]
+    dialogue_path = Path.cwd() / "data" / job_id / "dialogue_narration_katakana.json"
+    if not dialogue_path.exists():
+        raise HTTPException(status_code=400, detail="対話スクリプトの準備が完了していません")
+    
+    generator = AudioGenerator(job_id, Path.cwd())
+    try:
+        # audio_query の取得はブロッキングのためスレッドで実行
+        result = await asyncio.to_thread(
+            generator.predict_durations,
+            speed_scale=request.speed_scale,
+            pitch_scale=request.pitch_scale,
+            intonation_scale=request.intonation_scale,
+            volume_scale=request.volume_scale,
+            max_concurrency=request.max_concurrency,
+            transition_type=request.transition_type,
+            transition_duration=request.transition_duration
+        )
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"音声長の予測に失敗しました: {e}")
+    
+    # 目標時間（分）との差
+    target_seconds = (job.target_duration or 10) * 60
+    result["total_duration_formatted"] = format_duration(result["total_duration"])
+    result["target_duration"] = target_seconds
+    result["difference"] = round(result["total_duration"] - target_seconds, 3)
+    return result
+
+
+@router.post("/{job_id}/duration-fit")
+async def duration_fit(job_id: str, request: DurationFitRequest):
+    """話速と行間で目標時間に合わせる計画を作成（合成・LLMの呼び出しなし）
+
+    計画は適用前の計画として data/<job_id>/duration_fit_preview.json に保存される（適用済みの
+    duration_fit.json は上書きしない）。音声生成で fit_to_target を指定すると同じ計算をやり直して適用する。
+    slides_to_trim が空でない場合のみ対話の短縮が必要
+    """
+    from api.core.audio_generator import AudioGenerator
+    
+    if job_id not in jobs_db:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    
+    job = jobs_db[job_id]
+    dialogue_path = Path.cwd() / "data" / job_id / "dialogue_narration_katakana.json"
+    if not dialogue_path.exists():
+        raise HTTPException(status_code=400, detail="対話スクリプトの準備が完了していません")
+    
+    try:
+        fitter = DurationFitter(
+            min_speed=request.min_speed,
+            max_speed=request.max_speed,
+            min_gap=request.min_gap,
+            max_gap=request.max_gap,
+            mode=request.mode
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    generator = AudioGenerator(job_id, Path.cwd())
+    try:
+        plan = await asyncio.to_thread(
+            generator.fit_to_target,
+            (job.target_duration or 10) * 60,
+            fitter,
+            speed_scale=request.speed_scale,
+            pitch_scale=request.pitch_scale,
+            intonation_scale=request.intonation_scale,
+            volume_scale=request.volume_scale,
+            max_concurrency=request.max_concurrency,
+            transition_type=request.transition_type,
+            transition_duration=request.transition_duration
+        )
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"目標時間への合わせ込みに失敗しました: {e}")
+    
+    # 音声生成で適用されるまでは動画作成に使わない（適用済みの計画と行間はそのまま残す）
+    plan["applied"] = False
+    save_duration_fit(Path.cwd(), job_id, plan, preview=True)
+    return plan
+
+
 @router.get("/{job_id}/dialogue")
 async def get_dialogue(job_id: str):
     """生成された対話スクリプトを取得"""
@@ -803,7 +1059,7 @@ async def get_dialogue(job_id: str):
         dialogue_data = json.load(f)
     
     # 動画時間の概算を計算
-    total_seconds = estimate_video_duration(dialogue_data)
+    total_seconds = estimate_video_duration(dialogue_data, job_id)
     
     return {
         "dialogue_data": dialogue_data,
@@ -1038,11 +1294,7 @@ async def upload_dialogue_csv(
     with open(katakana_path, 'w', encoding='utf-8') as f:
         json.dump(dialogue_data, f, ensure_ascii=False, indent=2)
     
-    # 既存の音声ファイルを削除（新しいスクリプトで再生成が必要）
-    audio_dir = Path.cwd() / "audio" / job_id
-    if audio_dir.exists():
-        shutil.rmtree(audio_dir)
-        print(f"既存の音声ファイルを削除しました: {audio_dir}")
+    # 既存の音声ファイルは削除しない（音声生成時にマニフェストと比較し、変更された行のみ再合成）
     
     # ジョブステータスを更新
     job = jobs_db[job_id]
@@ -1051,7 +1303,7 @@ async def upload_dialogue_csv(
     job.updated_at = datetime.now()
     
     # 推定時間を再計算
-    total_seconds = estimate_video_duration(dialogue_data)
+    total_seconds = estimate_video_duration(dialogue_data, job_id)
     
     return {
         "message": f"対話スクリプトをインポートしました（{len(dialogue_data)}スライド）", 
@@ -1087,11 +1339,7 @@ async def update_dialogue(
     with open(katakana_path, 'w', encoding='utf-8') as f:
         json.dump(request.dialogue_data, f, ensure_ascii=False, indent=2)
     
-    # 既存の音声ファイルを削除（新しいスクリプトで再生成が必要）
-    audio_dir = Path.cwd() / "audio" / job_id
-    if audio_dir.exists():
-        shutil.rmtree(audio_dir)
-        print(f"既存の音声ファイルを削除しました: {audio_dir}")
+    # 既存の音声ファイルは削除しない（音声生成時にマニフェストと比較し、変更された行のみ再合成）
     
     # ジョブステータスを更新
     job = jobs_db[job_id]
@@ -1100,7 +1348,7 @@ async def update_dialogue(
     job.updated_at = datetime.now()
     
     # 推定時間を再計算
-    total_seconds = estimate_video_duration(request.dialogue_data)
+    total_seconds = estimate_video_duration(request.dialogue_data, job_id)
     
     return {
         "message": "対話スクリプトを更新しました",
@@ -1175,7 +1423,9 @@ async def generate_video_complete(
     bgm_path: Optional[str] = Form(None),
     bgm_volume: float = Form(0.15),
     transition_type: str = Form("crossfade"),
-    transition_duration: float = Form(0.4)
+    transition_duration: float = Form(0.4),
+    render_engine: Optional[str] = Form(None),
+    render_profile: Optional[str] = Form(None)
 ):
     """ワンクリック動画生成（全工程を自動実行・非同期処理）"""
     if job_id not in jobs_db:
@@ -1205,7 +1455,9 @@ async def generate_video_complete(
         "bgm_path": bgm_path,
         "bgm_volume": bgm_volume,
         "transition_type": transition_type,
-        "transition_duration": transition_duration
+        "transition_duration": transition_duration,
+        "render_engine": render_engine,
+        "render_profile": render_profile
     }
     with open(metadata_path, 'w', encoding='utf-8') as f:
         json.dump(video_settings, f, ensure_ascii=False, indent=2)
@@ -1257,7 +1509,11 @@ async def generate_audio_task(
     speed_scale: float,
     pitch_scale: float,
     intonation_scale: float,
-    volume_scale: float
+    volume_scale: float,
+    max_concurrency: Optional[int] = None,
+    denoise_mode: Optional[str] = None,
+    fit_to_target: bool = False,
+    fit_mode: str = "global"
 ):
     """音声を生成"""
     from api.core.audio_generator import AudioGenerator
@@ -1266,13 +1522,42 @@ async def generate_audio_task(
         job = jobs_db[job_id]
         job.progress = 40
         
+        generator = AudioGenerator(job_id, Path.cwd(), denoise_mode=denoise_mode)
+        
+        # 目標時間への合わせ込み（audio_query のみで計算し、対話の作り直しはしない）
+        # audio_query の取得と合成はブロッキングのため、どちらもスレッドで実行してイベントループを止めない
+        speed_factors = None
+        duration_fit = load_duration_fit(Path.cwd(), job_id)
+        if fit_to_target:
+            # 動画全体の長さは転場の重なりで変わるため、このジョブの転場設定で計算する
+            transition_type, transition_duration = job_transition_settings(job_id)
+            duration_fit = await asyncio.to_thread(
+                generator.fit_to_target,
+                (job.target_duration or 10) * 60,
+                DurationFitter(mode=fit_mode),
+                speed_scale=speed_scale,
+                pitch_scale=pitch_scale,
+                intonation_scale=intonation_scale,
+                volume_scale=volume_scale,
+                max_concurrency=max_concurrency,
+                transition_type=transition_type,
+                transition_duration=transition_duration
+            )
+            speed_factors = duration_fit["speed_factors"]
+        if duration_fit is not None:
+            # 動画作成時に行間を適用するかどうか（今回の音声に合わせた計画のみ適用）
+            duration_fit["applied"] = fit_to_target
+            save_duration_fit(Path.cwd(), job_id, duration_fit)
+        
         # 音声生成
-        generator = AudioGenerator(job_id, Path.cwd())
-        audio_count = generator.generate_audio_files(
+        audio_count = await asyncio.to_thread(
+            generator.generate_audio_files,
             speed_scale=speed_scale,
             pitch_scale=pitch_scale,
             intonation_scale=intonation_scale,
-            volume_scale=volume_scale
+            volume_scale=volume_scale,
+            max_concurrency=max_concurrency,
+            speed_factors=speed_factors
         )
         
         job.status = "audio_ready"
@@ -1296,7 +1581,9 @@ async def create_video_task(
     bgm_path: Optional[str] = None,
     bgm_volume: float = 0.15,
     transition_type: str = "crossfade",
-    transition_duration: float = 0.4
+    transition_duration: float = 0.4,
+    render_engine: Optional[str] = None,
+    render_profile: Optional[str] = None
 ):
     """動画を作成"""
     from api.core.video_creator import VideoCreator
@@ -1307,13 +1594,17 @@ async def create_video_task(
         
         # 動画作成
         creator = VideoCreator(job_id, Path.cwd())
-        video_path = creator.create_video(
+        # レンダリングはブロッキングのため（枠待ちを含む）スレッドで実行し、プレビューの要求を止めない
+        video_path = await asyncio.to_thread(
+            creator.create_video,
             slide_numbers,
             bgm_enabled=bgm_enabled,
             bgm_path=bgm_path,
             bgm_volume=bgm_volume,
             transition_type=transition_type,
-            transition_duration=transition_duration
+            transition_duration=transition_duration,
+            render_engine=render_engine,
+            render_profile=render_profile
         )
         
         job.status = "completed"
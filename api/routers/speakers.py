@@ -2,26 +2,23 @@
 音声・スピーカー関連のルート
 """
 from fastapi import APIRouter, HTTPException, Response
-import requests
-import os
+import sys
+from pathlib import Path
 from api.models.speakers import VoiceSampleRequest
 
+# srcディレクトリをパスに追加
+sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
+
+from voicevox_client import get_async_client
+
 router = APIRouter(prefix="/api", tags=["speakers"])
 
 
 @router.get("/speakers")
 async def get_speakers():
     """利用可能なVOICEVOXスピーカー一覧を取得"""
-    # Docker環境の場合はvoicevoxホスト名を使用
-    if os.path.exists("/.dockerenv"):
-        voicevox_url = "http://voicevox:50021"
-    else:
-        voicevox_url = os.getenv("VOICEVOX_URL", "http://localhost:50021")
-    
     try:
-        response = requests.get(f"{voicevox_url}/speakers", timeout=5)
-        response.raise_for_status()
-        speakers = response.json()
+        speakers = await get_async_client().speakers()
         
         # フロントエンドで使いやすい形式に整形
         formatted_speakers = []
@@ -43,21 +40,11 @@ async def get_speakers():
 @router.post("/voice-sample")
 async def generate_voice_sample(request: VoiceSampleRequest):
     """指定したスピーカーでサンプル音声を生成"""
-    voicevox_url = os.getenv("VOICEVOX_URL", "http://localhost:50021")
+    client = get_async_client()
     
     try:
         # 音声クエリの作成
-        query_response = requests.post(
-            f"{voicevox_url}/audio_query",
-            params={
-                "text": request.text,
-                "speaker": request.speaker_id
-            }
-        )
-        query_response.raise_for_status()
-        
-        # 音声合成パラメータを調整
-        synthesis_data = query_response.json()
+        synthesis_data = await client.audio_query(request.text, request.speaker_id)
         
         # 速度調整
         if request.speed:
@@ -67,15 +54,10 @@ async def generate_voice_sample(request: VoiceSampleRequest):
             synthesis_data["speedScale"] = 1.2
         
         # 音声合成
-        synthesis_response = requests.post(
-            f"{voicevox_url}/synthesis",
-            params={"speaker": request.speaker_id},
-            json=synthesis_data
-        )
-        synthesis_response.raise_for_status()
+        wav_bytes = await client.synthesis(synthesis_data, request.speaker_id)
         
         return Response(
-            content=synthesis_response.content,
+            content=wav_bytes,
             media_type="audio/wav",
             headers={
                 "Content-Disposition": f"inline; filename=sample_{request.speaker_id}.wav"
@@ -2,8 +2,16 @@
 システム関連のルート
 """
 from fastapi import APIRouter
+import sys
+from pathlib import Path
 from api.routers.jobs import jobs_db
-from api.core.async_worker import async_worker
+from api.core.async_worker import async_worker, render_gate
+from api.core.speaker_warmup import speaker_warmup
+
+# srcディレクトリをパスに追加
+sys.path.append(str(Path(__file__).parent.parent.parent / "src"))
+
+from voicevox_client import VoicevoxBalancer, get_client
 
 router = APIRouter(prefix="/api", tags=["system"])
 
@@ -12,10 +20,20 @@ router = APIRouter(prefix="/api", tags=["system"])
 async def get_system_status():
     """システム状態を取得"""
     running_tasks = async_worker.get_running_tasks()
+    voicevox = get_client()
     return {
         "running_tasks": running_tasks,
         "active_jobs": len([job for job in jobs_db.values() if job.status == "processing"]),
         "total_jobs": len(jobs_db),
-        "worker_capacity": async_worker.max_workers
+        "worker_capacity": async_worker.max_workers,
+        # エンジンごとのスタイルの読み込み状態（warm / warming / failed）
+        "voicevox_speakers": speaker_warmup.snapshot(),
+        # エンジンごとの振り分け状態（正常/除外、処理中のリクエスト数）
+        "voicevox_engines": (
+            voicevox.snapshot() if isinstance(voicevox, VoicevoxBalancer)
+            else [{"url": voicevox.base_url, "healthy": True}]
+        ),
+        # 動画レンダリングの実行数と待ち数（プレビューは待ち行列の先頭に入る）
+        "render_queue": render_gate.snapshot()
     }
 
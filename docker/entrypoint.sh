@@ -1,17 +1,27 @@
 #!/bin/bash
 set -e
 
-# VOICEVOXエンジンをバックグラウンドで起動
+# 起動したエンジンのURL一覧（APIはここから振り分け先を読む）
+export VOICEVOX_URLS_FILE=${VOICEVOX_URLS_FILE:-/tmp/voicevox_urls}
+
+# 前回のURL一覧が残っていると起動前に待機を抜けてしまうため削除しておく
+rm -f "$VOICEVOX_URLS_FILE"
+
+# VOICEVOXエンジンをバックグラウンドで起動（VOICEVOX_ENGINE_COUNT 個）
 python /app/start_voicevox.py &
 VOICEVOX_PID=$!
 
-# VOICEVOXが起動するまで待機
+# エンジンプールが起動するまで待機（起動したエンジンのURL一覧が書き出されるのを待つ）
 echo "VOICEVOXエンジンの起動を待っています..."
-for i in {1..30}; do
-    if curl -s http://localhost:50021/version > /dev/null; then
-        echo "✅ VOICEVOXエンジンが起動しました"
+for i in {1..90}; do
+    if [ -s "$VOICEVOX_URLS_FILE" ]; then
+        echo "✅ VOICEVOXエンジンが起動しました: $(cat "$VOICEVOX_URLS_FILE")"
         break
     fi
+    if ! kill -0 $VOICEVOX_PID 2> /dev/null; then
+        echo "❌ VOICEVOXエンジンの起動に失敗しました"
+        exit 1
+    fi
     sleep 1
 done
 
@@ -1,73 +1,217 @@
 #!/usr/bin/env python3
 """
 Docker内でVOICEVOXエンジンを起動するスクリプト
+
+VOICEVOX_ENGINE_COUNT 個のエンジンを連続したポート（VOICEVOX_BASE_PORT から）で起動し、
+それぞれに別のCPUコアを割り当てる。エンジンが異常終了・応答しなくなった場合は再起動する。
+起動したエンジンのURL一覧を VOICEVOX_URLS_FILE に書き出し、APIはそれを読んで振り分ける。
+docker-compose では一覧を共有ボリュームに書き出し、VOICEVOX_PUBLIC_HOST にサービス名を
+指定することで、別コンテナのAPIからも各エンジンに接続できる。
+
+環境変数:
+    VOICEVOX_ENGINE_COUNT    起動するエンジン数（既定: 1）
+    VOICEVOX_BASE_PORT       最初のエンジンのポート（既定: 50021）
+    VOICEVOX_ENGINE_THREADS  1エンジンあたりのスレッド数（既定: CPUコア数 ÷ エンジン数）
+    VOICEVOX_CPU_PINNING     1でエンジンごとにCPUコアを固定（既定: 1）
+    VOICEVOX_PUBLIC_HOST     URL一覧に書き出すホスト名（既定: localhost、別コンテナからはサービス名）
+    VOICEVOX_URLS_FILE       URL一覧の出力先（既定: /tmp/voicevox_urls）
 """
+import os
+import signal
 import subprocess
+import sys
 import time
+from typing import List, Optional
+
 import requests
-import sys
-import os
 
-def start_voicevox_engine():
-    """VOICEVOXエンジンをバックグラウンドで起動"""
-    print("VOICEVOXエンジンを起動中...")
-    
-    # 環境変数を設定
-    env = os.environ.copy()
-    env['VOICEVOX_CORE_VERSION'] = '0.14.4'
-    env['OMP_NUM_THREADS'] = '1'  # Docker環境での安定性のため
-    
-    # VOICEVOXエンジンを起動
-    cmd = [
-        "python", "-m", "voicevox_engine",
-        "--host", "0.0.0.0",
-        "--port", "50021",
-        "--voicevox_dir", "/app/voicevox_core",
-        "--runtime_dir", "/app/voicevox_core",
-        "--disable_gpu"  # Docker環境ではCPUモードを使用
+ENGINE_COUNT = max(1, int(os.getenv("VOICEVOX_ENGINE_COUNT", "1")))
+BASE_PORT = int(os.getenv("VOICEVOX_BASE_PORT", "50021"))
+CPU_PINNING = os.getenv("VOICEVOX_CPU_PINNING", "1") != "0"
+PUBLIC_HOST = os.getenv("VOICEVOX_PUBLIC_HOST", "localhost")
+URLS_FILE = os.getenv("VOICEVOX_URLS_FILE", "/tmp/voicevox_urls")
+
+STARTUP_TIMEOUT = 60  # 起動待ちの上限（秒、全エンジンを並行して待つ）
+SUPERVISE_INTERVAL = 5  # 監視間隔（秒）
+MAX_HEALTH_FAILURES = 3  # 連続でこの回数 /version に応答しなければ再起動
+MAX_RESTART_DELAY = 60  # 再起動を繰り返す場合の待ち時間の上限（秒）
+
+
+def available_cpus() -> List[int]:
+    """このプロセスが使えるCPUコアの一覧"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(cpus: List[int], engine_count: int, threads: int) -> List[List[int]]:
+    """エンジンごとにCPUコアを割り当てる（コアが足りない場合は重複して割り当てる）"""
+    return [
+        [cpus[(index * threads + offset) % len(cpus)] for offset in range(threads)]
+        for index in range(engine_count)
     ]
-    
-    process = subprocess.Popen(
-        cmd,
-        env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    
-    # エンジンが起動するまで待機
-    max_retries = 30
-    for i in range(max_retries):
+
+
+class EngineProcess:
+    """1つのVOICEVOXエンジンプロセス"""
+
+    def __init__(self, index: int, port: int, threads: int, cpus: Optional[List[int]]):
+        self.index = index
+        self.port = port
+        self.threads = threads
+        self.cpus = cpus
+        self.process: Optional[subprocess.Popen] = None
+        self.health_failures = 0
+        self.restarts = 0
+        self.next_restart_at = 0.0
+
+    @property
+    def url(self) -> str:
+        return f"http://{PUBLIC_HOST}:{self.port}"
+
+    def start(self) -> None:
+        """エンジンを起動"""
+        # 環境変数を設定
+        env = os.environ.copy()
+        env['VOICEVOX_CORE_VERSION'] = '0.14.4'
+        # エンジンごとのスレッド数（割り当てたコア数に合わせる）
+        env['OMP_NUM_THREADS'] = str(self.threads)
+
+        cmd = [
+            "python", "-m", "voicevox_engine",
+            "--host", "0.0.0.0",
+            "--port", str(self.port),
+            "--voicevox_dir", "/app/voicevox_core",
+            "--runtime_dir", "/app/voicevox_core",
+            "--cpu_num_threads", str(self.threads),
+            "--disable_gpu"  # Docker環境ではCPUモードを使用
+        ]
+
+        cpus = self.cpus
+        preexec_fn = (lambda: os.sched_setaffinity(0, cpus)) if cpus else None
+        # 出力はパイプに溜めずコンテナのログにそのまま流す
+        self.process = subprocess.Popen(cmd, env=env, preexec_fn=preexec_fn)
+        self.health_failures = 0
+        pinned = f", CPU {cpus}" if cpus else ""
+        print(f"VOICEVOXエンジン#{self.index} を起動中... (ポート {self.port}, スレッド {self.threads}{pinned})")
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def is_healthy(self) -> bool:
         try:
-            response = requests.get("http://localhost:50021/version")
-            if response.status_code == 200:
-                print("✅ VOICEVOXエンジンが正常に起動しました")
-                return process
-        except:
-            pass
-        
-        # プロセスが終了していないかチェック
-        if process.poll() is not None:
-            stdout, stderr = process.communicate()
-            print(f"❌ VOICEVOXエンジンの起動に失敗しました")
-            print(f"stdout: {stdout.decode()}")
-            print(f"stderr: {stderr.decode()}")
-            sys.exit(1)
-        
+            response = requests.get(f"http://localhost:{self.port}/version", timeout=3)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def stop(self) -> None:
+        if self.is_running():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+def write_urls_file(engines: List[EngineProcess]) -> None:
+    """エンジンのURL一覧をAPI用に書き出す（一時ファイルから置き換え）"""
+    tmp_path = f"{URLS_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(",".join(engine.url for engine in engines) + "\n")
+    os.replace(tmp_path, URLS_FILE)
+    print(f"VOICEVOXエンジンのURL一覧を書き出しました: {URLS_FILE}")
+
+
+def wait_for_startup(engines: List[EngineProcess]) -> List[EngineProcess]:
+    """全エンジンの起動を待ち、起動できたエンジンを返す"""
+    pending = list(engines)
+    started = []
+    deadline = time.time() + STARTUP_TIMEOUT
+    while pending and time.time() < deadline:
+        for engine in list(pending):
+            if engine.is_healthy():
+                print(f"✅ VOICEVOXエンジン#{engine.index} が正常に起動しました ({engine.url})")
+                started.append(engine)
+                pending.remove(engine)
+            elif not engine.is_running():
+                print(f"❌ VOICEVOXエンジン#{engine.index} の起動に失敗しました (終了コード {engine.process.returncode})")
+                pending.remove(engine)
         time.sleep(1)
-        if i % 5 == 0:
-            print(f"  起動待機中... ({i}/{max_retries})")
-    
-    print("❌ VOICEVOXエンジンの起動がタイムアウトしました")
-    process.terminate()
-    sys.exit(1)
+    for engine in pending:
+        print(f"❌ VOICEVOXエンジン#{engine.index} の起動がタイムアウトしました")
+    return started
+
+
+def supervise(engines: List[EngineProcess]) -> None:
+    """異常終了・応答しなくなったエンジンを再起動し続ける"""
+    while True:
+        time.sleep(SUPERVISE_INTERVAL)
+        now = time.time()
+        for engine in engines:
+            if engine.is_running():
+                if engine.is_healthy():
+                    engine.health_failures = 0
+                    engine.restarts = 0
+                    continue
+                engine.health_failures += 1
+                if engine.health_failures < MAX_HEALTH_FAILURES:
+                    continue
+                print(f"⚠️ VOICEVOXエンジン#{engine.index} が応答しません。再起動します")
+                engine.stop()
+            elif engine.next_restart_at == 0.0:
+                print(f"⚠️ VOICEVOXエンジン#{engine.index} が終了しました (終了コード {engine.process.returncode})")
+
+            # 起動直後に落ち続ける場合に備えて待ち時間を倍々に伸ばす
+            if engine.next_restart_at == 0.0:
+                delay = min(2 ** engine.restarts, MAX_RESTART_DELAY)
+                engine.next_restart_at = now + delay
+            if now >= engine.next_restart_at:
+                engine.restarts += 1
+                engine.next_restart_at = 0.0
+                engine.start()
+
+
+def start_voicevox_engines() -> List[EngineProcess]:
+    """VOICEVOXエンジンをバックグラウンドで起動"""
+    cpus = available_cpus()
+    threads = int(os.getenv("VOICEVOX_ENGINE_THREADS") or max(1, len(cpus) // ENGINE_COUNT))
+    assignments = assign_cpus(cpus, ENGINE_COUNT, threads) if CPU_PINNING and hasattr(os, "sched_setaffinity") else None
+    print(f"VOICEVOXエンジンを{ENGINE_COUNT}個起動中...（使用可能なCPUコア: {len(cpus)}）")
+    # 共有ボリュームに前回の一覧が残っていると、起動前のエンジンにAPIが接続してしまう
+    if os.path.exists(URLS_FILE):
+        os.remove(URLS_FILE)
+
+    engines = [
+        EngineProcess(index, BASE_PORT + index, threads, assignments[index] if assignments else None)
+        for index in range(ENGINE_COUNT)
+    ]
+    for engine in engines:
+        engine.start()
+
+    if not wait_for_startup(engines):
+        for engine in engines:
+            engine.stop()
+        sys.exit(1)
+
+    # 起動に失敗したエンジンも監視で再起動するため、URL一覧には全エンジンを載せる
+    # （APIのロードバランサが応答しないエンジンを振り分け対象から外す）
+    write_urls_file(engines)
+    return engines
+
 
 if __name__ == "__main__":
-    process = start_voicevox_engine()
-    
-    # プロセスが終了するまで待機
+    engines = start_voicevox_engines()
+
+    def shutdown(signum=None, frame=None):
+        print("\n終了します...")
+        for engine in engines:
+            engine.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
     try:
-        process.wait()
+        supervise(engines)
     except KeyboardInterrupt:
-        print("\n終了します...")
-        process.terminate()
-        sys.exit(0)
\ No newline at end of file
+        shutdown()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+クリック音除去（ImprovedAudioProcessor.remove_click_noise）のベンチマーク
+従来のPythonループ版とベクトル化版の処理時間と出力の差を比較する
+
+使い方:
+    python scripts/benchmark_click_noise.py [--repeat 5] [--clicks-per-second 400]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(Path(__file__).parent.parent))
+
+from api.core.audio_generator import ImprovedAudioProcessor
+
+SAMPLE_RATE = 24000
+
+
+def remove_click_noise_legacy(audio_data):
+    """従来の実装（スパイクごとにPythonループで補間）"""
+    if len(audio_data) == 0:
+        return audio_data
+    audio_diff = np.diff(audio_data)
+    if len(audio_diff) > 0:
+        sudden_changes = np.abs(audio_diff) > np.std(audio_diff) * 5
+        for i in np.where(sudden_changes)[0]:
+            if i > 5 and i < len(audio_data) - 5:
+                audio_data[i] = np.mean(audio_data[i-5:i+5])
+    return audio_data
+
+
+def make_test_clip(seconds: float, clicks_per_second: float, seed: int = 0) -> np.ndarray:
+    """音声に近い信号（倍音＋振幅変調＋ノイズ）にクリックを加えたテスト用の音声"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / (k + 1) for k, f in enumerate((180, 360, 540, 900)))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    audio = 0.2 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    click_count = int(seconds * clicks_per_second)
+    positions = rng.integers(0, len(t), click_count)
+    audio[positions] += rng.choice([-1.0, 1.0], click_count) * rng.uniform(0.3, 0.8, click_count)
+    return audio.astype(np.float32)
+
+
+def bench(func, audio: np.ndarray, repeat: int):
+    """最速の実行時間と出力を返す（入力は毎回コピーして渡す）"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        data = audio.copy()
+        start = time.perf_counter()
+        result = func(data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="クリック音除去のベンチマーク")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数（最速値を採用）")
+    parser.add_argument("--clicks-per-second", type=float, default=400, help="1秒あたりのクリック数")
+    args = parser.parse_args()
+
+    processor = ImprovedAudioProcessor(sample_rate=SAMPLE_RATE)
+
+    print(f"=== クリック音除去ベンチマーク（{SAMPLE_RATE}Hz, 最速 {args.repeat} 回） ===")
+    for seconds in (10, 60):
+        audio = make_test_clip(seconds, args.clicks_per_second)
+        legacy_time, legacy_out = bench(remove_click_noise_legacy, audio, args.repeat)
+        fast_time, fast_out = bench(processor.remove_click_noise, audio, args.repeat)
+
+        repaired = np.count_nonzero(fast_out != audio)
+        identical = np.mean(np.isclose(legacy_out, fast_out, atol=1e-6)) * 100
+        print(f"\n{seconds}秒クリップ（補間 {repaired} サンプル）")
+        print(f"  従来版:       {legacy_time * 1000:9.2f} ms")
+        print(f"  ベクトル化版: {fast_time * 1000:9.2f} ms  ({legacy_time / fast_time:.1f}倍)")
+        # 従来版は補間済みの値を次の補間に使うため、近接したクリックの周辺のみ結果が異なる
+        print(f"  出力の一致率: {identical:.4f}%  最大差: {np.max(np.abs(legacy_out - fast_out)):.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+スペクトルゲート（ノイズ除去）のベンチマーク
+従来の2段階noisereduceと高速モード（1回のSTFT＋話者ごとのノイズプロファイル）の
+処理時間と出力SNRを比較する
+
+使い方:
+    python scripts/benchmark_spectral_gate.py [--repeat 3]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(Path(__file__).parent.parent))
+
+from api.core.audio_generator import ImprovedAudioProcessor
+from api.core.spectral_gate import (
+    DENOISE_MODE_FAST,
+    DENOISE_MODE_NOISEREDUCE,
+    NoiseProfileCache,
+)
+
+SAMPLE_RATE = 24000
+
+
+def make_clean_voice(seconds: float, seed: int) -> np.ndarray:
+    """音声に近い信号（ピッチの揺れる倍音＋音節ごとの振幅変化）、前後に0.1秒の無音"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = 160 + 30 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, np.pi))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None) ** 0.5
+    voice = 0.25 * voice * syllables
+    pad = int(0.1 * SAMPLE_RATE)
+    voice[:pad] = 0
+    voice[-pad:] = 0
+    return voice.astype(np.float32)
+
+
+def add_engine_noise(clean: np.ndarray, seed: int) -> np.ndarray:
+    """VOICEVOX由来を想定した定常ノイズ（低域のビープ音＋広帯域ノイズ）を加える"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(len(clean)) / SAMPLE_RATE
+    beep = 0.02 * np.sin(2 * np.pi * 350 * t) + 0.01 * np.sin(2 * np.pi * 1200 * t)
+    hiss = 0.01 * rng.standard_normal(len(clean))
+    return (clean + beep + hiss).astype(np.float32)
+
+
+def snr_db(clean: np.ndarray, processed: np.ndarray) -> float:
+    """元の音声に対する出力のSNR（dB）"""
+    n = min(len(clean), len(processed))
+    noise = processed[:n] - clean[:n]
+    return 10 * np.log10(np.sum(clean[:n] ** 2) / max(np.sum(noise ** 2), 1e-12))
+
+
+def bench(func, audio: np.ndarray, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(audio.copy())
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スペクトルゲートのベンチマーク")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最速値を採用）")
+    args = parser.parse_args()
+
+    processor = ImprovedAudioProcessor(sample_rate=SAMPLE_RATE)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        processor.noise_profiles = NoiseProfileCache(Path(cache_dir))
+        # 同じ話者の別の行でノイズプロファイルを推定しておく（本番では最初の1行で推定される）
+        warmup = add_engine_noise(make_clean_voice(3, seed=100), seed=101)
+        processor.apply_spectral_gating(warmup, SAMPLE_RATE, DENOISE_MODE_FAST, "benchmark")
+
+        modes = [
+            ("noisereduce（従来）", lambda a: processor.apply_spectral_gating(a, SAMPLE_RATE, DENOISE_MODE_NOISEREDUCE)),
+            ("fast（毎回推定）", lambda a: processor.apply_spectral_gating(a, SAMPLE_RATE, DENOISE_MODE_FAST)),
+            ("fast（プロファイル共有）", lambda a: processor.apply_spectral_gating(a, SAMPLE_RATE, DENOISE_MODE_FAST, "benchmark")),
+        ]
+
+        print(f"=== スペクトルゲートベンチマーク（{SAMPLE_RATE}Hz, 最速 {args.repeat} 回） ===")
+        for seconds in (3, 10, 30):
+            clean = make_clean_voice(seconds, seed=seconds)
+            noisy = add_engine_noise(clean, seed=seconds + 1)
+            print(f"\n{seconds}秒クリップ（入力SNR {snr_db(clean, noisy):.2f} dB）")
+            baseline = None
+            for label, func in modes:
+                elapsed, output = bench(func, noisy, args.repeat)
+                baseline = baseline or elapsed
+                print(
+                    f"  {label:<20} {elapsed * 1000:9.1f} ms  ({baseline / elapsed:4.1f}倍)  "
+                    f"出力SNR {snr_db(clean, output):6.2f} dB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+音声合成の順序のベンチマーク
+対話の順（interleaved）とスタイルごとにまとめた順（grouped）で同じ行を合成し、
+VOICEVOXエンジン（CPU版を想定）での処理時間を比較する
+
+使い方:
+    python scripts/benchmark_synthesis_order.py --url http://localhost:50021 \\
+        --speakers 2 3 --lines 24 --concurrency 3 --rounds 2
+"""
+import argparse
+import concurrent.futures
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートとsrcディレクトリをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "src"))
+
+from voicevox_client import VoicevoxClient
+from api.core.synthesis_scheduler import SCHEDULE_GROUPED, SCHEDULE_INTERLEAVED, SynthesisScheduler
+
+SENTENCES = [
+    "キョウハ、スライドノナイヨウヲジュンバンニセツメイシマス。",
+    "ナルホド、マズハゼンタイノナガレカラミテイキマショウ。",
+    "コノグラフハ、ツキゴトノウリアゲノスイイヲシメシテイマス。",
+    "サイキンハ、ノビガスコシユルヤカニナッテイマスネ。",
+    "ソノトオリデス。ツギノスライドデゲンインヲブンセキシマス。",
+    "ナンダカ、ワクワクシテキタノダ。",
+]
+
+
+def make_tasks(speakers, lines):
+    """対話形式（話者が交互に入れ替わる）の行を作成"""
+    return [
+        {
+            "text": SENTENCES[i % len(SENTENCES)],
+            "speaker_id": speakers[i % len(speakers)],
+        }
+        for i in range(lines)
+    ]
+
+
+def run(client, tasks, schedule, concurrency, style_concurrency):
+    """スケジューラの順序で合成し、処理時間とスタイル切り替え回数を返す"""
+    scheduler = SynthesisScheduler(tasks, concurrency, schedule, style_concurrency)
+    started_styles = []
+
+    def synthesize(task):
+        query = client.audio_query(task["text"], task["speaker_id"])
+        return client.synthesis(query, task["speaker_id"])
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        running = {}
+
+        def submit():
+            for task in scheduler.next_tasks():
+                started_styles.append(task["speaker_id"])
+                running[executor.submit(synthesize, task)] = task
+
+        submit()
+        while running:
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                scheduler.task_done(running.pop(future))
+                future.result()
+            submit()
+    elapsed = time.perf_counter() - start
+
+    switches = sum(1 for a, b in zip(started_styles, started_styles[1:]) if a != b)
+    return elapsed, switches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音声合成の順序のベンチマーク")
+    parser.add_argument("--url", default=None, help="VOICEVOXのURL（未指定時は環境変数 VOICEVOX_URL など）")
+    parser.add_argument("--speakers", type=int, nargs="+", default=[2, 3], help="使用するスタイルID")
+    parser.add_argument("--lines", type=int, default=24, help="合成する行数")
+    parser.add_argument("--concurrency", type=int, default=3, help="同時リクエスト数")
+    parser.add_argument("--style-concurrency", type=int, default=0, help="1スタイルあたりの同時リクエスト数（grouped のみ）")
+    parser.add_argument("--rounds", type=int, default=2, help="各順序の実行回数（交互に実行）")
+    args = parser.parse_args()
+
+    client = VoicevoxClient(args.url)
+    if not client.is_available():
+        print(f"❌ VOICEVOXに接続できません: {client.base_url}")
+        sys.exit(1)
+    print(f"VOICEVOX {client.version()} ({client.base_url})")
+
+    tasks = make_tasks(args.speakers, args.lines)
+    # 最初の計測がモデルの読み込みを含まないよう、各スタイルを一度ずつ合成しておく
+    for speaker in args.speakers:
+        client.synthesis(client.audio_query("ア", speaker), speaker)
+
+    results = {SCHEDULE_INTERLEAVED: [], SCHEDULE_GROUPED: []}
+    for round_index in range(args.rounds):
+        # 順序による有利不利が出ないよう、ラウンドごとに実行順を入れ替える
+        order = [SCHEDULE_INTERLEAVED, SCHEDULE_GROUPED]
+        if round_index % 2 == 1:
+            order.reverse()
+        for schedule in order:
+            elapsed, switches = run(client, tasks, schedule, args.concurrency, args.style_concurrency)
+            results[schedule].append(elapsed)
+            print(f"  ラウンド {round_index + 1} {schedule:<12} {elapsed:7.2f} 秒  スタイル切り替え {switches} 回")
+
+    print(f"\n=== 結果（{args.lines} 行, スタイル {args.speakers}, 同時実行数 {args.concurrency}） ===")
+    interleaved = min(results[SCHEDULE_INTERLEAVED])
+    grouped = min(results[SCHEDULE_GROUPED])
+    print(f"  interleaved: {interleaved:7.2f} 秒")
+    print(f"  grouped:     {grouped:7.2f} 秒  ({interleaved / grouped:.2f}倍)")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,6 @@
 import json
 import sys
 from pathlib import Path
-import requests
 
 # srcディレクトリをパスに追加
 sys.path.append('src')
@@ -76,40 +75,20 @@ def generate_expressive_audio():
             try:
                 print(f"  生成中: {audio_filename} ({speaker_name})")
                 
-                # 音声クエリの作成
-                query_data = {
-                    "text": text,
-                    "speaker": speaker_id
-                }
-                
-                query_response = requests.post(
-                    f"{voicevox.voicevox_url}/audio_query",
-                    params=query_data
-                )
-                
-                if query_response.status_code != 200:
-                    raise Exception(f"音声クエリの作成に失敗: {query_response.status_code}")
-                
-                # 音声合成パラメータを調整（more_expressive設定）
-                synthesis_data = query_response.json()
-                synthesis_data["speedScale"] = 1.0         # 標準速度
-                synthesis_data["pitchScale"] = 0.0         # 標準音高
-                synthesis_data["intonationScale"] = 1.2    # 表現豊かな抑揚
-                synthesis_data["volumeScale"] = 1.0        # 標準音量
-                
-                synthesis_response = requests.post(
-                    f"{voicevox.voicevox_url}/synthesis",
-                    params={"speaker": speaker_id},
-                    json=synthesis_data
+                # 音声クエリの作成と合成（more_expressive設定）
+                wav_bytes = voicevox.client.tts(
+                    text,
+                    speaker_id,
+                    speedScale=1.0,        # 標準速度
+                    pitchScale=0.0,        # 標準音高
+                    intonationScale=1.2,   # 表現豊かな抑揚
+                    volumeScale=1.0        # 標準音量
                 )
                 
-                if synthesis_response.status_code != 200:
-                    raise Exception(f"音声合成に失敗: {synthesis_response.status_code}")
-                
                 # ファイルに保存
                 output_path = output_dir / audio_filename
                 with open(output_path, "wb") as f:
-                    f.write(synthesis_response.content)
+                    f.write(wav_bytes)
                 
                 print(f"    ✅ 完了")
                 
@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
 import json
-import requests
 import os
+import sys
 from pathlib import Path
 import time
 
+# srcディレクトリをパスに追加
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from voicevox_client import VoicevoxClient
+
 class VOICEVOXAudioGenerator:
     def __init__(self, voicevox_url="http://localhost:50021"):
         self.voicevox_url = voicevox_url
+        self.client = VoicevoxClient(voicevox_url)
         self.speaker_ids = {
             "metan": 2,    # 四国めたん
             "zundamon": 3  # ずんだもん
@@ -16,39 +22,12 @@ class VOICEVOXAudioGenerator:
     def generate_audio(self, text, speaker_id, output_path):
         """VOICEVOXを使って音声を生成"""
         try:
-            # 音声合成クエリを作成
-            params = {
-                'text': text,
-                'speaker': speaker_id
-            }
-            
-            # クエリ作成
-            query_response = requests.post(
-                f"{self.voicevox_url}/audio_query",
-                params=params,
-                timeout=30
-            )
-            
-            if query_response.status_code != 200:
-                print(f"クエリ作成エラー: {query_response.status_code}")
-                return False
-            
-            # 音声合成
-            synthesis_response = requests.post(
-                f"{self.voicevox_url}/synthesis",
-                headers={'Content-Type': 'application/json'},
-                params={'speaker': speaker_id},
-                data=query_response.content,
-                timeout=30
-            )
-            
-            if synthesis_response.status_code != 200:
-                print(f"音声合成エラー: {synthesis_response.status_code}")
-                return False
+            # クエリ作成と音声合成（タイムアウト・リトライはクライアント側で処理）
+            wav_bytes = self.client.tts(text, speaker_id)
             
             # 音声ファイルを保存
             with open(output_path, 'wb') as f:
-                f.write(synthesis_response.content)
+                f.write(wav_bytes)
             
             print(f"✅ 音声生成完了: {output_path}")
             return True
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 import json
-import requests
 import os
+import sys
 from pathlib import Path
 import time
 
+# srcディレクトリをパスに追加
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from voicevox_client import VoicevoxClient, VoicevoxError
+
 def generate_audio_for_slides(start_slide=1, end_slide=5):
     """指定した範囲のスライドの音声を生成"""
     
@@ -16,7 +21,7 @@ def generate_audio_for_slides(start_slide=1, end_slide=5):
     with open("dialogue_narration_katakana.json", 'r', encoding='utf-8') as f:
         dialogue_data = json.load(f)
     
-    voicevox_url = "http://localhost:50021"
+    client = VoicevoxClient("http://localhost:50021")
     speaker_ids = {"metan": 2, "zundamon": 3}
     
     success_count = 0
@@ -44,35 +49,18 @@ def generate_audio_for_slides(start_slide=1, end_slide=5):
             print(f"  生成中: {output_filename}")
             
             try:
-                # 音声合成クエリを作成
-                query_response = requests.post(
-                    f"{voicevox_url}/audio_query",
-                    params={'text': text, 'speaker': speaker_id},
-                    timeout=10
-                )
+                # 音声合成クエリを作成して合成
+                wav_bytes = client.tts(text, speaker_id)
+                
+                # 音声ファイルを保存
+                with open(output_path, 'wb') as f:
+                    f.write(wav_bytes)
                 
-                if query_response.status_code == 200:
-                    # 音声合成
-                    synthesis_response = requests.post(
-                        f"{voicevox_url}/synthesis",
-                        headers={'Content-Type': 'application/json'},
-                        params={'speaker': speaker_id},
-                        data=query_response.content,
-                        timeout=10
-                    )
-                    
-                    if synthesis_response.status_code == 200:
-                        # 音声ファイルを保存
-                        with open(output_path, 'wb') as f:
-                            f.write(synthesis_response.content)
-                        
-                        print(f"    ✅ 成功")
-                        success_count += 1
-                    else:
-                        print(f"    ❌ 合成エラー: {synthesis_response.status_code}")
-                else:
-                    print(f"    ❌ クエリエラー: {query_response.status_code}")
+                print(f"    ✅ 成功")
+                success_count += 1
                 
+            except VoicevoxError as e:
+                print(f"    ❌ VOICEVOXエラー: {e}")
             except Exception as e:
                 print(f"    ❌ エラー: {e}")
             
@@ -1,46 +1,53 @@
 from moviepy.editor import (
     ImageClip,
     AudioFileClip,
-    concatenate_audioclips,
     concatenate_videoclips,
     CompositeVideoClip,
 )
-from moviepy.audio.AudioClip import AudioClip, CompositeAudioClip
+from moviepy.audio.AudioClip import AudioArrayClip, CompositeAudioClip
 from moviepy.audio import fx as afx
 import numpy as np
 from pathlib import Path
+from PIL import Image
 from scipy.io import wavfile
 from scipy import signal
 import os
 import tempfile
 
+from narration_timeline import SAMPLE_RATE, NarrationTimeline, slide_starts
+
 
 class DialogueVideoCreator:
-    def __init__(self, bgm_path=None, bgm_volume: float = 0.15):
+    def __init__(
+        self,
+        bgm_path=None,
+        bgm_volume: float = 0.15,
+        line_gap: float = 0.2,
+        max_size=None,
+        preset: str = "faster",
+        video_bitrate: str = "1500k",
+        audio_bitrate: str = "192k"
+    ):
         """
         :param bgm_path: 背景BGMのファイルパス（未指定の場合は環境変数 VIDEO_BGM_PATH を使用）
         :param bgm_volume: BGM 音量（0.0〜1.0）
+        :param line_gap: 話者交代の間（秒、目標時間への合わせ込みで変更される）
+        :param max_size: 出力フレームの最大サイズ (幅, 高さ)（未指定の場合はスライド画像のまま）
+        :param preset: x264 のプリセット
+        :param video_bitrate: 映像のビットレート
+        :param audio_bitrate: 音声のビットレート
         """
         self.temp_files = []
         # BGM 設定（オプション）
         self.bgm_path = bgm_path or os.getenv("VIDEO_BGM_PATH") or ""
         self.bgm_volume = bgm_volume
-    
-    def create_silence(self, duration):
-        """無音クリップを作成"""
-        # サンプリングレート 24000 Hz (VOICEVOXと統一)
-        sample_rate = 24000
-        # 完全な無音（振幅0）の配列を作成
-        silence_array = np.zeros((int(sample_rate * duration), 2))  # ステレオ
-        
-        # AudioArrayClipとして作成
-        from moviepy.audio.AudioClip import AudioArrayClip
-        return AudioArrayClip(silence_array, fps=sample_rate)
-    
-    def apply_highfreq_filter(self, audio_path):
-        """音声ファイルに高周波フィルタを適用してビープ音を除去"""
-        # フィルタ処理を無効化（audio_generator.pyで既に処理済み）
-        return audio_path
+        self.line_gap = line_gap
+        self.max_size = max_size
+        self.preset = preset
+        self.video_bitrate = video_bitrate
+        self.audio_bitrate = audio_bitrate
+        # ナレーションは行ごとのクリップを連結せず、動画全体で1本の配列として組み立てる
+        self.timeline = NarrationTimeline(line_gap=line_gap)
     
     
     def cleanup_temp_files(self):
@@ -53,10 +60,27 @@ class DialogueVideoCreator:
                 print(f"一時ファイル削除エラー: {e}")
         self.temp_files.clear()
     
-    def create_dialogue_slide(self, image_path, audio_infos):
-        """対話形式の音声を持つスライドから動画クリップを作成（改善版）"""
+    def _fit_image(self, image_path):
+        """max_size より大きいスライド画像を縮小した一時ファイルのパス（収まる場合は元のパス）"""
+        if not self.max_size:
+            return image_path
+        with Image.open(image_path) as image:
+            scale = min(self.max_size[0] / image.width, self.max_size[1] / image.height)
+            if scale >= 1:
+                return image_path
+            size = (max(2, int(image.width * scale)), max(2, int(image.height * scale)))
+            # moviepy の resize は PIL の ANTIALIAS 互換性問題があるため、PIL で縮小しておく
+            resized = image.convert("RGB").resize(size, Image.LANCZOS)
+        temp_image = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
+        temp_image.close()
+        resized.save(temp_image.name, "PNG")
+        self.temp_files.append(temp_image.name)
+        return temp_image.name
+    
+    def create_dialogue_slide(self, image_path, duration):
+        """スライド画像から表示時間分の動画クリップを作成（音声は動画全体でまとめて付ける）"""
         # 画像クリップを作成
-        image_clip = ImageClip(image_path)
+        image_clip = ImageClip(self._fit_image(image_path))
         
         # H.264エンコーディングのため、幅と高さを偶数にする
         if image_clip.w % 2 != 0 or image_clip.h % 2 != 0:
@@ -65,76 +89,7 @@ class DialogueVideoCreator:
             new_height = image_clip.h if image_clip.h % 2 == 0 else image_clip.h - 1
             image_clip = image_clip.crop(x1=0, y1=0, x2=new_width, y2=new_height)
         
-        if audio_infos and any(info.get("audio_path") for info in audio_infos):
-            audio_clips = []
-            
-            for i, info in enumerate(audio_infos):
-                if info.get("audio_path") and Path(info["audio_path"]).exists():
-                    # 音声ファイルに高周波フィルタを適用
-                    filtered_audio_path = self.apply_highfreq_filter(info["audio_path"])
-                    
-                    # 音声クリップを読み込み（24kHzに統一）
-                    audio_clip = AudioFileClip(filtered_audio_path, fps=24000)
-                    
-                    # 音声の開始と終了に改善されたフェードを適用（ビーン音防止）
-                    fade_duration = 0.05  # 50ms（ビーン音除去の最適値）
-                    if audio_clip.duration > fade_duration * 2:
-                        from moviepy.audio.fx.audio_fadein import audio_fadein
-                        from moviepy.audio.fx.audio_fadeout import audio_fadeout
-                        audio_clip = audio_fadein(audio_clip, fade_duration)
-                        audio_clip = audio_fadeout(audio_clip, fade_duration)
-                    
-                    # 音量を正規化（クリッピング防止）
-                    audio_clip = audio_clip.volumex(0.95)
-                    
-                    # 音声をリストに追加
-                    audio_clips.append(audio_clip)
-                    
-                    # 話者交代の間を追加（最後の音声以外）テンポアップ版
-                    if i < len(audio_infos) - 1:
-                        silence_duration = 0.2  # 200ms（テンポ向上・自然な会話リズム）
-                        silence = self.create_silence(silence_duration)
-                        audio_clips.append(silence)
-            
-            if audio_clips:
-                # 音声クリップを改善された方法で連結（クロスフェード付き）
-                if len(audio_clips) == 1:
-                    combined_audio = audio_clips[0]
-                else:
-                    # 最初のクリップから始める
-                    combined_audio = audio_clips[0]
-                    
-                    # 残りのクリップを順次結合（音声のみクロスフェード適用）
-                    for i in range(1, len(audio_clips)):
-                        current_clip = audio_clips[i]
-                        
-                        # 音声クリップ（無音ではない）の場合のみクロスフェード
-                        if i % 2 == 1:  # 奇数インデックスは音声クリップ
-                            # 短いクロスフェードで滑らかに接続
-                            crossfade_duration = min(0.05, combined_audio.duration/10, current_clip.duration/10)
-                            if crossfade_duration > 0.01:  # 10ms以上の場合のみ適用
-                                from moviepy.audio.fx.audio_fadein import audio_fadein
-                                current_clip = audio_fadein(current_clip, crossfade_duration)
-                        
-                        # クリップを結合
-                        combined_audio = concatenate_audioclips([combined_audio, current_clip])
-                
-                # 全体の最後に短い余白を追加（テンポ重視版）
-                final_silence_duration = 0.3  # 0.3秒（テンポ向上）
-                final_silence = self.create_silence(final_silence_duration)
-                combined_audio = concatenate_audioclips([combined_audio, final_silence])
-                
-                duration = combined_audio.duration
-                image_clip = image_clip.set_duration(duration)
-                image_clip = image_clip.set_audio(combined_audio)
-            else:
-                # 音声がない場合
-                image_clip = image_clip.set_duration(5.0)
-        else:
-            # 音声情報がない場合
-            image_clip = image_clip.set_duration(5.0)
-        
-        return image_clip
+        return image_clip.set_duration(duration)
     
     def create_dialogue_video(
         self, 
@@ -147,18 +102,20 @@ class DialogueVideoCreator:
     ):
         """対話形式の動画を作成"""
         clips = []
+        slides = []
+        durations = []
         
-        # 各スライドのクリップを作成
+        # 各スライドのクリップを作成（表示時間は音声ファイルのヘッダから求める）
         for i, image_path in enumerate(image_paths):
             # ファイル名からスライド番号を取得（例: slide_001.png -> 1）
-            from pathlib import Path
             slide_num = int(Path(image_path).stem.split("_")[1])
             slide_key = f"slide_{slide_num}"
             audio_infos = dialogue_audio_info.get(slide_key, [])
             
             print(f"スライド {slide_num} ({slide_key}) の動画クリップを作成中... 音声: {len(audio_infos)} 個")
-            clip = self.create_dialogue_slide(image_path, audio_infos)
-            clips.append(clip)
+            slides.append(self.timeline.slide_lines(audio_infos))
+            durations.append(self.timeline.slide_duration(slides[-1]))
+            clips.append(self.create_dialogue_slide(image_path, durations[-1]))
         
         # すべてのクリップを連結（指定された転場効果を使用）
         print(f"動画を連結中... 合計 {len(clips)} クリップ, 転場タイプ: {transition_type}")
@@ -181,6 +138,18 @@ class DialogueVideoCreator:
         
         print(f"最終動画の長さ: {final_video.duration} 秒")
 
+        # ナレーションを1本の配列にまとめて付ける（転場で重なる区間は足し合わせる）
+        starts, _ = slide_starts(durations, transition_type, transition_duration)
+        narration = self.timeline.render(slides, starts)
+        np.clip(narration, -1.0, 1.0, out=narration)
+        # 従来のクリップと同じくステレオとして渡す（コピーせずに2チャンネルに見せる）
+        narration_clip = AudioArrayClip(
+            np.broadcast_to(narration[:, None], (len(narration), 2)), fps=SAMPLE_RATE
+        )
+        final_video = final_video.set_audio(
+            narration_clip.set_duration(min(narration_clip.duration, final_video.duration))
+        )
+
         # オプション：背景BGMをミックス
         final_video = self._apply_background_music(final_video)
         
@@ -203,10 +172,10 @@ class DialogueVideoCreator:
             codec='libx264',
             audio_codec='aac',
             audio_fps=24000,  # 音声サンプリングレートを24kHzに統一
-            preset='faster',  # 処理速度を優先しつつ品質も維持
+            preset=self.preset,  # 既定は faster（処理速度を優先しつつ品質も維持）
             threads=16,  # スレッド数を増やして並列処理を強化
-            bitrate='1500k',  # ビットレートを少し下げて処理速度改善
-            audio_bitrate='192k',  # 音声品質は維持
+            bitrate=self.video_bitrate,  # 既定は1500k（ビットレートを少し下げて処理速度改善）
+            audio_bitrate=self.audio_bitrate,  # 既定は192k（音声品質は維持）
             temp_audiofile=temp_audiofile,
             remove_temp=True,
             ffmpeg_params=[
@@ -0,0 +1,510 @@
+"""
+ffmpegで直接レンダリングする対話動画作成（静止画スライド用）
+
+moviepy は出力の全フレームをPythonで合成するため、静止画のスライドでも
+同じ画像をフレームごとに描き直してエンコードする。ここでは各スライドを1回だけ整形して
+表示時間分のフレームに複製し、xfade で転場をつなぐフィルタグラフを組み立てて、
+1回の ffmpeg 実行で動画全体を出力する。
+ナレーション音声は NarrationTimeline で DialogueVideoCreator と同じ規則
+（フェード・音量・行間・末尾の余白）の1本のWAVにまとめてから渡す。
+
+segmented=True の場合は、タイムラインを「スライド単体の区間」と「転場の区間」に分け、
+区間ごとに同じ符号化パラメータで独立した ffmpeg を並列に実行する。できた区間は
+concat demuxer の -c copy で再エンコードせずにつなぎ、最後にナレーションを多重化する。
+segment_cache を渡すと、入力が同じ区間はエンコードせずにキャッシュから取り出す。
+
+still_fps を指定すると、スライドが静止している間は still_fps 枚/秒だけのフレームを残す
+可変フレームレートで出力する（転場と最後のフェードアウトの間は全フレーム）。
+スライドの境界にはキーフレームを置く。
+"""
+import concurrent.futures
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from PIL import Image
+
+from narration_timeline import SAMPLE_RATE, NarrationTimeline, slide_starts
+
+# DialogueVideoCreator の転場 → xfade のトランジション
+XFADE_TRANSITIONS = {
+    "crossfade": "fade",
+    "fade": "fadeblack",
+    "slide": "slideleft",
+    "zoom": "zoomin",
+}
+
+
+def get_render_workers(max_workers=None) -> int:
+    """区間レンダリングの並列数（引数 > 環境変数 VIDEO_RENDER_WORKERS > CPUコア数）"""
+    if max_workers is None:
+        max_workers = int(os.getenv("VIDEO_RENDER_WORKERS") or os.cpu_count() or 1)
+    return max(1, max_workers)
+
+
+def get_still_fps(still_fps=None) -> float:
+    """静止区間のフレームレート（引数 > 環境変数 VIDEO_STILL_FPS > 2、0で全フレームを出力）"""
+    if still_fps is None:
+        still_fps = float(os.getenv("VIDEO_STILL_FPS", "2"))
+    return max(0.0, still_fps)
+
+
+def _frame_bounds(starts, durations, fps):
+    """スライドごとの表示区間 [開始フレーム, 終了フレーム)（動画全体の時刻から丸めるため誤差が積み上がらない）"""
+    return [
+        (int(round(start * fps)), int(round((start + duration) * fps)))
+        for start, duration in zip(starts, durations)
+    ]
+
+
+def get_ffmpeg_binary() -> str:
+    """ffmpegの実行ファイル（moviepyと同じく環境変数 FFMPEG_BINARY で変更可能）"""
+    return os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+
+def is_ffmpeg_available() -> bool:
+    return shutil.which(get_ffmpeg_binary()) is not None
+
+
+class FFmpegVideoCreator:
+    """DialogueVideoCreator と同じ引数で動画を作成する ffmpeg レンダラー"""
+
+    def __init__(
+        self,
+        bgm_path=None,
+        bgm_volume: float = 0.15,
+        line_gap: float = 0.2,
+        segmented: bool = False,
+        max_workers=None,
+        segment_cache=None,
+        still_fps=None,
+        max_size=None,
+        preset: str = "faster",
+        video_bitrate: str = "1500k",
+        audio_bitrate: str = "192k"
+    ):
+        """
+        :param bgm_path: 背景BGMのファイルパス（未指定の場合は環境変数 VIDEO_BGM_PATH を使用）
+        :param bgm_volume: BGM 音量（0.0〜1.0）
+        :param line_gap: 話者交代の間（秒）
+        :param segmented: スライド・転場の区間ごとに並列にエンコードして連結する
+        :param max_workers: 区間レンダリングの並列数（未指定の場合は環境変数 VIDEO_RENDER_WORKERS かCPUコア数）
+        :param segment_cache: エンコード済み区間のキャッシュ（get/put/make_key/image_hash を持つもの、区間レンダリングのみ）
+        :param still_fps: 静止区間のフレームレート（未指定の場合は環境変数 VIDEO_STILL_FPS、0で固定フレームレート）
+        :param max_size: 出力フレームの最大サイズ (幅, 高さ)（未指定の場合は最初のスライドのサイズ）
+        :param preset: x264 のプリセット
+        :param video_bitrate: 映像のビットレート
+        :param audio_bitrate: 音声のビットレート
+        """
+        self.bgm_path = bgm_path or os.getenv("VIDEO_BGM_PATH") or ""
+        self.bgm_volume = bgm_volume
+        self.line_gap = line_gap
+        self.segmented = segmented
+        self.max_workers = get_render_workers(max_workers)
+        self.segment_cache = segment_cache
+        self.still_fps = get_still_fps(still_fps)
+        self.max_size = max_size
+        self.preset = preset
+        self.video_bitrate = video_bitrate
+        self.audio_bitrate = audio_bitrate
+        self.timeline = NarrationTimeline(line_gap=line_gap)
+        self.final_fade = 1.0  # 動画全体の最後のフェードアウト
+
+    def _frame_size(self, image_paths):
+        """出力サイズ（最初のスライドを max_size に収めて偶数に切り詰めたサイズ、H.264のため）"""
+        with Image.open(image_paths[0]) as image:
+            width, height = image.size
+        if self.max_size:
+            scale = min(self.max_size[0] / width, self.max_size[1] / height, 1.0)
+            width, height = max(2, int(width * scale)), max(2, int(height * scale))
+        return width - width % 2, height - height % 2
+
+    def create_dialogue_video(
+        self,
+        image_paths,
+        dialogue_audio_info,
+        output_path="dialogue_output.mp4",
+        fps=24,
+        transition_type: str = "crossfade",
+        transition_duration: float = 0.4
+    ):
+        """対話形式の動画を作成"""
+        if not image_paths:
+            raise ValueError("連結するクリップが存在しません")
+        if not is_ffmpeg_available():
+            raise RuntimeError(f"ffmpegが見つかりません: {get_ffmpeg_binary()}")
+
+        # スライドごとの行と表示時間（WAVのヘッダだけを読む）
+        slides = []
+        durations = []
+        for image_path in image_paths:
+            slide_num = int(Path(image_path).stem.split("_")[1])
+            audio_infos = dialogue_audio_info.get(f"slide_{slide_num}", [])
+            slides.append(self.timeline.slide_lines(audio_infos))
+            durations.append(self.timeline.slide_duration(slides[-1]))
+            print(f"スライド {slide_num}: {durations[-1]:.2f}秒 音声: {len(audio_infos)} 個")
+
+        # 転場の重なりを考慮したスライドの開始時刻
+        starts, _ = slide_starts(durations, transition_type, transition_duration)
+        total_duration = starts[-1] + durations[-1]
+
+        width, height = self._frame_size(image_paths)
+        with tempfile.TemporaryDirectory(prefix="ffmpeg_render_") as temp_dir:
+            # ナレーションを1本のWAVにまとめる（重なる区間は足し合わせる、moviepy の合成と同じ）
+            narration_path = os.path.join(temp_dir, "narration.wav")
+            self.timeline.write_wav(self.timeline.render(slides, starts), narration_path)
+
+            mode = f"区間並列 {self.max_workers}" if self.segmented else "一括"
+            print(f"動画を出力中（ffmpeg {mode}）: {output_path} 合計 {len(image_paths)} スライド, {total_duration:.1f}秒, 転場タイプ: {transition_type}")
+            if self.segmented:
+                self._render_segmented(
+                    image_paths, starts, durations, width, height, fps, transition_type,
+                    total_duration, narration_path, output_path, temp_dir
+                )
+            else:
+                self._render_single(
+                    image_paths, starts, durations, width, height, fps, transition_type,
+                    total_duration, narration_path, output_path, temp_dir
+                )
+
+        print(f"動画出力完了: {output_path}")
+
+    def _video_codec_args(self, fps, threads=None):
+        """映像の符号化パラメータ（区間を -c copy で連結するため全区間で同一にする）"""
+        args = [
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-tune", "stillimage",
+            "-b:v", self.video_bitrate,
+            "-pix_fmt", "yuv420p",  # QuickTime互換のピクセルフォーマット
+        ]
+        if self._still_step(fps):
+            # 間引いたフレームを複製し直さず、各フレームの時刻（1/fps 単位）をそのまま残す（可変フレームレート）
+            args += ["-fps_mode", "vfr"]
+        else:
+            args += ["-r", str(fps)]
+        if threads:
+            args += ["-threads", str(threads)]
+        return args
+
+    def _still_step(self, fps):
+        """静止区間で残すフレームの間隔（間引かない場合は 0）"""
+        if self.still_fps <= 0 or self.still_fps >= fps:
+            return 0
+        return max(1, int(round(fps / self.still_fps)))
+
+    def _still_select(self, segments, fps, total_frames):
+        """静止区間のフレームを間引く select の式（転場・最後のフェードアウト・区間の先頭と末尾は残す）
+
+        転場の位置は一括レンダリングの xfade と丸め方が1フレームずれることがあるため、前後1フレーム広げる
+        """
+        step = self._still_step(fps)
+        terms = []
+        for segment in segments:
+            first = segment["start_frame"]
+            last = first + segment["frames"] - 1
+            if segment["kind"] == "transition":
+                terms.append(f"between(n,{first - 1},{last + 1})")
+            else:
+                terms.append(f"between(n,{first},{last})*not(mod(n-{first},{step}))")
+                terms.append(f"eq(n,{last})")
+        fade_start = self._segment_fade_start({"start_frame": 0, "frames": total_frames}, fps, total_frames)
+        if fade_start is not None:
+            terms.append(f"gte(n,{fade_start})")
+        return "+".join(terms)
+
+    def _output_args(self, total_duration, output_path):
+        """音声の符号化と出力の設定"""
+        return [
+            "-c:a", "aac",
+            "-b:a", self.audio_bitrate,
+            "-ar", str(SAMPLE_RATE),
+            "-max_muxing_queue_size", "1024",
+            "-movflags", "+faststart",  # Web再生に最適化（moov atomを先頭に配置）
+            "-t", f"{total_duration:.3f}",
+            str(output_path),
+        ]
+
+    def _audio_inputs(self, cmd, narration_path, audio_index):
+        """ナレーションとBGMの入力を追加し、BGMの入力番号を返す"""
+        cmd += ["-i", narration_path]
+        if self.bgm_path and Path(self.bgm_path).exists():
+            cmd += ["-stream_loop", "-1", "-i", self.bgm_path]
+            return audio_index + 1
+        if self.bgm_path:
+            print(f"BGMファイルが見つかりません: {self.bgm_path}")
+        return None
+
+    def _run_ffmpeg(self, cmd, what="動画出力"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpegでの{what}に失敗しました: {result.stderr.strip()[-2000:]}")
+
+    def _write_filtergraph(self, filters, temp_dir, name="filtergraph.txt"):
+        graph_path = os.path.join(temp_dir, name)
+        with open(graph_path, "w", encoding="utf-8") as f:
+            f.write(";\n".join(filters))
+        return graph_path
+
+    def _render_single(
+        self,
+        image_paths,
+        starts,
+        durations,
+        width,
+        height,
+        fps,
+        transition_type,
+        total_duration,
+        narration_path,
+        output_path,
+        temp_dir
+    ):
+        """フィルタグラフ1つで全スライドを一度にエンコード"""
+        cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error"]
+        # 静止画は1回だけデコードし、フィルタ内で表示時間分のフレームに複製する
+        for image_path in image_paths:
+            cmd += ["-framerate", str(fps), "-i", str(image_path)]
+        audio_index = len(image_paths)
+        bgm_index = self._audio_inputs(cmd, narration_path, audio_index)
+
+        keyframe_args = []
+        if self._still_step(fps):
+            # 静止区間を間引き、スライドの境界（転場の開始・終了）にキーフレームを置く
+            segments, total_frames = self._plan_segments(image_paths, starts, durations, fps, transition_type)
+            filters = self._video_filters(
+                starts, durations, width, height, fps, transition_type, total_duration, "[vfull]"
+            )
+            filters.append(f"[vfull]select='{self._still_select(segments, fps, total_frames)}'[vout]")
+            boundaries = [segment["start_frame"] / fps for segment in segments[1:]]
+            if boundaries:
+                keyframe_args = ["-force_key_frames", ",".join(f"{t:.3f}" for t in boundaries)]
+        else:
+            filters = self._video_filters(starts, durations, width, height, fps, transition_type, total_duration)
+        filters += self._audio_filters(total_duration, audio_index, bgm_index)
+        graph_path = self._write_filtergraph(filters, temp_dir)
+
+        cmd += ["-filter_complex_script", graph_path, "-map", "[vout]", "-map", "[aout]"]
+        cmd += self._video_codec_args(fps) + keyframe_args
+        cmd += self._output_args(total_duration, output_path)
+        self._run_ffmpeg(cmd)
+
+    def _plan_segments(self, image_paths, starts, durations, fps, transition_type):
+        """タイムラインをフレーム単位で「スライド単体」と「転場」の区間に分割
+
+        スライド i の表示区間 [a_i, b_i) のうち、前後のスライドと重ならない部分が単体の区間、
+        次のスライドと重なる [a_{i+1}, b_i) が転場の区間になる。境界は動画全体の時刻から
+        丸めるため、区間のフレーム数の合計は一括レンダリングと一致する
+        """
+        bounds = _frame_bounds(starts, durations, fps)
+        segments = []
+        for i, (begin, end) in enumerate(bounds):
+            body_begin = max(begin, bounds[i - 1][1]) if i > 0 else begin
+            body_end = min(end, bounds[i + 1][0]) if i + 1 < len(bounds) else end
+            if body_end > body_begin:
+                segments.append({
+                    "kind": "slide",
+                    "images": [str(image_paths[i])],
+                    "start_frame": body_begin,
+                    "frames": body_end - body_begin,
+                })
+            if i + 1 < len(bounds) and end > bounds[i + 1][0]:
+                segments.append({
+                    "kind": "transition",
+                    "images": [str(image_paths[i]), str(image_paths[i + 1])],
+                    "start_frame": bounds[i + 1][0],
+                    "frames": end - bounds[i + 1][0],
+                    "transition": XFADE_TRANSITIONS.get(transition_type, XFADE_TRANSITIONS["crossfade"]),
+                })
+        return segments, bounds[-1][1]
+
+    def _segment_fade_start(self, segment, fps, total_frames):
+        """動画全体の最後のフェードアウトの開始フレーム（区間に掛からなければ None）"""
+        fade_frames = int(round(self.final_fade * fps))
+        fade_start = total_frames - fade_frames
+        if total_frames > fade_frames and segment["start_frame"] + segment["frames"] > fade_start:
+            return fade_start
+        return None
+
+    def segment_signature(self, segment, width, height, fps, total_frames):
+        """区間の見た目を決める入力（キャッシュキー用、動画内の位置はフェードとの距離だけを含める）"""
+        fade_start = self._segment_fade_start(segment, fps, total_frames)
+        return {
+            "kind": segment["kind"],
+            "images": [self.segment_cache.image_hash(path) for path in segment["images"]],
+            "frames": segment["frames"],
+            "transition": segment.get("transition"),
+            "size": [width, height],
+            "fps": fps,
+            "codec": self._video_codec_args(fps),
+            "still_step": self._still_step(fps) if segment["kind"] == "slide" else 0,
+            "fade": None if fade_start is None else [fade_start - segment["start_frame"], self.final_fade],
+        }
+
+    def _segment_command(self, segment, segment_path, width, height, fps, total_frames, threads):
+        """1区間を独立してエンコードする ffmpeg コマンド"""
+        frames = segment["frames"]
+        cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error"]
+        for image_path in segment["images"]:
+            cmd += ["-framerate", str(fps), "-i", image_path]
+
+        filters = [
+            self._slide_filter(f"[{index}:v]", f"[s{index}]", width, height, fps, frames)
+            for index in range(len(segment["images"]))
+        ]
+        if segment["kind"] == "transition":
+            filters.append(
+                f"[s0][s1]xfade=transition={segment['transition']}:duration={frames / fps:.6f}:offset=0[v]"
+            )
+        else:
+            filters.append("[s0]null[v]")
+
+        # 動画全体の最後のフェードアウトに掛かる区間は、全体の時刻に揃えてから同じフェードを掛ける
+        fade_start = self._segment_fade_start(segment, fps, total_frames)
+        last = "[v]"
+        if fade_start is not None:
+            shift = segment["start_frame"] / fps
+            filters.append(
+                f"{last}setpts=PTS+{shift:.6f}/TB,"
+                f"fade=t=out:st={fade_start / fps:.6f}:d={self.final_fade},setpts=PTS-STARTPTS[vf]"
+            )
+            last = "[vf]"
+
+        # スライド単体の区間は静止しているため間引く（区間の末尾のフレームは長さを保つために残す）
+        step = self._still_step(fps)
+        if step and segment["kind"] == "slide":
+            expression = f"not(mod(n,{step}))+eq(n,{frames - 1})"
+            if fade_start is not None:
+                expression += f"+gte(n,{fade_start - segment['start_frame']})"
+            filters.append(f"{last}select='{expression}'[vs]")
+            last = "[vs]"
+
+        cmd += ["-filter_complex", ";".join(filters), "-map", last, "-frames:v", str(frames), "-an"]
+        cmd += self._video_codec_args(fps, threads)
+        cmd += [str(segment_path)]
+        return cmd
+
+    def _render_segmented(
+        self,
+        image_paths,
+        starts,
+        durations,
+        width,
+        height,
+        fps,
+        transition_type,
+        total_duration,
+        narration_path,
+        output_path,
+        temp_dir
+    ):
+        """区間ごとに並列にエンコードし、-c copy で連結してからナレーションを多重化"""
+        segments, total_frames = self._plan_segments(image_paths, starts, durations, fps, transition_type)
+        segment_paths = [os.path.join(temp_dir, f"segment_{index:04d}.mp4") for index in range(len(segments))]
+
+        # キャッシュにある区間は取り出すだけにする
+        pending = []
+        for index, (segment, path) in enumerate(zip(segments, segment_paths)):
+            key = None
+            if self.segment_cache is not None:
+                key = self.segment_cache.make_key(self.segment_signature(segment, width, height, fps, total_frames))
+                if self.segment_cache.get(key, Path(path)):
+                    continue
+            pending.append((index, segment, path, key))
+        if self.segment_cache is not None:
+            print(f"区間キャッシュ: {len(segments) - len(pending)}/{len(segments)} 件ヒット")
+
+        if pending:
+            workers = min(self.max_workers, len(pending))
+            # 並列に動かす ffmpeg でCPUコアを分け合う
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            print(f"区間数: {len(pending)}/{len(segments)} をエンコード（並列数 {workers}, 1区間あたりのスレッド数 {threads}）")
+
+            def encode(index, segment, path, key):
+                self._run_ffmpeg(
+                    self._segment_command(segment, path, width, height, fps, total_frames, threads),
+                    f"区間 {index} のエンコード"
+                )
+                if key is not None:
+                    self.segment_cache.put(key, Path(path))
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(encode, *item) for item in pending]
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+
+        list_path = os.path.join(temp_dir, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in segment_paths:
+                f.write(f"file '{path}'\n")
+
+        cmd = [get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error"]
+        cmd += ["-f", "concat", "-safe", "0", "-i", list_path]
+        audio_index = 1
+        bgm_index = self._audio_inputs(cmd, narration_path, audio_index)
+        graph_path = self._write_filtergraph(
+            self._audio_filters(total_duration, audio_index, bgm_index), temp_dir
+        )
+        cmd += ["-filter_complex_script", graph_path, "-map", "0:v", "-map", "[aout]", "-c:v", "copy"]
+        cmd += self._output_args(total_duration, output_path)
+        self._run_ffmpeg(cmd, "区間の連結")
+
+    def _slide_filter(self, source, label, width, height, fps, frames):
+        """スライド1枚を整形し、frames フレームに複製（整形は1フレームだけ）"""
+        # サイズの異なるスライドは最初のスライドに合わせて余白を付ける
+        return (
+            f"{source}scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p,"
+            f"loop=loop={frames - 1}:size=1:start=0,setpts=N/{fps}/TB,fps={fps}{label}"
+        )
+
+    def _video_filters(self, starts, durations, width, height, fps, transition_type, total_duration, out_label="[vout]"):
+        """スライドの整形 → xfade による連結 → フェードアウト
+
+        xfade の位置と長さは各スライドの入力と同じフレーム境界から求める（秒のまま足し合わせると
+        丸め誤差が積み上がり、長い動画でナレーションとずれたり入力の長さを超えたりする）
+        """
+        bounds = _frame_bounds(starts, durations, fps)
+        filters = [
+            self._slide_filter(f"[{i}:v]", f"[s{i}]", width, height, fps, max(1, end - begin))
+            for i, (begin, end) in enumerate(bounds)
+        ]
+
+        transition = XFADE_TRANSITIONS.get(transition_type, XFADE_TRANSITIONS["crossfade"])
+        current = "[s0]"
+        for i in range(1, len(bounds)):
+            label = f"[x{i}]"
+            begin = bounds[i][0]
+            overlap_frames = bounds[i - 1][1] - begin
+            if transition_type == "none" or overlap_frames <= 0:
+                filters.append(f"{current}[s{i}]concat=n=2:v=1:a=0{label}")
+            else:
+                filters.append(
+                    f"{current}[s{i}]xfade=transition={transition}:"
+                    f"duration={overlap_frames / fps:.6f}:offset={begin / fps:.6f}{label}"
+                )
+            current = label
+
+        # 動画全体の最後にフェードアウト
+        if total_duration > self.final_fade:
+            filters.append(
+                f"{current}fade=t=out:st={total_duration - self.final_fade:.3f}:d={self.final_fade}{out_label}"
+            )
+        else:
+            filters.append(f"{current}null{out_label}")
+        return filters
+
+    def _audio_filters(self, total_duration, audio_index, bgm_index):
+        """ナレーションとBGMのミックス"""
+        if bgm_index is None:
+            return [f"[{audio_index}:a]anull[aout]"]
+        # BGMは動画の長さで切り、音量とフェードイン/アウトを適用してナレーションと足し合わせる
+        bgm_fade = min(2.0, total_duration / 4)
+        return [
+            f"[{bgm_index}:a]atrim=0:{total_duration:.3f},asetpts=PTS-STARTPTS,"
+            f"aresample={SAMPLE_RATE},aformat=channel_layouts=mono,volume={self.bgm_volume},"
+            f"afade=t=in:d={bgm_fade:.3f},afade=t=out:st={total_duration - bgm_fade:.3f}:d={bgm_fade:.3f}[bgm]",
+            f"[{audio_index}:a][bgm]amix=inputs=2:duration=first:normalize=0[aout]",
+        ]
@@ -0,0 +1,154 @@
+"""
+ナレーションのタイムライン - 動画全体の音声を1本の float32 配列として組み立てる
+
+moviepy の concatenate_audioclips を行ごとに連結すると、クリップが入れ子になって
+評価のたびに全体をたどり直すうえ、AudioFileClip ごとに ffmpeg のプロセスが起動する。
+ここでは先に全行の長さをWAVのヘッダから求めて動画全体の配列を1回だけ確保し、
+各行を読み込んで（PCMはメモリマップで）フェードと音量を掛けてから所定の位置に足し込む。
+行間・スライド末尾の余白・転場の重なりの定義はここにまとめ、duration_predictor（合成前の長さの予測）も同じものを使う。
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+from scipy.io import wavfile
+
+# ナレーションのサンプリングレート（VOICEVOXと統一）
+SAMPLE_RATE = 24000
+
+LINE_GAP = 0.2  # 話者交代の間（目標時間への合わせ込みで変更される）
+LINE_FADE = 0.05  # 各行の前後のフェード（ビーン音防止）
+LINE_VOLUME = 0.95  # クリッピング防止
+SLIDE_TAIL = 0.3  # スライド末尾の余白
+SILENT_SLIDE_DURATION = 5.0  # 音声のないスライドの表示時間
+# 転場で前後のスライドが重なる時間の上限（スライドの長さに対する割合）
+TRANSITION_OVERLAP_RATIO = {"none": 0.0, "crossfade": 0.5, "slide": 0.3, "zoom": 0.3, "fade": 0.3}
+
+
+def transition_overlap(transition_type: str, transition_duration: float, prev_duration: float, duration: float) -> float:
+    """前後のスライドが転場で重なる時間（秒）"""
+    ratio = TRANSITION_OVERLAP_RATIO.get(transition_type, TRANSITION_OVERLAP_RATIO["crossfade"])
+    return max(0.0, min(transition_duration, prev_duration * ratio, duration * ratio))
+
+
+def slide_starts(durations: List[float], transition_type: str, transition_duration: float) -> Tuple[List[float], List[float]]:
+    """転場の重なりを考慮したスライドの開始時刻と、スライド間の重なり"""
+    starts = [0.0] if durations else []
+    overlaps = []
+    for prev_duration, duration in zip(durations, durations[1:]):
+        overlap = transition_overlap(transition_type, transition_duration, prev_duration, duration)
+        overlaps.append(overlap)
+        starts.append(starts[-1] + prev_duration - overlap)
+    return starts, overlaps
+
+
+def _read_mono(path: str) -> Tuple[np.ndarray, int]:
+    """WAVを読み込む（PCMはメモリマップ、それ以外は soundfile で読み込み）"""
+    try:
+        sr, data = wavfile.read(path, mmap=True)
+    except (ValueError, TypeError):
+        data, sr = sf.read(path, dtype="float32", always_2d=True)
+    if data.ndim > 1:
+        data = data.mean(axis=1) if data.shape[1] > 1 else data[:, 0]
+    return data, sr
+
+
+def _frame_count(path: str) -> int:
+    """ヘッダから SAMPLE_RATE に換算したサンプル数を求める"""
+    info = sf.info(path)
+    if info.samplerate != SAMPLE_RATE:
+        return int(info.frames * SAMPLE_RATE / info.samplerate)
+    return info.frames
+
+
+class NarrationTimeline:
+    """スライドごとの行を並べて動画全体のナレーションを作成"""
+
+    def __init__(self, line_gap: float = LINE_GAP, slide_tail: float = SLIDE_TAIL, silent_slide_duration: float = SILENT_SLIDE_DURATION):
+        """
+        :param line_gap: 話者交代の間（秒）
+        :param slide_tail: スライド末尾の余白（秒）
+        :param silent_slide_duration: 音声のないスライドの表示時間（秒）
+        """
+        self.line_gap = line_gap
+        self.slide_tail = slide_tail
+        self.silent_slide_duration = silent_slide_duration
+        self.line_fade = LINE_FADE
+        self.line_volume = LINE_VOLUME
+
+    def slide_lines(self, audio_infos: Iterable[Dict]) -> List[Tuple[str, int]]:
+        """スライド1枚分の行（存在する音声ファイルのパスとサンプル数）"""
+        return [
+            (info["audio_path"], _frame_count(info["audio_path"]))
+            for info in audio_infos
+            if info.get("audio_path") and Path(info["audio_path"]).exists()
+        ]
+
+    def slide_samples(self, lines: List[Tuple[str, int]]) -> Optional[int]:
+        """スライド1枚分のナレーションのサンプル数（音声がなければ None）"""
+        if not lines:
+            return None
+        gap = int(self.line_gap * SAMPLE_RATE)
+        tail = int(self.slide_tail * SAMPLE_RATE)
+        return sum(frames for _, frames in lines) + gap * (len(lines) - 1) + tail
+
+    def slide_duration(self, lines: List[Tuple[str, int]]) -> float:
+        """スライド1枚の表示時間（秒）"""
+        samples = self.slide_samples(lines)
+        return samples / SAMPLE_RATE if samples is not None else self.silent_slide_duration
+
+    def load_line(self, path: str, frames: int) -> np.ndarray:
+        """1行分の音声をフェードと音量を適用した float32 で読み込む"""
+        data, sr = _read_mono(path)
+        if data.dtype == np.int16:
+            samples = data.astype(np.float32)
+            samples *= np.float32(self.line_volume / 32768.0)
+        elif data.dtype == np.int32:
+            samples = data.astype(np.float32)
+            samples *= np.float32(self.line_volume / 2147483648.0)
+        elif data.dtype == np.uint8:
+            samples = data.astype(np.float32)
+            samples -= np.float32(128.0)
+            samples *= np.float32(self.line_volume / 128.0)
+        else:
+            samples = data.astype(np.float32)
+            samples *= np.float32(self.line_volume)
+        if sr != SAMPLE_RATE:
+            # VOICEVOXの出力は24kHzに統一済みのため、通常は通らない
+            positions = np.arange(frames) * (sr / SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        samples = samples[:frames]
+
+        fade_len = int(self.line_fade * SAMPLE_RATE)
+        if len(samples) > fade_len * 2:
+            ramp = np.linspace(0.0, 1.0, fade_len, dtype=np.float32)
+            samples[:fade_len] *= ramp
+            samples[-fade_len:] *= ramp[::-1]
+        return samples
+
+    def render(self, slides: List[List[Tuple[str, int]]], starts: List[float]) -> np.ndarray:
+        """全スライドのナレーションを1本の配列にする（転場で重なる区間は足し合わせる）"""
+        ends = [
+            int(round(start * SAMPLE_RATE)) + (self.slide_samples(lines) or 0)
+            for start, lines in zip(starts, slides)
+        ]
+        total = max(ends, default=0)
+        if slides:
+            total = max(total, int(round((starts[-1] + self.slide_duration(slides[-1])) * SAMPLE_RATE)))
+        narration = np.zeros(total + 1, dtype=np.float32)
+
+        gap = int(self.line_gap * SAMPLE_RATE)
+        for start, lines in zip(starts, slides):
+            offset = int(round(start * SAMPLE_RATE))
+            for path, frames in lines:
+                samples = self.load_line(path, frames)
+                narration[offset:offset + len(samples)] += samples
+                offset += frames + gap
+        return narration
+
+    @staticmethod
+    def write_wav(narration: np.ndarray, output_path: str) -> None:
+        """16bit PCM のWAVに書き出す（ピークは ±1.0 で切る）"""
+        np.clip(narration, -1.0, 1.0, out=narration)
+        sf.write(output_path, narration, SAMPLE_RATE, subtype="PCM_16")
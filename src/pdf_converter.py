@@ -1,23 +1,113 @@
+import fitz  # PyMuPDF（ページごとのサイズの取得用）
 from pdf2image import convert_from_path
+from PIL import Image
 import os
+import re
 from pathlib import Path
 
+# 出力解像度（動画のフレームに収める最大サイズ、original は従来どおり300DPIのまま）
+OUTPUT_RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "original": None,
+}
+DEFAULT_OUTPUT_RESOLUTION = "1080p"
+ORIGINAL_DPI = 300
+# 出力サイズより少し大きくラスタライズしてから縮小する（文字の輪郭をきれいにするため）
+SUPERSAMPLE = 1.5
+
+
+def get_output_resolution(resolution=None):
+    """出力解像度の名前を取得（引数 > 環境変数 VIDEO_OUTPUT_RESOLUTION > 1080p）"""
+    resolution = (resolution or os.getenv("VIDEO_OUTPUT_RESOLUTION") or DEFAULT_OUTPUT_RESOLUTION).lower()
+    if resolution not in OUTPUT_RESOLUTIONS:
+        raise ValueError(f"不明な出力解像度: {resolution}（{', '.join(OUTPUT_RESOLUTIONS)} のいずれか）")
+    return resolution
+
+
+def pad_to_even(image):
+    """H.264のため幅と高さを偶数にする（右端・下端を端の色で1px埋める）"""
+    width, height = image.size
+    if width % 2 == 0 and height % 2 == 0:
+        return image
+    padded = Image.new(image.mode, (width + width % 2, height + height % 2), image.getpixel((width - 1, height - 1)))
+    padded.paste(image, (0, 0))
+    return padded
+
+
 class PDFConverter:
-    def __init__(self, output_dir="slides"):
+    def __init__(self, output_dir="slides", resolution=None):
+        """
+        :param output_dir: スライド画像の出力先
+        :param resolution: 出力解像度（720p / 1080p / 1440p / original、未指定の場合は環境変数 VIDEO_OUTPUT_RESOLUTION）
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
-    
-    def convert_pdf_to_images(self, pdf_path, dpi=300):
-        """PDFファイルを画像に変換"""
-        print(f"PDFを変換中: {pdf_path}")
-        
-        images = convert_from_path(pdf_path, dpi=dpi)
-        
+        self.resolution = get_output_resolution(resolution)
+        self.target_size = OUTPUT_RESOLUTIONS[self.resolution]
+
+    def _page_sizes_inches(self, pdf_path):
+        """全ページの表示サイズ（インチ、回転を反映した幅と高さ。取得できなければ None）"""
+        try:
+            with fitz.open(pdf_path) as doc:
+                return [(page.rect.width / 72, page.rect.height / 72) for page in doc]
+        except Exception as e:
+            print(f"ページサイズの取得に失敗しました: {e}")
+            return None
+
+    def _page_dpi(self, page_size):
+        """ページが出力サイズに収まる倍率から DPI を決める（出力サイズの指定がなければ300DPI）"""
+        if self.target_size is None or not page_size or min(page_size) <= 0:
+            return ORIGINAL_DPI
+        target_width, target_height = self.target_size
+        fit_dpi = min(target_width / page_size[0], target_height / page_size[1])
+        return max(1, min(ORIGINAL_DPI, int(fit_dpi * SUPERSAMPLE + 0.5)))
+
+    def _rasterize_runs(self, pdf_path):
+        """同じ DPI で変換できる連続したページのまとまり [(DPI, 最初のページ, 最後のページ)]
+
+        サイズや向きの異なるページが混ざっていても、ページごとに出力サイズへ収まる DPI で
+        ラスタライズする（ページサイズが分からなければ全ページ300DPI）
+        """
+        sizes = self._page_sizes_inches(pdf_path) if self.target_size is not None else None
+        if not sizes:
+            return [(ORIGINAL_DPI, None, None)]
+        runs = []
+        for page, size in enumerate(sizes, start=1):
+            dpi = self._page_dpi(size)
+            if runs and runs[-1][0] == dpi:
+                runs[-1] = (dpi, runs[-1][1], page)
+            else:
+                runs.append((dpi, page, page))
+        return runs
+
+    def _fit(self, image):
+        """出力サイズに収まるよう LANCZOS で1回だけ縮小し、偶数サイズに揃える"""
+        if self.target_size is not None:
+            target_width, target_height = self.target_size
+            scale = min(target_width / image.width, target_height / image.height)
+            if scale < 1:
+                size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+                image = image.resize(size, Image.LANCZOS)
+        return pad_to_even(image)
+
+    def convert_pdf_to_images(self, pdf_path, dpi=None):
+        """PDFファイルを画像に変換（dpi を指定すると全ページをその DPI で変換）"""
+        runs = [(dpi, None, None)] if dpi is not None else self._rasterize_runs(pdf_path)
+        dpis = "/".join(str(run_dpi) for run_dpi in dict.fromkeys(run[0] for run in runs))
+        print(f"PDFを変換中: {pdf_path}（出力解像度 {self.resolution}, {dpis}DPI）")
+
+        images = []
+        for run_dpi, first_page, last_page in runs:
+            images += convert_from_path(pdf_path, dpi=run_dpi, first_page=first_page, last_page=last_page)
+
         image_paths = []
         for i, image in enumerate(images):
             image_path = self.output_dir / f"slide_{i+1:03d}.png"
+            image = self._fit(image)
             image.save(image_path, "PNG")
             image_paths.append(str(image_path))
-            print(f"  スライド {i+1} を保存: {image_path}")
-        
-        return image_paths
\ No newline at end of file
+            print(f"  スライド {i+1} を保存: {image_path} ({image.width}x{image.height})")
+
+        return image_paths
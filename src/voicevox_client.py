@@ -0,0 +1,681 @@
+"""
+VOICEVOX HTTPクライアント
+API・src・scriptsで共通に使う。接続プール（keep-alive）、呼び出しごとのタイムアウト、
+5xxや接続リセット時のバックオフ付きリトライを提供する。同期版と非同期版がある。
+VOICEVOX_URL にカンマ区切りで複数のエンジンを指定した場合は、クライアント側の
+ロードバランサ（同期版は VoicevoxBalancer、非同期版は同じ状態を共有する
+AsyncVoicevoxBalancer）で各エンジンに振り分ける。
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOICEVOX_URL = "http://localhost:50021"
+
+# リトライ対象のHTTPステータス
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# 呼び出しごとのデフォルトタイムアウト（秒）
+VERSION_TIMEOUT = 5.0
+SPEAKERS_TIMEOUT = 10.0
+AUDIO_QUERY_TIMEOUT = 30.0
+SYNTHESIS_TIMEOUT = 120.0
+INITIALIZE_TIMEOUT = 300.0
+CONNECT_TIMEOUT = 5.0
+
+
+# ロードバランサの設定
+HEALTH_CHECK_INTERVAL = 10.0  # /version によるヘルスチェックの間隔（秒）
+HEALTH_CHECK_TIMEOUT = 3.0
+EJECT_AFTER_FAILURES = 3  # 連続でこの回数失敗したエンジンを振り分け対象から外す
+
+
+def get_voicevox_url() -> str:
+    """VOICEVOXのURLを取得（URL一覧ファイル > 環境変数 > Docker環境 > ローカル）
+
+    環境変数には複数のエンジンをカンマ区切りで指定できる（その場合はそのまま返す）。
+    VOICEVOX_URLS_FILE には docker/start_voicevox.py が起動したエンジンの一覧が書き出される
+    """
+    urls_file = os.getenv("VOICEVOX_URLS_FILE")
+    if urls_file and os.path.exists(urls_file):
+        with open(urls_file, encoding="utf-8") as f:
+            urls = parse_voicevox_urls(f.read())
+        if urls:
+            return ",".join(urls)
+    url = os.getenv("VOICEVOX_URL")
+    if url:
+        return ",".join(parse_voicevox_urls(url))
+    if os.path.exists("/.dockerenv"):
+        return "http://voicevox:50021"
+    return DEFAULT_VOICEVOX_URL
+
+
+def parse_voicevox_urls(value: str) -> List[str]:
+    """カンマ区切りのURLをリストに変換（末尾のスラッシュと重複を除く）"""
+    urls = [url.strip().rstrip("/") for url in value.split(",")]
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+def get_voicevox_urls(base_url: Optional[str] = None) -> List[str]:
+    """VOICEVOXエンジンのURL一覧を取得"""
+    return parse_voicevox_urls(base_url or get_voicevox_url())
+
+
+class VoicevoxError(Exception):
+    """VOICEVOXへのリクエスト失敗"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _backoff_delay(backoff_factor: float, attempt: int) -> float:
+    """指数バックオフ（ジッター付き）の待機時間"""
+    return backoff_factor * (2 ** attempt) * (0.5 + random.random() / 2)
+
+
+class VoicevoxClient:
+    """VOICEVOXの同期クライアント（スレッド間で共有可能）"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5
+    ):
+        self.base_url = get_voicevox_urls(base_url)[0]
+        if pool_size is None:
+            pool_size = max(10, int(os.getenv("VOICEVOX_MAX_CONCURRENCY", "3")))
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method: str, path: str, timeout: float, **kwargs) -> requests.Response:
+        """リトライ付きでリクエストを送信"""
+        url = f"{self.base_url}{path}"
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=(CONNECT_TIMEOUT, timeout), **kwargs)
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                # 接続拒否・接続リセットはリトライ
+                last_error = VoicevoxError(f"VOICEVOXへの接続に失敗しました ({path}): {e}")
+            except requests.Timeout as e:
+                # 読み込みのタイムアウトもリトライ（バランサでは別のエンジンで再試行）
+                last_error = VoicevoxError(f"VOICEVOXリクエストがタイムアウトしました ({path}): {e}")
+            except requests.RequestException as e:
+                # それ以外の requests の例外はリトライせずに VoicevoxError として返す
+                raise VoicevoxError(f"VOICEVOXリクエストが失敗しました ({path}): {e}") from e
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRY_STATUS_CODES:
+                    raise VoicevoxError(
+                        f"VOICEVOXリクエストが失敗しました ({path}): {response.status_code}",
+                        status_code=response.status_code
+                    )
+                last_error = VoicevoxError(
+                    f"VOICEVOXリクエストが失敗しました ({path}): {response.status_code}",
+                    status_code=response.status_code
+                )
+            if attempt < self.max_retries:
+                time.sleep(_backoff_delay(self.backoff_factor, attempt))
+        raise last_error
+
+    def version(self, timeout: float = VERSION_TIMEOUT) -> str:
+        """エンジンのバージョンを取得"""
+        response = self._request("GET", "/version", timeout=timeout)
+        return response.text.strip().strip('"')
+
+    def is_available(self) -> bool:
+        """VOICEVOXが起動しているか確認"""
+        try:
+            self.version()
+            return True
+        except Exception:
+            return False
+
+    def speakers(self, timeout: float = SPEAKERS_TIMEOUT) -> List[Dict[str, Any]]:
+        """スピーカー一覧を取得"""
+        return self._request("GET", "/speakers", timeout=timeout).json()
+
+    def audio_query(self, text: str, speaker: int, timeout: float = AUDIO_QUERY_TIMEOUT) -> Dict[str, Any]:
+        """音声合成用のクエリを作成"""
+        response = self._request(
+            "POST", "/audio_query",
+            timeout=timeout,
+            params={"text": text, "speaker": speaker}
+        )
+        return response.json()
+
+    def synthesis(
+        self,
+        query: Dict[str, Any],
+        speaker: int,
+        output_sampling_rate: Optional[int] = None,
+        timeout: float = SYNTHESIS_TIMEOUT
+    ) -> bytes:
+        """クエリから音声を合成してWAVのバイト列を返す"""
+        params: Dict[str, Any] = {"speaker": speaker}
+        if output_sampling_rate is not None:
+            params["outputSamplingRate"] = output_sampling_rate
+        response = self._request("POST", "/synthesis", timeout=timeout, params=params, json=query)
+        return response.content
+
+    def initialize_speaker(self, speaker: int, skip_reinit: bool = True, timeout: float = INITIALIZE_TIMEOUT) -> None:
+        """スタイルのモデルを事前に読み込む（初回合成の遅延を避ける）"""
+        self._request(
+            "POST", "/initialize_speaker",
+            timeout=timeout,
+            params={"speaker": speaker, "skip_reinit": str(skip_reinit).lower()}
+        )
+
+    def is_initialized_speaker(self, speaker: int, timeout: float = VERSION_TIMEOUT) -> bool:
+        """スタイルのモデルが読み込み済みか確認"""
+        response = self._request("GET", "/is_initialized_speaker", timeout=timeout, params={"speaker": speaker})
+        return bool(response.json())
+
+    def tts(self, text: str, speaker: int, **query_overrides) -> bytes:
+        """クエリ作成と合成をまとめて実行"""
+        query = self.audio_query(text, speaker)
+        query.update(query_overrides)
+        return self.synthesis(query, speaker)
+
+    @property
+    def engine_urls(self) -> List[str]:
+        return [self.base_url]
+
+    @property
+    def max_concurrency(self) -> int:
+        """推奨する同時リクエスト数（環境変数 VOICEVOX_MAX_CONCURRENCY の既定値）"""
+        return 3
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class _Engine:
+    """ロードバランサが管理する1エンジンの状態"""
+
+    def __init__(self, url: str, client: VoicevoxClient, max_concurrency: int):
+        self.url = url
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        self.last_error: Optional[str] = None
+
+
+class VoicevoxBalancer:
+    """複数のVOICEVOXエンジンに振り分ける同期クライアント（VoicevoxClientと同じメソッドを持つ）
+
+    - 処理中のリクエストが最も少ないエンジンに振り分ける（least outstanding requests）
+    - エンジンごとの同時リクエスト数を制限し、空きがなければ空くまで待つ
+    - 連続して失敗したエンジンは外し、定期的な /version のヘルスチェックで復帰させる
+    - 5xx・接続エラーは別のエンジンでリトライする
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        max_concurrency_per_engine: Optional[int] = None,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL,
+        eject_after_failures: int = EJECT_AFTER_FAILURES
+    ):
+        if max_concurrency_per_engine is None:
+            max_concurrency_per_engine = int(os.getenv("VOICEVOX_ENGINE_CONCURRENCY", "3"))
+        max_concurrency_per_engine = max(1, max_concurrency_per_engine)
+        self.base_url = ",".join(urls)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.health_check_interval = health_check_interval
+        self.eject_after_failures = eject_after_failures
+        # リトライはバランサ側で別のエンジンに対して行う
+        self.engines = [
+            _Engine(url, VoicevoxClient(url, pool_size=max(10, max_concurrency_per_engine), max_retries=0),
+                    max_concurrency_per_engine)
+            for url in urls
+        ]
+        self._condition = threading.Condition()
+        self._health_thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    @property
+    def engine_urls(self) -> List[str]:
+        return [engine.url for engine in self.engines]
+
+    @property
+    def max_concurrency(self) -> int:
+        """全エンジン合計の同時リクエスト数"""
+        return sum(engine.max_concurrency for engine in self.engines)
+
+    def _start_health_checks(self) -> None:
+        if self._health_thread is None:
+            with self._condition:
+                if self._health_thread is None:
+                    self._health_thread = threading.Thread(target=self._health_check_loop, daemon=True)
+                    self._health_thread.start()
+
+    def _health_check_loop(self) -> None:
+        while not self._closed.wait(self.health_check_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                # 1回の失敗でスレッドが終了すると、外したエンジンが二度と復帰しなくなる
+                logger.error(f"VOICEVOXエンジンのヘルスチェックエラー: {e}")
+
+    def check_health(self) -> None:
+        """全エンジンに /version を送り、応答したエンジンを復帰・しないエンジンを除外"""
+        for engine in self.engines:
+            try:
+                engine.client.version(timeout=HEALTH_CHECK_TIMEOUT)
+            except Exception as e:
+                with self._condition:
+                    if engine.healthy:
+                        logger.warning(f"VOICEVOXエンジンを振り分け対象から外しました: {engine.url} ({e})")
+                    engine.healthy = False
+                    engine.last_error = str(e)
+            else:
+                with self._condition:
+                    if not engine.healthy:
+                        logger.info(f"VOICEVOXエンジンが復帰しました: {engine.url}")
+                    engine.healthy = True
+                    engine.consecutive_failures = 0
+                    self._condition.notify_all()
+
+    def _select(self, exclude: Optional[_Engine] = None) -> Optional[_Engine]:
+        """空きのあるエンジンのうち処理中が最も少ないものを選ぶ（ロック取得済みで呼ぶ）"""
+        healthy = [engine for engine in self.engines if engine.healthy]
+        # 全エンジンが外れている場合は復帰を待たずに全エンジンを候補にする
+        candidates = healthy or self.engines
+        if exclude is not None and len(candidates) > 1:
+            candidates = [engine for engine in candidates if engine is not exclude]
+        available = [engine for engine in candidates if engine.outstanding < engine.max_concurrency]
+        if not available:
+            return None
+        return min(available, key=lambda engine: (engine.outstanding, engine.total_requests))
+
+    def _acquire(self, exclude: Optional[_Engine] = None) -> _Engine:
+        with self._condition:
+            engine = self._select(exclude)
+            while engine is None:
+                self._condition.wait()
+                engine = self._select(exclude)
+            engine.outstanding += 1
+            engine.total_requests += 1
+            return engine
+
+    def _release(self, engine: _Engine, error: Optional[VoicevoxError] = None) -> None:
+        with self._condition:
+            engine.outstanding -= 1
+            if error is None:
+                engine.consecutive_failures = 0
+            else:
+                engine.consecutive_failures += 1
+                engine.last_error = str(error)
+                if engine.healthy and engine.consecutive_failures >= self.eject_after_failures:
+                    engine.healthy = False
+                    logger.warning(f"VOICEVOXエンジンを振り分け対象から外しました: {engine.url} ({error})")
+            self._condition.notify_all()
+
+    def _call(self, method: str, *args, **kwargs):
+        """エンジンを選んで呼び出す（5xx・接続エラーは別のエンジンでリトライ）"""
+        self._start_health_checks()
+        last_error: Optional[VoicevoxError] = None
+        previous: Optional[_Engine] = None
+        for attempt in range(self.max_retries + 1):
+            engine = self._acquire(exclude=previous)
+            failure: Optional[VoicevoxError] = None
+            try:
+                return getattr(engine.client, method)(*args, **kwargs)
+            except VoicevoxError as e:
+                if e.status_code is not None and e.status_code not in RETRY_STATUS_CODES:
+                    # リクエスト自体の誤り（4xx）はエンジンの異常として扱わない
+                    raise
+                failure = e
+            finally:
+                # 想定外の例外でも処理中の数を必ず戻す（戻さないと _acquire が永久に待つ）
+                self._release(engine, failure)
+            last_error = failure
+            previous = engine
+            if attempt < self.max_retries:
+                time.sleep(_backoff_delay(self.backoff_factor, attempt) / len(self.engines))
+        raise last_error
+
+    def version(self, timeout: float = VERSION_TIMEOUT) -> str:
+        return self._call("version", timeout=timeout)
+
+    def is_available(self) -> bool:
+        try:
+            self.version()
+            return True
+        except Exception:
+            return False
+
+    def speakers(self, timeout: float = SPEAKERS_TIMEOUT) -> List[Dict[str, Any]]:
+        return self._call("speakers", timeout=timeout)
+
+    def audio_query(self, text: str, speaker: int, timeout: float = AUDIO_QUERY_TIMEOUT) -> Dict[str, Any]:
+        return self._call("audio_query", text, speaker, timeout=timeout)
+
+    def synthesis(
+        self,
+        query: Dict[str, Any],
+        speaker: int,
+        output_sampling_rate: Optional[int] = None,
+        timeout: float = SYNTHESIS_TIMEOUT
+    ) -> bytes:
+        return self._call("synthesis", query, speaker, output_sampling_rate=output_sampling_rate, timeout=timeout)
+
+    def initialize_speaker(self, speaker: int, skip_reinit: bool = True, timeout: float = INITIALIZE_TIMEOUT) -> None:
+        """全エンジンでスタイルを初期化（どのエンジンに振り分けられても読み込み済みにする）
+
+        一部のエンジンで失敗しても残りのエンジンは初期化し、最初のエラーを送出する
+        """
+        first_error: Optional[Exception] = None
+        for engine in self.engines:
+            try:
+                engine.client.initialize_speaker(speaker, skip_reinit=skip_reinit, timeout=timeout)
+            except Exception as e:
+                first_error = first_error or e
+        if first_error is not None:
+            raise first_error
+
+    def is_initialized_speaker(self, speaker: int, timeout: float = VERSION_TIMEOUT) -> bool:
+        """全エンジンでスタイルが読み込み済みか確認"""
+        return all(engine.client.is_initialized_speaker(speaker, timeout=timeout) for engine in self.engines)
+
+    def tts(self, text: str, speaker: int, **query_overrides) -> bytes:
+        query = self.audio_query(text, speaker)
+        query.update(query_overrides)
+        return self.synthesis(query, speaker)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """エンジンごとの状態（システム状態API用）"""
+        with self._condition:
+            return [
+                {
+                    "url": engine.url,
+                    "healthy": engine.healthy,
+                    "outstanding": engine.outstanding,
+                    "max_concurrency": engine.max_concurrency,
+                    "total_requests": engine.total_requests,
+                    "consecutive_failures": engine.consecutive_failures,
+                    "last_error": engine.last_error,
+                }
+                for engine in self.engines
+            ]
+
+    def close(self) -> None:
+        self._closed.set()
+        for engine in self.engines:
+            engine.client.close()
+
+
+class AsyncVoicevoxClient:
+    """VOICEVOXの非同期クライアント（httpxを使用、同一イベントループ内で共有）"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5
+    ):
+        import httpx
+
+        self._httpx = httpx
+        self.base_url = get_voicevox_urls(base_url)[0]
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def _request(self, method: str, path: str, timeout: float, **kwargs):
+        """リトライ付きでリクエストを送信"""
+        httpx = self._httpx
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(
+                    method, path, timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT), **kwargs
+                )
+            except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError) as e:
+                last_error = VoicevoxError(f"VOICEVOXへの接続に失敗しました ({path}): {e}")
+            except httpx.TimeoutException as e:
+                last_error = VoicevoxError(f"VOICEVOXリクエストがタイムアウトしました ({path}): {e}")
+            except httpx.HTTPError as e:
+                raise VoicevoxError(f"VOICEVOXリクエストが失敗しました ({path}): {e}") from e
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRY_STATUS_CODES:
+                    raise VoicevoxError(
+                        f"VOICEVOXリクエストが失敗しました ({path}): {response.status_code}",
+                        status_code=response.status_code
+                    )
+                last_error = VoicevoxError(
+                    f"VOICEVOXリクエストが失敗しました ({path}): {response.status_code}",
+                    status_code=response.status_code
+                )
+            if attempt < self.max_retries:
+                await asyncio.sleep(_backoff_delay(self.backoff_factor, attempt))
+        raise last_error
+
+    async def version(self, timeout: float = VERSION_TIMEOUT) -> str:
+        response = await self._request("GET", "/version", timeout=timeout)
+        return response.text.strip().strip('"')
+
+    async def is_available(self) -> bool:
+        try:
+            await self.version()
+            return True
+        except Exception:
+            return False
+
+    async def speakers(self, timeout: float = SPEAKERS_TIMEOUT) -> List[Dict[str, Any]]:
+        response = await self._request("GET", "/speakers", timeout=timeout)
+        return response.json()
+
+    async def audio_query(self, text: str, speaker: int, timeout: float = AUDIO_QUERY_TIMEOUT) -> Dict[str, Any]:
+        response = await self._request(
+            "POST", "/audio_query",
+            timeout=timeout,
+            params={"text": text, "speaker": speaker}
+        )
+        return response.json()
+
+    async def synthesis(
+        self,
+        query: Dict[str, Any],
+        speaker: int,
+        output_sampling_rate: Optional[int] = None,
+        timeout: float = SYNTHESIS_TIMEOUT
+    ) -> bytes:
+        params: Dict[str, Any] = {"speaker": speaker}
+        if output_sampling_rate is not None:
+            params["outputSamplingRate"] = output_sampling_rate
+        response = await self._request("POST", "/synthesis", timeout=timeout, params=params, json=query)
+        return response.content
+
+    async def initialize_speaker(
+        self, speaker: int, skip_reinit: bool = True, timeout: float = INITIALIZE_TIMEOUT
+    ) -> None:
+        await self._request(
+            "POST", "/initialize_speaker",
+            timeout=timeout,
+            params={"speaker": speaker, "skip_reinit": str(skip_reinit).lower()}
+        )
+
+    async def is_initialized_speaker(self, speaker: int, timeout: float = VERSION_TIMEOUT) -> bool:
+        response = await self._request(
+            "GET", "/is_initialized_speaker", timeout=timeout, params={"speaker": speaker}
+        )
+        return bool(response.json())
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class AsyncVoicevoxBalancer:
+    """VoicevoxBalancer の非同期版
+
+    エンジンの選択・処理中の数・除外と復帰の状態は同期版のバランサと共有するため、
+    同期・非同期の呼び出しが混在しても同じ規則で振り分けられる
+    """
+
+    def __init__(self, balancer: VoicevoxBalancer):
+        self.balancer = balancer
+        self.base_url = balancer.base_url
+        # リトライはバランサ側で別のエンジンに対して行う
+        self.clients = {engine.url: AsyncVoicevoxClient(engine.url, max_retries=0) for engine in balancer.engines}
+
+    async def _acquire(self, exclude: Optional[_Engine] = None) -> _Engine:
+        """空きを待つ間もイベントループを止めないよう、待機はスレッドで行う"""
+        balancer = self.balancer
+        with balancer._condition:
+            engine = balancer._select(exclude)
+            if engine is not None:
+                engine.outstanding += 1
+                engine.total_requests += 1
+                return engine
+        future = asyncio.ensure_future(asyncio.to_thread(balancer._acquire, exclude))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # 待機中に取り消された場合は、後から確保されたエンジンを戻す
+            future.add_done_callback(
+                lambda f: None if f.cancelled() or f.exception() else balancer._release(f.result())
+            )
+            raise
+
+    async def _call(self, method: str, *args, **kwargs):
+        """エンジンを選んで呼び出す（5xx・接続エラー・タイムアウトは別のエンジンでリトライ）"""
+        balancer = self.balancer
+        balancer._start_health_checks()
+        last_error: Optional[VoicevoxError] = None
+        previous: Optional[_Engine] = None
+        for attempt in range(balancer.max_retries + 1):
+            engine = await self._acquire(exclude=previous)
+            failure: Optional[VoicevoxError] = None
+            try:
+                return await getattr(self.clients[engine.url], method)(*args, **kwargs)
+            except VoicevoxError as e:
+                if e.status_code is not None and e.status_code not in RETRY_STATUS_CODES:
+                    raise
+                failure = e
+            finally:
+                balancer._release(engine, failure)
+            last_error = failure
+            previous = engine
+            if attempt < balancer.max_retries:
+                await asyncio.sleep(_backoff_delay(balancer.backoff_factor, attempt) / len(balancer.engines))
+        raise last_error
+
+    async def version(self, timeout: float = VERSION_TIMEOUT) -> str:
+        return await self._call("version", timeout=timeout)
+
+    async def is_available(self) -> bool:
+        try:
+            await self.version()
+            return True
+        except Exception:
+            return False
+
+    async def speakers(self, timeout: float = SPEAKERS_TIMEOUT) -> List[Dict[str, Any]]:
+        return await self._call("speakers", timeout=timeout)
+
+    async def audio_query(self, text: str, speaker: int, timeout: float = AUDIO_QUERY_TIMEOUT) -> Dict[str, Any]:
+        return await self._call("audio_query", text, speaker, timeout=timeout)
+
+    async def synthesis(
+        self,
+        query: Dict[str, Any],
+        speaker: int,
+        output_sampling_rate: Optional[int] = None,
+        timeout: float = SYNTHESIS_TIMEOUT
+    ) -> bytes:
+        return await self._call(
+            "synthesis", query, speaker, output_sampling_rate=output_sampling_rate, timeout=timeout
+        )
+
+    async def initialize_speaker(
+        self, speaker: int, skip_reinit: bool = True, timeout: float = INITIALIZE_TIMEOUT
+    ) -> None:
+        """全エンジンで並行してスタイルを初期化（失敗したエンジンがあれば最初のエラーを送出）"""
+        results = await asyncio.gather(
+            *(client.initialize_speaker(speaker, skip_reinit=skip_reinit, timeout=timeout)
+              for client in self.clients.values()),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def is_initialized_speaker(self, speaker: int, timeout: float = VERSION_TIMEOUT) -> bool:
+        """全エンジンでスタイルが読み込み済みか確認"""
+        results = await asyncio.gather(
+            *(client.is_initialized_speaker(speaker, timeout=timeout) for client in self.clients.values())
+        )
+        return all(results)
+
+    async def aclose(self) -> None:
+        for client in self.clients.values():
+            await client.aclose()
+
+
+_clients: Dict[str, Union[VoicevoxClient, VoicevoxBalancer]] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: Optional[str] = None) -> Union[VoicevoxClient, VoicevoxBalancer]:
+    """URLごとに共有される同期クライアントを取得（接続プールをプロセス内で使い回す）
+
+    複数のエンジンが指定されている場合はロードバランサを返す
+    """
+    urls = get_voicevox_urls(base_url)
+    key = ",".join(urls)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = VoicevoxBalancer(urls) if len(urls) > 1 else VoicevoxClient(urls[0])
+            _clients[key] = client
+        return client
+
+
+_async_clients: Dict[str, Union[AsyncVoicevoxClient, AsyncVoicevoxBalancer]] = {}
+
+
+def get_async_client(base_url: Optional[str] = None) -> Union[AsyncVoicevoxClient, AsyncVoicevoxBalancer]:
+    """URLごとに共有される非同期クライアントを取得（アプリのイベントループ内で使用すること）
+
+    複数のエンジンが指定されている場合は、同期版のロードバランサと状態を共有する非同期のバランサを返す
+    """
+    urls = get_voicevox_urls(base_url)
+    key = ",".join(urls)
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncVoicevoxBalancer(get_client(key)) if len(urls) > 1 else AsyncVoicevoxClient(urls[0])
+        _async_clients[key] = client
+    return client
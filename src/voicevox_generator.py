@@ -1,61 +1,34 @@
-import requests
 import json
 from pathlib import Path
 import time
 
+from voicevox_client import get_client
+
 class VoicevoxGenerator:
     def __init__(self, output_dir="audio", voicevox_url=None):
-        if voicevox_url is None:
-            # 環境変数から取得、なければデフォルト
-            import os
-            voicevox_url = os.getenv("VOICEVOX_URL", "http://localhost:50021")
+        # URL未指定時は環境変数 VOICEVOX_URL から取得（共有クライアントが解決）
+        self.client = get_client(voicevox_url)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
-        self.voicevox_url = voicevox_url
+        self.voicevox_url = self.client.base_url
         self.speaker_id = 3  # ずんだもんのスピーカーID
     
     def check_voicevox_status(self):
         """VOICEVOXが起動しているか確認"""
-        try:
-            response = requests.get(f"{self.voicevox_url}/version")
-            return response.status_code == 200
-        except:
-            return False
+        return self.client.is_available()
     
     def generate_audio(self, text, output_filename, speaker_id=None):
         """VOICEVOXでテキストから音声ファイルを生成"""
         if speaker_id is None:
             speaker_id = self.speaker_id
         
-        # 音声クエリの作成
-        query_data = {
-            "text": text,
-            "speaker": speaker_id
-        }
-        
-        query_response = requests.post(
-            f"{self.voicevox_url}/audio_query",
-            params=query_data
-        )
-        
-        if query_response.status_code != 200:
-            raise Exception(f"音声クエリの作成に失敗: {query_response.status_code}")
-        
-        # 音声合成
-        synthesis_data = query_response.json()
-        synthesis_response = requests.post(
-            f"{self.voicevox_url}/synthesis",
-            params={"speaker": speaker_id},
-            json=synthesis_data
-        )
-        
-        if synthesis_response.status_code != 200:
-            raise Exception(f"音声合成に失敗: {synthesis_response.status_code}")
+        # 音声クエリの作成と音声合成
+        wav_bytes = self.client.tts(text, speaker_id)
         
         # ファイルに保存
         output_path = self.output_dir / output_filename
         with open(output_path, "wb") as f:
-            f.write(synthesis_response.content)
+            f.write(wav_bytes)
         
         return str(output_path)
     
@@ -0,0 +1,9 @@
+"""
+テスト共通設定 - プロジェクトルートと src をインポートパスに追加
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
@@ -0,0 +1,33 @@
+"""
+音声処理のテストで使う合成信号
+"""
+import numpy as np
+
+SAMPLE_RATE = 24000
+
+
+def make_voice(seconds, seed):
+    """音声に近い信号（ピッチの揺れる倍音＋音節ごとの振幅変化）、前後に0.1秒の無音"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = 160 + 30 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, np.pi))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    voice = 0.25 * voice * np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None) ** 0.5
+    pad = int(0.1 * SAMPLE_RATE)
+    voice[:pad] = 0
+    voice[-pad:] = 0
+    return voice.astype(np.float32)
+
+
+def add_engine_noise(clean, seed):
+    """低域のビープ音と広帯域ノイズを加える"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(len(clean)) / SAMPLE_RATE
+    noise = 0.02 * np.sin(2 * np.pi * 350 * t) + 0.01 * np.sin(2 * np.pi * 1200 * t)
+    return (clean + noise + 0.01 * rng.standard_normal(len(clean))).astype(np.float32)
+
+
+def snr_db(clean, processed):
+    noise = processed[:len(clean)] - clean
+    return 10 * np.log10(np.sum(clean ** 2) / np.sum(noise ** 2))
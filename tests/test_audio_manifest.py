@@ -0,0 +1,120 @@
+"""
+音声マニフェストによる既存音声の再利用と番号の振り直しのテスト
+"""
+import numpy as np
+import pytest
+import soundfile as sf
+
+from api.core.audio_generator import AudioGenerator
+from api.core.audio_manifest import AudioManifest, measure_audio_file
+
+
+def _task(slide, line, speaker, key):
+    return {
+        "text": f"text-{key}",
+        "slide": slide,
+        "line": line,
+        "speaker": speaker,
+        "speaker_id": 1,
+        "audio_filename": f"slide_{slide:03d}_{line:03d}_{speaker}.wav",
+        "params": {},
+        "synthesis_key": key,
+        "noise_profile_key": "speaker1",
+        "chunks": [f"text-{key}"],
+    }
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.setenv("VOICEVOX_URL", "http://localhost:50021")
+    return AudioGenerator("job", tmp_path, use_cache=False)
+
+
+def _write_previous(generator, tasks):
+    """前回の合成結果（行ごとに内容の異なるWAV）とマニフェストを用意"""
+    entries = []
+    for i, task in enumerate(tasks):
+        path = generator.audio_dir / task["audio_filename"]
+        sf.write(path, np.full(240 * (i + 1), 0.1, dtype=np.float32), 24000, subtype="PCM_16")
+        entries.append(generator._manifest_entry(task, measure_audio_file(path)))
+    AudioManifest(generator.audio_dir).save(entries)
+    return {task["synthesis_key"]: measure_audio_file(generator.audio_dir / task["audio_filename"])["sha256"]
+            for task in tasks}
+
+
+def _sha(generator, filename):
+    return measure_audio_file(generator.audio_dir / filename)["sha256"]
+
+
+def test_unchanged_lines_are_reused(generator):
+    tasks = [_task(1, 1, "speaker1", "A"), _task(1, 2, "speaker2", "B")]
+    _write_previous(generator, tasks)
+
+    entries, pending = generator._reuse_previous_audio(AudioManifest(generator.audio_dir), tasks)
+
+    assert pending == []
+    assert sorted(e["file"] for e in entries) == sorted(t["audio_filename"] for t in tasks)
+
+
+def test_inserted_line_renumbers_following_lines(generator):
+    old_tasks = [_task(1, 1, "speaker1", "A"), _task(1, 2, "speaker2", "B")]
+    hashes = _write_previous(generator, old_tasks)
+    # 先頭に1行挿入して後ろの行の番号がずれた対話
+    new_tasks = [_task(1, 1, "speaker2", "C"), _task(1, 2, "speaker1", "A"), _task(1, 3, "speaker2", "B")]
+
+    entries, pending = generator._reuse_previous_audio(AudioManifest(generator.audio_dir), new_tasks)
+
+    assert [t["synthesis_key"] for t in pending] == ["C"]
+    by_file = {e["file"]: e for e in entries}
+    assert by_file["slide_001_002_speaker1.wav"]["synthesis_key"] == "A"
+    assert by_file["slide_001_003_speaker2.wav"]["line"] == 3
+    assert _sha(generator, "slide_001_002_speaker1.wav") == hashes["A"]
+    assert _sha(generator, "slide_001_003_speaker2.wav") == hashes["B"]
+    # 付け替え元の古いファイルは残らない
+    assert not (generator.audio_dir / "slide_001_001_speaker1.wav").exists()
+
+
+def test_swapped_lines_exchange_files(generator):
+    old_tasks = [_task(1, 1, "speaker1", "A"), _task(1, 2, "speaker1", "B")]
+    hashes = _write_previous(generator, old_tasks)
+    new_tasks = [_task(1, 1, "speaker1", "B"), _task(1, 2, "speaker1", "A")]
+
+    entries, pending = generator._reuse_previous_audio(AudioManifest(generator.audio_dir), new_tasks)
+
+    assert pending == []
+    assert _sha(generator, "slide_001_001_speaker1.wav") == hashes["B"]
+    assert _sha(generator, "slide_001_002_speaker1.wav") == hashes["A"]
+    assert not list(generator.audio_dir.glob(".*.renaming"))
+
+
+def test_removed_lines_delete_stale_files(generator):
+    old_tasks = [_task(1, 1, "speaker1", "A"), _task(2, 1, "speaker2", "B")]
+    _write_previous(generator, old_tasks)
+    new_tasks = [_task(1, 1, "speaker1", "A")]
+
+    entries, pending = generator._reuse_previous_audio(AudioManifest(generator.audio_dir), new_tasks)
+
+    assert pending == []
+    assert [e["file"] for e in entries] == ["slide_001_001_speaker1.wav"]
+    assert not (generator.audio_dir / "slide_002_001_speaker2.wav").exists()
+
+
+def test_changed_line_is_resynthesized(generator):
+    _write_previous(generator, [_task(1, 1, "speaker1", "A")])
+    new_tasks = [_task(1, 1, "speaker1", "A2")]
+
+    entries, pending = generator._reuse_previous_audio(AudioManifest(generator.audio_dir), new_tasks)
+
+    assert entries == []
+    assert [t["synthesis_key"] for t in pending] == ["A2"]
+
+
+def test_manifest_orders_entries_by_slide_and_line(tmp_path):
+    manifest = AudioManifest(tmp_path)
+    manifest.save([
+        {"file": "b", "slide": 10, "line": 1},
+        {"file": "a", "slide": 2, "line": 2},
+        {"file": "c", "slide": 2, "line": 1},
+    ])
+    assert [e["file"] for e in manifest.load()] == ["c", "a", "b"]
+    assert [e["file"] for e in manifest.entries_by_slide()[2]] == ["c", "a"]
@@ -0,0 +1,72 @@
+"""
+ビープ音・クリック音検出（スペクトルゲートを掛けるかの判定）のテスト
+"""
+import numpy as np
+
+from api.core.beep_detector import BeepDetector, is_beep_detection_enabled
+from tests.signals import SAMPLE_RATE, make_voice
+
+
+def _with_beep(clean, freq, amplitude=0.01):
+    t = np.arange(len(clean)) / SAMPLE_RATE
+    return (clean + amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _with_floor(clean, seed=0, level=1e-4):
+    # 実際の出力と同じく、無音区間にもごく小さな広帯域ノイズがある
+    rng = np.random.default_rng(seed)
+    return (clean + level * rng.standard_normal(len(clean))).astype(np.float32)
+
+
+def test_clean_voice_does_not_need_denoise():
+    result = BeepDetector().analyze(_with_floor(make_voice(2, seed=1)), SAMPLE_RATE)
+    assert not result["needs_denoise"]
+    assert result["beep_score"] < 15.0
+
+
+def test_narrowband_beep_is_detected_in_each_range():
+    detector = BeepDetector()
+    for freq in (350, 1200):
+        noisy = _with_beep(_with_floor(make_voice(2, seed=1)), freq)
+        result = detector.analyze(noisy, SAMPLE_RATE)
+        assert result["needs_denoise"], freq
+        assert result["beep_score"] >= 15.0
+
+
+def test_beep_outside_ranges_is_ignored():
+    noisy = _with_beep(_with_floor(make_voice(2, seed=1)), 6000)
+    assert not BeepDetector().analyze(noisy, SAMPLE_RATE)["needs_denoise"]
+
+
+def test_edge_click_is_detected():
+    detector = BeepDetector()
+    clip = _with_floor(make_voice(2, seed=2))
+    assert detector.edge_score(clip, SAMPLE_RATE) < 8.0
+    clip[100] += 0.5
+    result = detector.analyze(clip, SAMPLE_RATE)
+    assert result["edge_score"] >= 8.0
+    assert result["needs_denoise"]
+
+
+def test_click_in_the_middle_is_not_an_edge():
+    clip = _with_floor(make_voice(2, seed=2))
+    clip[len(clip) // 2] += 0.5
+    assert BeepDetector().edge_score(clip, SAMPLE_RATE) < 8.0
+
+
+def test_degenerate_inputs():
+    detector = BeepDetector()
+    assert detector.analyze(np.zeros(0, dtype=np.float32), SAMPLE_RATE) == {
+        "needs_denoise": False, "beep_score": 0.0, "edge_score": 0.0,
+    }
+    # 完全な無音や n_fft より短い音声でも判定できる
+    assert not detector.analyze(np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)["needs_denoise"]
+    assert detector.beep_score(np.zeros(100, dtype=np.float32), SAMPLE_RATE) == 0.0
+
+
+def test_enabled_flag(monkeypatch):
+    monkeypatch.delenv("AUDIO_BEEP_DETECTION", raising=False)
+    assert is_beep_detection_enabled()
+    monkeypatch.setenv("AUDIO_BEEP_DETECTION", "0")
+    assert not is_beep_detection_enabled()
+    assert is_beep_detection_enabled(True)
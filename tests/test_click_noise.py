@@ -0,0 +1,47 @@
+"""
+クリック音除去（ImprovedAudioProcessor.remove_click_noise）のテスト
+"""
+import numpy as np
+
+from api.core.audio_generator import ImprovedAudioProcessor
+
+
+def _voice(n=4800, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 24000
+    return (0.2 * np.sin(2 * np.pi * 180 * t) + 0.005 * rng.standard_normal(n)).astype(np.float32)
+
+
+def test_only_sudden_changes_are_interpolated():
+    audio = _voice()
+    for position in (1000, 2500, 4000):
+        audio[position] += 0.8
+    diff = np.diff(audio)
+    flagged = set(np.flatnonzero(np.abs(diff) > np.std(diff) * 5))
+    result = ImprovedAudioProcessor().remove_click_noise(audio.copy())
+    changed = set(np.flatnonzero(result != audio))
+    assert changed <= flagged
+    assert {1000, 2500, 4000} <= changed
+    # 長さ（テンポ）は変わらず、クリックは十分に減衰する
+    assert len(result) == len(audio)
+    assert max(abs(result[p]) for p in (1000, 2500, 4000)) < 0.3
+
+
+def test_window_means_use_original_samples():
+    # 近接したクリックは補間前の値から平均を取るため、互いの補間結果に依存しない
+    audio = _voice()
+    audio[2000] += 0.8
+    audio[2003] -= 0.8
+    original = audio.astype(np.float64)
+    result = ImprovedAudioProcessor().remove_click_noise(audio.copy())
+    for index in (2000, 2003):
+        assert result[index] == np.float32(original[index - 5:index + 5].mean())
+
+
+def test_edges_and_empty_input_are_left_alone():
+    processor = ImprovedAudioProcessor()
+    assert len(processor.remove_click_noise(np.zeros(0, dtype=np.float32))) == 0
+    audio = _voice()
+    audio[3] += 0.8
+    audio[-3] += 0.8
+    np.testing.assert_array_equal(processor.remove_click_noise(audio.copy()), audio)
@@ -0,0 +1,99 @@
+"""
+目標時間への合わせ込み（話速の二分探索・話者ごとの上下限・行間・削るスライド）のテスト
+"""
+import pytest
+
+from api.core.duration_fitter import (
+    FIT_MODE_PER_SPEAKER,
+    MAX_TRIM_RATIO,
+    DurationFitter,
+    _bisect,
+    load_duration_fit,
+    save_duration_fit,
+)
+
+
+def _prediction(speed_scales=None):
+    """2スライド × 2行（各10秒）、話者 A・B"""
+    speed_scales = speed_scales or {}
+    lines = [
+        {"slide": slide, "speaker": speaker, "duration": 10.0, "speed_scale": speed_scales.get(speaker, 1.0)}
+        for slide in (1, 2)
+        for speaker in ("A", "B")
+    ]
+    return {"lines": lines, "slides": [{"slide": 1}, {"slide": 2}]}
+
+
+def _fitter(**kwargs):
+    options = dict(min_speed=0.85, max_speed=1.3, min_gap=0.1, max_gap=0.5, tolerance=0.001)
+    options.update(kwargs)
+    return DurationFitter(**options)
+
+
+def test_bisect_finds_target_and_clamps_to_range():
+    assert _bisect(lambda x: 2 * x, 3.0, 0.0, 10.0, increasing=True) == pytest.approx(1.5)
+    assert _bisect(lambda x: 10 / x, 4.0, 1.0, 10.0, increasing=False) == pytest.approx(2.5)
+    # 範囲内で届かない場合は端を返す
+    assert _bisect(lambda x: 2 * x, 100.0, 0.0, 10.0, increasing=True) == pytest.approx(10.0)
+    assert _bisect(lambda x: 10 / x, 0.1, 1.0, 10.0, increasing=False) == pytest.approx(10.0)
+
+
+def test_global_mode_scales_all_speakers_equally():
+    # 発話40秒 + 行間0.2秒×2 + 末尾0.3秒×2 = 41秒 → 36秒（転場なし）
+    plan = _fitter().fit(_prediction(), 36.0, transition_type="none")
+    assert plan["predicted_before"] == pytest.approx(41.0)
+    assert plan["predicted_after"] == pytest.approx(36.0, abs=1e-3)
+    assert plan["status"] == "fitted"
+    assert plan["speed_factors"]["A"] == plan["speed_factors"]["B"] == pytest.approx(40 / 35, abs=1e-4)
+    assert plan["line_gap"] == pytest.approx(0.2)
+    assert plan["slides_to_trim"] == []
+
+
+def test_global_mode_keeps_every_speaker_within_limits():
+    # 話者 B は既に 1.25 のため、全体の係数は 1.3 / 1.25 が上限になる
+    plan = _fitter().fit(_prediction({"B": 1.25}), 30.0, transition_type="none")
+    assert plan["speed_scales"]["B"] == pytest.approx(1.3, abs=1e-3)
+    assert plan["speed_factors"]["A"] == plan["speed_factors"]["B"]
+
+
+def test_per_speaker_mode_absorbs_capped_speaker():
+    plan = _fitter(mode=FIT_MODE_PER_SPEAKER).fit(_prediction({"B": 1.25}), 36.0, transition_type="none")
+    assert plan["status"] == "fitted"
+    assert plan["predicted_after"] == pytest.approx(36.0, abs=0.05)
+    # B は上限で頭打ちになり、残りを A が吸収する
+    assert plan["speed_scales"]["B"] == pytest.approx(1.3, abs=1e-3)
+    assert plan["speed_factors"]["A"] > plan["speed_factors"]["B"]
+    assert 0.85 <= plan["speed_scales"]["A"] <= 1.3
+
+
+def test_line_gap_takes_up_what_speed_cannot():
+    # 最も遅い話速 0.85 でも 48.06 秒のため、残りを行間で伸ばす
+    plan = _fitter().fit(_prediction(), 48.5, transition_type="none")
+    assert plan["speed_scales"]["A"] == pytest.approx(0.85, abs=1e-3)
+    assert 0.2 < plan["line_gap"] < 0.5
+    assert plan["predicted_after"] == pytest.approx(48.5, abs=1e-3)
+    assert plan["status"] == "fitted"
+
+
+def test_too_long_lists_slides_to_trim_in_slide_order():
+    plan = _fitter().fit(_prediction(), 25.0, transition_type="none")
+    assert plan["status"] == "too_long"
+    assert plan["line_gap"] == pytest.approx(0.1)
+    trims = plan["slides_to_trim"]
+    assert [item["slide"] for item in trims] == [1, 2]
+    speech_per_slide = 20.0 / plan["speed_factors"]["A"]
+    assert all(item["trim_seconds"] <= speech_per_slide * MAX_TRIM_RATIO + 1e-3 for item in trims)
+    assert sum(item["trim_seconds"] for item in trims) == pytest.approx(plan["predicted_after"] - 25.0, abs=1e-2)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        DurationFitter(mode="random")
+
+
+def test_preview_plan_is_saved_separately(tmp_path):
+    save_duration_fit(tmp_path, "job", {"applied": True})
+    save_duration_fit(tmp_path, "job", {"applied": False}, preview=True)
+    assert load_duration_fit(tmp_path, "job") == {"applied": True}
+    assert load_duration_fit(tmp_path, "job", preview=True) == {"applied": False}
+    assert load_duration_fit(tmp_path, "other") is None
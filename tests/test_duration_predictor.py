@@ -0,0 +1,56 @@
+"""
+合成前の音声長の予測（音素ごとのフレーム丸めと動画全体の積み上げ）のテスト
+"""
+import pytest
+
+from api.core.duration_predictor import (
+    FRAME_RATE,
+    predict_query_duration,
+    predict_slide_duration,
+    predict_total_duration,
+)
+from narration_timeline import LINE_GAP, SILENT_SLIDE_DURATION, SLIDE_TAIL
+
+FRAME = 1 / FRAME_RATE  # 256 / 24000 秒
+
+
+def _query(*moras, pause=None, pre=0.1, post=0.1, speed=1.0):
+    phrase = {"moras": [{"consonant_length": c, "vowel_length": v} for c, v in moras]}
+    if pause is not None:
+        phrase["pause_mora"] = {"consonant_length": None, "vowel_length": pause}
+    return {"accent_phrases": [phrase], "prePhonemeLength": pre, "postPhonemeLength": post, "speedScale": speed}
+
+
+def test_each_phoneme_is_rounded_to_frames():
+    # 0.6フレームの音素は1フレーム、0.4フレームの音素は0フレームに丸められる（合計で丸めない）
+    query = _query((0.6 * FRAME, 0.4 * FRAME), (None, 0.6 * FRAME), pre=0, post=0)
+    assert predict_query_duration(query) == pytest.approx(2 * FRAME)
+
+
+def test_pre_post_and_pause_moras_are_counted():
+    query = _query((None, 3 * FRAME), pause=2 * FRAME, pre=4 * FRAME, post=5 * FRAME)
+    assert predict_query_duration(query) == pytest.approx(14 * FRAME)
+
+
+def test_speed_scale_divides_before_rounding():
+    query = _query((None, 3 * FRAME), pre=0, post=0, speed=2.0)
+    # 1.5フレームは偶数丸めで2フレーム
+    assert predict_query_duration(query) == pytest.approx(2 * FRAME)
+    # 合成パラメータの上書きが audio_query の値より優先される
+    assert predict_query_duration(query, {"speedScale": 1.0}) == pytest.approx(3 * FRAME)
+    assert predict_query_duration(query, {"speedScale": 0}) == pytest.approx(3 * FRAME)
+
+
+def test_defaults_for_missing_fields():
+    # 前後の無音は既定で0.1秒（約9.4フレーム → 9フレーム）ずつ
+    assert predict_query_duration({"accent_phrases": []}) == pytest.approx(18 * FRAME)
+
+
+def test_slide_and_total_durations_follow_timeline_constants():
+    assert predict_slide_duration([]) == SILENT_SLIDE_DURATION
+    assert predict_slide_duration([1.0, 2.0, 3.0]) == pytest.approx(6.0 + 2 * LINE_GAP + SLIDE_TAIL)
+    assert predict_slide_duration([1.0, 2.0], line_gap=0.5) == pytest.approx(3.5 + SLIDE_TAIL)
+    # crossfade は転場の長さ（スライドの半分が上限）だけ重なる
+    assert predict_total_duration([4.0, 0.6, 3.0], "crossfade", 0.4) == pytest.approx(7.6 - 0.3 - 0.3)
+    assert predict_total_duration([4.0, 3.0], "none", 0.4) == pytest.approx(7.0)
+    assert predict_total_duration([]) == 0.0
@@ -0,0 +1,162 @@
+"""
+ffmpegレンダラーのフィルタグラフの組み立て（フレーム境界・xfade の位置・区間の分割・静止区間の間引き）のテスト
+"""
+import re
+
+import pytest
+
+from ffmpeg_video_creator import FFmpegVideoCreator, _frame_bounds
+from narration_timeline import slide_starts
+
+FPS = 24
+
+
+def _timeline(durations, transition_type="crossfade", transition_duration=0.4):
+    starts, _ = slide_starts(durations, transition_type, transition_duration)
+    return starts, durations
+
+
+def _xfades(filters):
+    """xfade ごとの (offset, duration) をフレーム数で返す"""
+    result = []
+    for line in filters:
+        match = re.search(r"xfade=transition=\w+:duration=([\d.]+):offset=([\d.]+)", line)
+        if match:
+            result.append((float(match.group(2)) * FPS, float(match.group(1)) * FPS))
+    return result
+
+
+def test_frame_bounds_are_rounded_from_absolute_times():
+    # 1スライドあたり 24.24 フレーム、50枚並べても丸め誤差が積み上がらない
+    starts, durations = _timeline([1.01] * 50, "none", 0)
+    bounds = _frame_bounds(starts, durations, FPS)
+    assert bounds[-1][1] == round(50 * 1.01 * FPS)
+    assert all(prev[1] == cur[0] for prev, cur in zip(bounds, bounds[1:]))
+
+
+def test_xfade_offsets_lie_on_slide_frame_boundaries():
+    durations = [3.37, 2.91, 4.13, 1.07, 5.55]
+    starts, durations = _timeline(durations)
+    bounds = _frame_bounds(starts, durations, FPS)
+    filters = FFmpegVideoCreator(still_fps=0)._video_filters(
+        starts, durations, 1280, 720, FPS, "crossfade", starts[-1] + durations[-1]
+    )
+    xfades = _xfades(filters)
+    assert len(xfades) == len(durations) - 1
+    for i, (offset, length) in enumerate(xfades, start=1):
+        assert offset == pytest.approx(bounds[i][0], abs=1e-3)
+        assert offset == pytest.approx(round(offset), abs=1e-3)
+        # 転場は前のスライドの最後のフレームちょうどで終わる（入力の長さを超えない）
+        assert offset + length == pytest.approx(bounds[i - 1][1], abs=1e-3)
+
+
+def test_slide_inputs_are_looped_to_their_frame_counts():
+    starts, durations = _timeline([2.03, 1.51, 2.77])
+    bounds = _frame_bounds(starts, durations, FPS)
+    filters = FFmpegVideoCreator(still_fps=0)._video_filters(starts, durations, 640, 360, FPS, "slide", 5.0)
+    loops = [int(re.search(r"loop=loop=(\d+)", line).group(1)) for line in filters if "loop=loop" in line]
+    assert loops == [end - begin - 1 for begin, end in bounds]
+    assert all("transition=slideleft" in line for line in filters if "xfade" in line)
+
+
+def test_no_transition_concatenates():
+    starts, durations = _timeline([1.0, 1.0], "none", 0.4)
+    filters = FFmpegVideoCreator(still_fps=0)._video_filters(starts, durations, 640, 360, FPS, "none", 2.0)
+    assert not _xfades(filters)
+    assert any("concat=n=2" in line for line in filters)
+    assert filters[-1].endswith("fade=t=out:st=1.000:d=1.0[vout]")
+
+
+class TestPlanSegments:
+    def _plan(self, durations, transition_type="crossfade"):
+        starts, durations = _timeline(durations, transition_type)
+        images = [f"slide_{i}.png" for i in range(len(durations))]
+        creator = FFmpegVideoCreator(still_fps=0)
+        segments, total_frames = creator._plan_segments(images, starts, durations, FPS, transition_type)
+        return segments, total_frames, _frame_bounds(starts, durations, FPS), creator, starts, durations
+
+    def test_segments_tile_the_timeline(self):
+        segments, total_frames, bounds, *_ = self._plan([3.37, 2.91, 4.13, 1.07, 5.55])
+        assert total_frames == bounds[-1][1]
+        assert segments[0]["start_frame"] == 0
+        for prev, cur in zip(segments, segments[1:]):
+            assert cur["start_frame"] == prev["start_frame"] + prev["frames"]
+        # 区間のフレーム数の合計は一括レンダリングと一致する
+        assert sum(segment["frames"] for segment in segments) == total_frames
+        assert [segment["kind"] for segment in segments] == ["slide", "transition"] * 4 + ["slide"]
+
+    def test_transitions_match_single_pass_xfades(self):
+        segments, total_frames, bounds, creator, starts, durations = self._plan([2.5, 3.1, 2.2])
+        xfades = _xfades(creator._video_filters(starts, durations, 640, 360, FPS, "crossfade", total_frames / FPS))
+        transitions = [segment for segment in segments if segment["kind"] == "transition"]
+        assert [(t["start_frame"], t["frames"]) for t in transitions] == [
+            (round(offset), round(length)) for offset, length in xfades
+        ]
+        assert transitions[0]["images"] == ["slide_0.png", "slide_1.png"]
+        assert transitions[0]["transition"] == "fade"
+
+    def test_fully_overlapped_slide_has_no_body(self):
+        # 0.5秒のスライドは前後の転場（各0.25秒）で全体が重なる
+        segments, total_frames, *_ = self._plan([2.0, 0.5, 2.0])
+        assert [segment["kind"] for segment in segments] == ["slide", "transition", "transition", "slide"]
+        assert sum(segment["frames"] for segment in segments) == total_frames
+
+    def test_no_transition_gives_only_slides(self):
+        segments, total_frames, bounds, *_ = self._plan([1.3, 1.7], "none")
+        assert [(s["kind"], s["start_frame"], s["frames"]) for s in segments] == [
+            ("slide", 0, bounds[0][1]), ("slide", bounds[1][0], bounds[1][1] - bounds[1][0]),
+        ]
+
+
+def _selected_frames(expression, total_frames):
+    """select の式を評価して残るフレーム番号を返す"""
+    namespace = {
+        "between": lambda n, a, b: int(a <= n <= b),
+        "not_": lambda x: int(not x),
+        "mod": lambda a, b: a % b,
+        "eq": lambda a, b: int(a == b),
+        "gte": lambda a, b: int(a >= b),
+    }
+    code = compile(expression.replace("not(", "not_("), "<select>", "eval")
+    return [n for n in range(total_frames) if eval(code, {**namespace, "n": n})]
+
+
+class TestStillSelect:
+    def test_still_step(self):
+        assert FFmpegVideoCreator(still_fps=2)._still_step(24) == 12
+        assert FFmpegVideoCreator(still_fps=5)._still_step(24) == 5
+        assert FFmpegVideoCreator(still_fps=0)._still_step(24) == 0
+        assert FFmpegVideoCreator(still_fps=30)._still_step(24) == 0
+
+    def test_keeps_transitions_fade_and_segment_edges(self):
+        starts, durations = _timeline([3.37, 2.91, 4.13])
+        creator = FFmpegVideoCreator(still_fps=2)
+        segments, total_frames = creator._plan_segments(
+            ["a.png", "b.png", "c.png"], starts, durations, FPS, "crossfade"
+        )
+        selected = set(_selected_frames(creator._still_select(segments, FPS, total_frames), total_frames))
+
+        for segment in segments:
+            first = segment["start_frame"]
+            last = first + segment["frames"] - 1
+            frames = set(range(first, last + 1))
+            if segment["kind"] == "transition":
+                # 転場は全フレーム（前後1フレームも含む）
+                assert frames | {first - 1, last + 1} <= selected
+            else:
+                # 静止区間は先頭から12フレームおきと末尾のフレーム（キーフレームの位置）
+                assert {first, last} <= selected
+                kept = {n for n in frames if n in selected}
+                assert {n for n in range(first, last + 1, 12)} <= kept
+        # 最後のフェードアウト（1秒）は全フレーム
+        assert set(range(total_frames - FPS, total_frames)) <= selected
+        assert len(selected) < total_frames / 2
+
+    def test_body_frames_between_steps_are_dropped(self):
+        starts, durations = _timeline([6.0], "none", 0)
+        creator = FFmpegVideoCreator(still_fps=2)
+        segments, total_frames = creator._plan_segments(["a.png"], starts, durations, FPS, "none")
+        selected = _selected_frames(creator._still_select(segments, FPS, total_frames), total_frames)
+        fade_start = total_frames - FPS
+        assert [n for n in selected if n < fade_start] == list(range(0, fade_start, 12))
+        assert selected[-1] == total_frames - 1
@@ -0,0 +1,58 @@
+"""
+フィルタバンク（SOS形式のノッチ・ローパス）を従来の実装と比較するテスト
+"""
+import numpy as np
+import pytest
+from scipy import signal
+
+from api.core.filter_bank import NOTCH_FREQS, NOTCH_Q, get_filter_bank
+from tests.signals import SAMPLE_RATE, add_engine_noise, make_voice
+
+
+def legacy_notch(audio_data, sample_rate):
+    """従来のフォールバック（ノッチごとに float64 の filtfilt）"""
+    for freq in NOTCH_FREQS:
+        b, a = signal.iirnotch(freq / (sample_rate / 2), NOTCH_Q)
+        audio_data = signal.filtfilt(b, a, audio_data.astype(np.float64))
+    return audio_data
+
+
+def legacy_lowpass(audio_data, sample_rate):
+    """従来のローパス（4次Butterworth、lfilter）"""
+    b, a = signal.butter(4, 10000 / (sample_rate / 2), btype="low")
+    return signal.lfilter(b, a, audio_data.astype(np.float64))
+
+
+@pytest.fixture(scope="module")
+def noisy_clip():
+    clean = make_voice(3, seed=3)
+    return clean, add_engine_noise(clean, seed=4)
+
+
+class TestFilterBank:
+    def test_lowpass_matches_lfilter(self, noisy_clip):
+        _, noisy = noisy_clip
+        expected = legacy_lowpass(noisy, SAMPLE_RATE)
+        actual = get_filter_bank(SAMPLE_RATE).apply_lowpass(noisy)
+        assert actual.dtype == np.float32
+        np.testing.assert_allclose(actual, expected, atol=1e-4)
+
+    def test_notch_lowpass_matches_filtfilt_chain(self, noisy_clip):
+        _, noisy = noisy_clip
+        # 従来のノッチの後に同じローパスをゼロ位相で掛けた結果と比較（境界のパディングの差は除く）
+        b, a = signal.butter(4, 10000, btype="low", fs=SAMPLE_RATE)
+        expected = signal.filtfilt(b, a, legacy_notch(noisy, SAMPLE_RATE))
+        actual = get_filter_bank(SAMPLE_RATE).apply_notch_lowpass(noisy)
+        edge = SAMPLE_RATE // 4
+        np.testing.assert_allclose(actual[edge:-edge], expected[edge:-edge], atol=1e-3)
+
+    def test_notch_removes_beep(self):
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        beep = np.sin(2 * np.pi * 350 * t).astype(np.float32)
+        filtered = get_filter_bank(SAMPLE_RATE).apply_notch_lowpass(beep)
+        middle = slice(SAMPLE_RATE // 4, -SAMPLE_RATE // 4)
+        assert np.sqrt(np.mean(filtered[middle] ** 2)) < 0.05 * np.sqrt(np.mean(beep[middle] ** 2))
+
+    def test_banks_are_shared_per_sample_rate(self):
+        assert get_filter_bank(SAMPLE_RATE) is get_filter_bank(SAMPLE_RATE)
+        assert get_filter_bank(16000) is not get_filter_bank(SAMPLE_RATE)
@@ -0,0 +1,58 @@
+"""
+長い行の分割と連結のテスト
+"""
+import io
+
+import numpy as np
+import soundfile as sf
+
+from api.core.line_chunker import concatenate_wav_chunks, get_chunk_max_chars, split_text
+
+
+class TestSplitText:
+    def test_short_or_disabled_is_not_split(self):
+        assert split_text("短い文です。", 20) == ["短い文です。"]
+        assert split_text("これは長い文です。" * 10, 0) == ["これは長い文です。" * 10]
+
+    def test_splits_after_sentence_delimiters(self):
+        text = "一つ目の文です。二つ目の文です！三つ目の文ですか？"
+        assert split_text(text, 10) == ["一つ目の文です。", "二つ目の文です！", "三つ目の文ですか？"]
+
+    def test_merges_short_sentences_within_limit(self):
+        assert split_text("はい。そうです。違います。", 8) == ["はい。そうです。", "違います。"]
+
+    def test_long_sentence_falls_back_to_clauses(self):
+        text = "最初の部分があり、次の部分があり、最後の部分で終わります。"
+        chunks = split_text(text, 12)
+        assert chunks == ["最初の部分があり、", "次の部分があり、", "最後の部分で終わります。"]
+
+    def test_symbol_only_fragments_stay_attached(self):
+        chunks = split_text("「そうですね」。」本当にそう思います！", 8)
+        assert all(any(ch.isalnum() for ch in chunk) for chunk in chunks)
+        assert "".join(chunks) == "「そうですね」。」本当にそう思います！"
+
+    def test_text_is_preserved(self):
+        text = "区切りのない非常に長い断片がそのまま残ることを確認する" + "。短い。" * 5
+        assert "".join(split_text(text, 10)) == text
+
+
+def test_chunk_max_chars_from_env(monkeypatch):
+    monkeypatch.setenv("TTS_CHUNK_MAX_CHARS", "40")
+    assert get_chunk_max_chars() == 40
+    assert get_chunk_max_chars(-3) == 0
+
+
+def _wav(samples, sr=24000):
+    buffer = io.BytesIO()
+    sf.write(buffer, np.full(samples, 0.5, dtype=np.float32), sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def test_concatenate_inserts_pauses_and_fades_edges():
+    joined, sr = sf.read(io.BytesIO(concatenate_wav_chunks([_wav(1000), _wav(2000)], pause=0.1)), dtype="float32")
+    assert sr == 24000
+    assert len(joined) == 1000 + 2400 + 2000
+    # チャンク間は無音、境界はフェードで0に近づく
+    assert np.all(joined[1000:3400] == 0)
+    assert abs(joined[999]) < 0.01 and abs(joined[3400]) < 0.01
+    assert abs(joined[500] - 0.5) < 0.01
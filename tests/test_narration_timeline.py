@@ -0,0 +1,115 @@
+"""
+ナレーションのタイムラインを moviepy で行ごとに連結していた従来の処理と比較するテスト
+"""
+import numpy as np
+import pytest
+import soundfile as sf
+
+from narration_timeline import (
+    LINE_FADE,
+    LINE_VOLUME,
+    SAMPLE_RATE,
+    SILENT_SLIDE_DURATION,
+    SLIDE_TAIL,
+    NarrationTimeline,
+    slide_starts,
+    transition_overlap,
+)
+
+
+def _write_line(path, seconds, freq):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    sf.write(str(path), 0.5 * np.sin(2 * np.pi * freq * t), SAMPLE_RATE, subtype="PCM_16")
+    data, _ = sf.read(str(path), dtype="float32")
+    return {"audio_path": str(path)}, data
+
+
+def legacy_narration(slides, line_gap, transition_type, transition_duration):
+    """従来の moviepy の処理（行ごとにフェード・音量 → 行間の無音 → 末尾の余白、前のスライドに重ねて配置）"""
+    ratio = {"crossfade": 0.5}.get(transition_type, 0.3)
+    clips = []
+    for lines in slides:
+        if not lines:
+            clips.append(np.zeros(int(SILENT_SLIDE_DURATION * SAMPLE_RATE), dtype=np.float32))
+            continue
+        parts = []
+        for i, data in enumerate(lines):
+            # audio_fadein / audio_fadeout は t / フェード時間 の線形のゲイン
+            t = np.arange(len(data)) / SAMPLE_RATE
+            gain = np.minimum(t / LINE_FADE, 1) * np.minimum((len(data) / SAMPLE_RATE - t) / LINE_FADE, 1)
+            parts.append(data * gain * LINE_VOLUME)
+            if i < len(lines) - 1:
+                parts.append(np.zeros(int(SAMPLE_RATE * line_gap)))
+        parts.append(np.zeros(int(SAMPLE_RATE * SLIDE_TAIL)))
+        clips.append(np.concatenate(parts))
+
+    starts = [0.0]
+    current = len(clips[0]) / SAMPLE_RATE
+    for prev, clip in zip(clips, clips[1:]):
+        overlap = min(transition_duration, len(prev) / SAMPLE_RATE * ratio, len(clip) / SAMPLE_RATE * ratio)
+        if transition_type == "none":
+            overlap = 0.0
+        starts.append(current - overlap)
+        current = starts[-1] + len(clip) / SAMPLE_RATE
+    narration = np.zeros(int(round(current * SAMPLE_RATE)) + 1)
+    for start, clip in zip(starts, clips):
+        offset = int(round(start * SAMPLE_RATE))
+        narration[offset:offset + len(clip)] += clip
+    return narration, starts
+
+
+@pytest.fixture
+def slides(tmp_path):
+    """3行・1行・音声なし・2行のスライド"""
+    layout = [[1.3, 0.8, 2.1], [0.6], [], [1.7, 1.1]]
+    infos, arrays = [], []
+    for s, seconds_list in enumerate(layout):
+        slide_infos, slide_arrays = [], []
+        for i, seconds in enumerate(seconds_list):
+            info, data = _write_line(tmp_path / f"slide_{s}_{i}.wav", seconds, 200 + 50 * i)
+            slide_infos.append(info)
+            slide_arrays.append(data)
+        # 存在しないファイルは無視される
+        if s == 1:
+            slide_infos.append({"audio_path": str(tmp_path / "missing.wav")})
+        infos.append(slide_infos)
+        arrays.append(slide_arrays)
+    return infos, arrays
+
+
+@pytest.mark.parametrize("transition_type,line_gap", [("crossfade", 0.2), ("slide", 0.35), ("none", 0.1)])
+def test_matches_legacy_moviepy_narration(slides, transition_type, line_gap):
+    infos, arrays = slides
+    timeline = NarrationTimeline(line_gap=line_gap)
+    lines = [timeline.slide_lines(slide_infos) for slide_infos in infos]
+    durations = [timeline.slide_duration(slide_lines) for slide_lines in lines]
+    starts, _ = slide_starts(durations, transition_type, 0.4)
+    narration = timeline.render(lines, starts)
+
+    expected, legacy_starts = legacy_narration(arrays, line_gap, transition_type, 0.4)
+    assert starts == pytest.approx(legacy_starts, abs=1 / SAMPLE_RATE)
+    assert abs(len(narration) - len(expected)) <= 2
+    n = min(len(narration), len(expected))
+    # フェードのゲインの刻み（1サンプル分）以外は一致する
+    np.testing.assert_allclose(narration[:n], expected[:n], atol=2e-3)
+
+
+def test_slide_durations_include_gaps_and_tail(slides):
+    infos, _ = slides
+    timeline = NarrationTimeline(line_gap=0.25)
+    lines = timeline.slide_lines(infos[0])
+    assert timeline.slide_duration(lines) == pytest.approx(1.3 + 0.8 + 2.1 + 2 * 0.25 + SLIDE_TAIL, abs=1e-4)
+    assert timeline.slide_duration([]) == SILENT_SLIDE_DURATION
+    assert len(timeline.slide_lines(infos[1])) == 1
+
+
+def test_transition_overlap_is_capped_by_slide_length():
+    assert transition_overlap("crossfade", 0.4, 3.0, 3.0) == 0.4
+    assert transition_overlap("crossfade", 0.4, 3.0, 0.6) == pytest.approx(0.3)
+    assert transition_overlap("zoom", 0.4, 1.0, 3.0) == pytest.approx(0.3)
+    assert transition_overlap("none", 0.4, 3.0, 3.0) == 0.0
+    # 不明な転場は crossfade と同じ扱い
+    assert transition_overlap("wipe", 0.4, 0.6, 3.0) == pytest.approx(0.3)
+    starts, overlaps = slide_starts([2.0, 1.0, 2.0], "crossfade", 0.4)
+    assert overlaps == [0.4, 0.4]
+    assert starts == pytest.approx([0.0, 1.6, 2.2])
@@ -0,0 +1,110 @@
+"""
+PDFの変換（ページごとの DPI・出力サイズへの縮小）のテスト
+
+pdf2image（poppler）と PyMuPDF は差し替え、DPI の決め方と縮小の計算だけを確認する
+"""
+import importlib
+import sys
+import types
+
+import pytest
+from PIL import Image
+
+
+class FakeDocument:
+    def __init__(self, sizes_pts):
+        self.pages = [
+            types.SimpleNamespace(rect=types.SimpleNamespace(width=width, height=height))
+            for width, height in sizes_pts
+        ]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(self.pages)
+
+
+@pytest.fixture
+def pdf(monkeypatch):
+    """ページサイズ（pt）を設定できる偽のPDFと、convert_from_path の呼び出し記録"""
+    state = types.SimpleNamespace(sizes=[], calls=[], error=None)
+
+    def open_pdf(path):
+        if state.error:
+            raise state.error
+        return FakeDocument(state.sizes)
+
+    def convert_from_path(path, dpi, first_page=None, last_page=None):
+        state.calls.append((dpi, first_page, last_page))
+        first = (first_page or 1) - 1
+        last = last_page or len(state.sizes)
+        return [
+            Image.new("RGB", (round(width / 72 * dpi), round(height / 72 * dpi)), "white")
+            for width, height in state.sizes[first:last]
+        ]
+
+    monkeypatch.setitem(sys.modules, "fitz", types.SimpleNamespace(open=open_pdf))
+    monkeypatch.setitem(sys.modules, "pdf2image", types.SimpleNamespace(convert_from_path=convert_from_path))
+    monkeypatch.delitem(sys.modules, "pdf_converter", raising=False)
+    state.module = importlib.import_module("pdf_converter")
+    return state
+
+
+LANDSCAPE = (720, 405)  # 16:9（10 x 5.625 インチ）
+A4_PORTRAIT = (595, 842)
+
+
+def test_dpi_fits_page_to_output_with_supersampling(pdf, tmp_path):
+    converter = pdf.module.PDFConverter(tmp_path, resolution="1080p")
+    # 1920 / 10インチ = 192DPI → ×1.5
+    assert converter._page_dpi((10, 5.625)) == 288
+    assert pdf.module.PDFConverter(tmp_path, resolution="720p")._page_dpi((10, 5.625)) == 192
+    # 縦長のページは高さで決まる
+    assert converter._page_dpi((595 / 72, 842 / 72)) == round(1080 / (842 / 72) * 1.5)
+    # 小さいページでも300DPIを超えない
+    assert converter._page_dpi((2, 1)) == 300
+    assert pdf.module.PDFConverter(tmp_path, resolution="original")._page_dpi((10, 5.625)) == 300
+
+
+def test_mixed_pages_are_rasterized_per_page(pdf, tmp_path):
+    pdf.sizes = [LANDSCAPE, LANDSCAPE, A4_PORTRAIT, LANDSCAPE]
+    converter = pdf.module.PDFConverter(tmp_path / "slides", resolution="1080p")
+    paths = converter.convert_pdf_to_images("deck.pdf")
+
+    portrait_dpi = converter._page_dpi((595 / 72, 842 / 72))
+    # 同じ DPI の連続したページはまとめて変換する
+    assert pdf.calls == [(288, 1, 2), (portrait_dpi, 3, 3), (288, 4, 4)]
+    assert len(paths) == 4
+    for path in paths:
+        with Image.open(path) as image:
+            assert image.width <= 1920 and image.height <= 1080
+            assert image.width % 2 == 0 and image.height % 2 == 0
+    with Image.open(paths[2]) as image:
+        assert image.height == 1080
+
+
+def test_falls_back_to_original_dpi_without_page_sizes(pdf, tmp_path):
+    pdf.sizes = [LANDSCAPE]
+    pdf.error = RuntimeError("broken")
+    converter = pdf.module.PDFConverter(tmp_path, resolution="1080p")
+    assert converter._rasterize_runs("deck.pdf") == [(300, None, None)]
+    converter.convert_pdf_to_images("deck.pdf")
+    assert pdf.calls == [(300, None, None)]
+
+
+def test_explicit_dpi_converts_all_pages_at_once(pdf, tmp_path):
+    pdf.sizes = [LANDSCAPE, A4_PORTRAIT]
+    pdf.module.PDFConverter(tmp_path, resolution="1080p").convert_pdf_to_images("deck.pdf", dpi=100)
+    assert pdf.calls == [(100, None, None)]
+
+
+def test_fit_downscales_once_and_pads_to_even(pdf, tmp_path):
+    converter = pdf.module.PDFConverter(tmp_path, resolution="720p")
+    assert converter._fit(Image.new("RGB", (2880, 1620))).size == (1280, 720)
+    # 出力より小さい画像は拡大しない（奇数サイズは1px埋める）
+    assert converter._fit(Image.new("RGB", (801, 451))).size == (802, 452)
+    assert pdf.module.PDFConverter(tmp_path, resolution="original")._fit(Image.new("RGB", (3001, 1687))).size == (3002, 1688)
@@ -0,0 +1,87 @@
+"""
+レンダリングの同時実行数を制限する PriorityGate の順序のテスト
+"""
+import threading
+import time
+
+from api.core.async_worker import PriorityGate
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "待機がタイムアウトしました"
+        time.sleep(0.005)
+
+
+def _start_waiter(gate, priority, name, order, release):
+    def run():
+        with gate.slot(priority):
+            order.append(name)
+            release.wait(5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_waiters_run_by_priority_then_arrival():
+    gate = PriorityGate(max_concurrent=1)
+    order = []
+    release = threading.Event()
+    release.set()
+    blocker = threading.Event()
+
+    def hold():
+        with gate.slot(1):
+            blocker.wait(5)
+
+    holder = threading.Thread(target=hold, daemon=True)
+    holder.start()
+    _wait_until(lambda: gate.snapshot()["running"] == 1)
+
+    threads = []
+    for i, (priority, name) in enumerate([(2, "archival-1"), (1, "standard-1"), (0, "preview"), (1, "standard-2"), (2, "archival-2")]):
+        threads.append(_start_waiter(gate, priority, name, order, release))
+        # 到着順を確定させるため、待ち行列に入るまで待つ
+        _wait_until(lambda: gate.snapshot()["waiting"] == i + 1)
+
+    blocker.set()
+    for thread in [holder] + threads:
+        thread.join(5)
+
+    assert order == ["preview", "standard-1", "standard-2", "archival-1", "archival-2"]
+    assert gate.snapshot() == {"running": 0, "waiting": 0, "max_concurrent": 1}
+
+
+def test_reserved_slot_lets_preview_skip_full_queue():
+    gate = PriorityGate(max_concurrent=1, reserved=1)
+    order = []
+    release = threading.Event()
+
+    standard = _start_waiter(gate, 1, "standard", order, release)
+    _wait_until(lambda: order == ["standard"])
+    queued = _start_waiter(gate, 1, "queued", order, release)
+    _wait_until(lambda: gate.snapshot()["waiting"] == 1)
+
+    # 通常の枠が埋まっていても、優先度 0 は予備枠で待たずに実行される
+    preview = _start_waiter(gate, 0, "preview", order, release)
+    _wait_until(lambda: order == ["standard", "preview"])
+    assert gate.snapshot()["running"] == 2
+
+    release.set()
+    for thread in (standard, queued, preview):
+        thread.join(5)
+    assert order == ["standard", "preview", "queued"]
+
+
+def test_slot_is_released_on_error():
+    gate = PriorityGate(max_concurrent=1)
+    try:
+        with gate.slot():
+            raise RuntimeError("render failed")
+    except RuntimeError:
+        pass
+    assert gate.snapshot()["running"] == 0
+    with gate.slot():
+        assert gate.snapshot()["running"] == 1
@@ -0,0 +1,50 @@
+"""
+エンコード済み区間のキャッシュ（キー・画像のハッシュ・保存）のテスト
+"""
+from api.core.segment_cache import SegmentCache
+from ffmpeg_video_creator import FFmpegVideoCreator
+
+
+def _write(path, size, fill=b"x"):
+    path.write_bytes(fill * size)
+    return path
+
+
+class TestSegmentCache:
+    SEGMENT = {"kind": "slide", "images": ["h1"], "frames": 48, "size": [640, 360], "fps": 24}
+
+    def test_key_depends_on_segment_inputs(self):
+        base = SegmentCache.make_key(self.SEGMENT)
+        assert SegmentCache.make_key(dict(self.SEGMENT)) == base
+        assert SegmentCache.make_key({**self.SEGMENT, "frames": 49}) != base
+        assert SegmentCache.make_key({**self.SEGMENT, "images": ["h2"]}) != base
+
+    def test_image_hash_follows_content(self, tmp_path):
+        cache = SegmentCache(tmp_path / "segments", max_bytes=1024 * 1024)
+        image = _write(tmp_path / "slide_001.png", 10, b"a")
+        first = cache.image_hash(str(image))
+        assert cache.image_hash(str(image)) == first
+        _write(image, 12, b"b")
+        assert cache.image_hash(str(image)) != first
+
+    def test_stores_segments(self, tmp_path):
+        cache = SegmentCache(tmp_path / "segments", max_bytes=1024 * 1024)
+        key = SegmentCache.make_key(self.SEGMENT)
+        cache.put(key, _write(tmp_path / "segment.mp4", 10))
+        assert cache._entry_path(key).suffix == ".mp4"
+        assert cache.get(key, tmp_path / "copy.mp4")
+
+    def test_signature_ignores_position_outside_final_fade(self, tmp_path):
+        cache = SegmentCache(tmp_path / "segments", max_bytes=1024 * 1024)
+        creator = FFmpegVideoCreator(segment_cache=cache, still_fps=0)
+        image = str(_write(tmp_path / "slide.png", 10))
+        segment = {"kind": "slide", "images": [image], "frames": 48}
+
+        def signature(start_frame):
+            return creator.segment_signature({**segment, "start_frame": start_frame}, 640, 360, 24, 1000)
+
+        # 同じスライドは動画内の位置が違っても同じキーになる
+        assert SegmentCache.make_key(signature(0)) == SegmentCache.make_key(signature(500))
+        # 最後のフェードアウトに掛かる区間はフェードとの距離で区別する
+        assert signature(940)["fade"] == [976 - 940, 1.0]
+        assert SegmentCache.make_key(signature(940)) != SegmentCache.make_key(signature(930))
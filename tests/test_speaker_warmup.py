@@ -0,0 +1,91 @@
+"""
+スタイルのウォームアップ状態（エンジン × スタイルごと）のテスト
+"""
+import threading
+
+import pytest
+
+import api.core.speaker_warmup as warmup
+from api.core.speaker_warmup import STATE_FAILED, STATE_WARM, SpeakerWarmup
+
+
+class StubClient:
+    def __init__(self, initialized=(), fail=False, gate=None):
+        self.initialized = set(initialized)
+        self.fail = fail
+        self.gate = gate
+        self.initialize_calls = []
+
+    def is_initialized_speaker(self, style_id):
+        return style_id in self.initialized
+
+    def initialize_speaker(self, style_id):
+        self.initialize_calls.append(style_id)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("engine down")
+        self.initialized.add(style_id)
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    clients = {}
+    monkeypatch.setattr(warmup, "get_client", lambda url: clients[url])
+    return clients
+
+
+def test_warm_up_initializes_each_style_on_every_engine(clients):
+    clients["http://a"] = StubClient(initialized={1})
+    clients["http://b"] = StubClient()
+    state = SpeakerWarmup()
+    assert state.warm_up([1, 3, 1], ["http://a/", "http://b"]) == {1: True, 3: True}
+    # 読み込み済みのスタイルは初期化しない
+    assert clients["http://a"].initialize_calls == [3]
+    assert clients["http://b"].initialize_calls == [1, 3]
+    assert state.is_warm(3, "http://b")
+    info = state.snapshot()["http://a"]["1"]
+    assert info["state"] == STATE_WARM
+    assert info["seconds"] == 0.0
+
+
+def test_failure_on_one_engine_fails_the_style(clients):
+    clients["http://a"] = StubClient()
+    clients["http://b"] = StubClient(fail=True)
+    state = SpeakerWarmup()
+    assert state.warm_up([2], ["http://a", "http://b"]) == {2: False}
+    assert state.is_warm(2, "http://a")
+    assert not state.is_warm(2, "http://b")
+    failed = state.snapshot()["http://b"]["2"]
+    assert failed["state"] == STATE_FAILED
+    assert failed["error"] == "engine down"
+
+
+def test_concurrent_warm_up_initializes_once(clients):
+    gate = threading.Event()
+    clients["http://a"] = StubClient(gate=gate)
+    state = SpeakerWarmup()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(state.warm_up([5], ["http://a"])))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    while not clients["http://a"].initialize_calls:
+        threading.Event().wait(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert clients["http://a"].initialize_calls == [5]
+    assert results == [{5: True}] * 3
+
+
+def test_state_is_rechecked_after_engine_restart(clients):
+    clients["http://a"] = StubClient()
+    state = SpeakerWarmup()
+    state.warm_up([1], ["http://a"])
+    # エンジンの再起動で読み込み状態が消えると、次のウォームアップで再度初期化する
+    clients["http://a"].initialized.clear()
+    state.warm_up([1], ["http://a"])
+    assert clients["http://a"].initialize_calls == [1, 1]
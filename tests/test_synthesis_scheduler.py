@@ -0,0 +1,74 @@
+"""
+合成順序のスケジューラ（スタイルごとのまとめ・同時実行数の制限）のテスト
+"""
+import pytest
+
+from api.core.synthesis_scheduler import (
+    SCHEDULE_GROUPED,
+    SCHEDULE_INTERLEAVED,
+    SynthesisScheduler,
+    get_schedule,
+)
+
+
+def _tasks(*speakers):
+    return [{"index": i, "speaker_id": speaker} for i, speaker in enumerate(speakers)]
+
+
+def _drain(scheduler):
+    """1件ずつ完了させながら投入順を記録する"""
+    order = []
+    pending = scheduler.next_tasks()
+    while pending:
+        task = pending.pop(0)
+        order.append(task["index"])
+        scheduler.task_done(task)
+        pending.extend(scheduler.next_tasks())
+    return order
+
+
+def test_interleaved_keeps_dialogue_order():
+    scheduler = SynthesisScheduler(_tasks(1, 2, 1, 2, 3), max_in_flight=2, schedule=SCHEDULE_INTERLEAVED)
+    assert _drain(scheduler) == [0, 1, 2, 3, 4]
+
+
+def test_grouped_submits_styles_in_first_appearance_order():
+    scheduler = SynthesisScheduler(_tasks(2, 1, 2, 1, 3, 2), max_in_flight=1, schedule=SCHEDULE_GROUPED)
+    assert _drain(scheduler) == [0, 2, 5, 1, 3, 4]
+
+
+def test_max_in_flight_is_respected():
+    scheduler = SynthesisScheduler(_tasks(1, 1, 1, 2, 2), max_in_flight=3)
+    first = scheduler.next_tasks()
+    assert [task["index"] for task in first] == [0, 1, 2]
+    assert scheduler.next_tasks() == []
+    scheduler.task_done(first[0])
+    assert [task["index"] for task in scheduler.next_tasks()] == [3]
+
+
+def test_per_style_limit_fills_slots_with_next_style():
+    scheduler = SynthesisScheduler(_tasks(1, 1, 1, 2, 2, 3), max_in_flight=4, per_style_concurrency=2)
+    first = scheduler.next_tasks()
+    assert [(task["index"], task["speaker_id"]) for task in first] == [(0, 1), (1, 1), (3, 2), (4, 2)]
+    # speaker 1 のスロットが空くと speaker 1 の残りが先に投入される
+    scheduler.task_done(first[0])
+    assert [task["index"] for task in scheduler.next_tasks()] == [2]
+    scheduler.task_done(first[2])
+    assert [task["index"] for task in scheduler.next_tasks()] == [5]
+
+
+def test_per_style_limit_is_ignored_when_interleaved():
+    scheduler = SynthesisScheduler(
+        _tasks(1, 1, 1), max_in_flight=3, schedule=SCHEDULE_INTERLEAVED, per_style_concurrency=1
+    )
+    assert len(scheduler.next_tasks()) == 3
+
+
+def test_get_schedule(monkeypatch):
+    monkeypatch.delenv("VOICEVOX_SCHEDULE", raising=False)
+    assert get_schedule() == SCHEDULE_GROUPED
+    monkeypatch.setenv("VOICEVOX_SCHEDULE", "Interleaved")
+    assert get_schedule() == SCHEDULE_INTERLEAVED
+    assert get_schedule("grouped") == SCHEDULE_GROUPED
+    with pytest.raises(ValueError):
+        get_schedule("random")
@@ -0,0 +1,85 @@
+"""
+合成キャッシュ・音声クエリキャッシュのキーとLRUによる追い出しのテスト
+"""
+import os
+
+from api.core.tts_cache import AudioQueryCache, TTSCache, _FileCopyCache
+
+
+def _write(path, size, fill=b"x"):
+    path.write_bytes(fill * size)
+    return path
+
+
+class TestTTSCacheKey:
+    def test_normalized_text_gives_same_key(self):
+        params = {"speedScale": 1.0}
+        # NFKC正規化（全角英数字）と空白の畳み込み
+        assert TTSCache.make_key("ＡＢＣ  です ", 1, "0.14.0", params) == TTSCache.make_key("ABC です", 1, "0.14.0", params)
+
+    def test_key_depends_on_speaker_version_params_and_extra(self):
+        base = TTSCache.make_key("こんにちは", 1, "0.14.0", {"speedScale": 1.0})
+        assert TTSCache.make_key("こんにちは", 2, "0.14.0", {"speedScale": 1.0}) != base
+        assert TTSCache.make_key("こんにちは", 1, "0.15.0", {"speedScale": 1.0}) != base
+        assert TTSCache.make_key("こんにちは", 1, "0.14.0", {"speedScale": 1.1}) != base
+        assert TTSCache.make_key("こんにちは", 1, "0.14.0", {"speedScale": 1.0}, extra={"processing": "2"}) != base
+
+    def test_param_order_does_not_change_key(self):
+        assert TTSCache.make_key("a", 1, "v", {"x": 1, "y": 2}) == TTSCache.make_key("a", 1, "v", {"y": 2, "x": 1})
+
+
+class TestFileCopyCache:
+    def test_put_and_get_round_trip(self, tmp_path):
+        cache = TTSCache(tmp_path / "tts", max_bytes=1024 * 1024)
+        src = _write(tmp_path / "line.wav", 10, b"a")
+        cache.put("ab" + "0" * 62, src)
+        # 登録後に元ファイルを変更してもキャッシュは変わらない
+        _write(src, 10, b"b")
+
+        dest = tmp_path / "out.wav"
+        assert cache.get("ab" + "0" * 62, dest)
+        assert dest.read_bytes() == b"a" * 10
+        assert not cache.get("cd" + "0" * 62, tmp_path / "miss.wav")
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = _FileCopyCache(tmp_path / "cache", max_bytes=250)
+        keys = {name: name * 32 for name in ("aa", "bb", "cc")}
+        cache.put(keys["aa"], _write(tmp_path / "a", 100))
+        cache.put(keys["bb"], _write(tmp_path / "b", 100))
+        # aa を bb より古くしてから読み出し、最近使ったものにする
+        os.utime(cache._entry_path(keys["aa"]), (1000, 1000))
+        os.utime(cache._entry_path(keys["bb"]), (2000, 2000))
+        assert cache.get(keys["aa"], tmp_path / "a_out")
+
+        cache.put(keys["cc"], _write(tmp_path / "c", 100))
+
+        assert cache.contains(keys["aa"])
+        assert not cache.contains(keys["bb"])
+        assert cache.contains(keys["cc"])
+        assert cache._total_bytes == 200
+
+
+class TestAudioQueryCache:
+    def test_returns_copies(self, tmp_path):
+        cache = AudioQueryCache(tmp_path / "aq", max_bytes=1024 * 1024)
+        cache.put("テキスト", 3, "v", {"speedScale": 1.0, "accent_phrases": []})
+        query = cache.get("テキスト", 3, "v")
+        query["speedScale"] = 2.0
+        assert cache.get("テキスト", 3, "v")["speedScale"] == 1.0
+        assert cache.get("テキスト", 4, "v") is None
+
+    def test_reads_back_from_disk(self, tmp_path):
+        AudioQueryCache(tmp_path / "aq", max_bytes=1024 * 1024).put("文", 1, "v", {"k": 1})
+        assert AudioQueryCache(tmp_path / "aq", max_bytes=1024 * 1024).get("文", 1, "v") == {"k": 1}
+
+    def test_memory_is_bounded_lru(self, tmp_path):
+        cache = AudioQueryCache(tmp_path / "aq", max_bytes=1024 * 1024, max_memory_entries=2)
+        cache.put("一", 1, "v", {"k": 1})
+        cache.put("二", 1, "v", {"k": 2})
+        cache.get("一", 1, "v")
+        cache.put("三", 1, "v", {"k": 3})
+        keys = [cache.make_key(text, 1, "v") for text in ("一", "二", "三")]
+        assert list(cache._memory) == [keys[0], keys[2]]
+        # メモリから追い出されてもディスクから読み戻せる
+        assert cache.get("二", 1, "v") == {"k": 2}
+        assert len(cache._memory) == 2
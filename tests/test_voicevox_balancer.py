@@ -0,0 +1,218 @@
+"""
+VOICEVOXロードバランサの振り分け・解放・ヘルスチェックのテスト
+"""
+import asyncio
+import logging
+import threading
+
+import pytest
+import requests
+
+import voicevox_client
+from voicevox_client import AsyncVoicevoxBalancer, VoicevoxBalancer, VoicevoxError
+
+
+class StubEngine:
+    """呼び出しごとに決められた結果を返す（例外は送出）エンジン"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def synthesis(self, *args, **kwargs):
+        return self._next()
+
+    def version(self, timeout=None):
+        return self._next()
+
+    def initialize_speaker(self, speaker, skip_reinit=True, timeout=None):
+        result = self._next()
+        self.initialized = getattr(self, "initialized", set()) | {speaker}
+        return result
+
+    def is_initialized_speaker(self, speaker, timeout=None):
+        return speaker in getattr(self, "initialized", set())
+
+    def close(self):
+        pass
+
+
+def _balancer(*engines, limit=1):
+    balancer = VoicevoxBalancer(
+        [f"http://engine{i}" for i in range(len(engines))],
+        max_concurrency_per_engine=limit,
+        backoff_factor=0,
+        health_check_interval=3600,
+    )
+    for engine, stub in zip(balancer.engines, engines):
+        engine.client = stub
+    return balancer
+
+
+def _run_with_timeout(func, timeout=5.0):
+    """デッドロックした場合にテストが止まらないよう、別スレッドで実行して待つ"""
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func()
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "呼び出しが完了しませんでした（枠が解放されていない）"
+    return result
+
+
+class TestBalancer:
+    def test_unexpected_exception_releases_engine(self):
+        balancer = _balancer(StubEngine(RuntimeError("boom")), StubEngine(RuntimeError("boom")))
+        for _ in range(3):
+            result = _run_with_timeout(lambda: balancer.synthesis({}, 1))
+            assert isinstance(result["error"], RuntimeError)
+        assert [engine.outstanding for engine in balancer.engines] == [0, 0]
+
+    def test_timeout_fails_over_to_another_engine(self):
+        failing = StubEngine(VoicevoxError("タイムアウト"))
+        healthy = StubEngine(b"wav")
+        balancer = _balancer(failing, healthy)
+        # 1回目は engine0 に送られ、失敗したら engine1 でリトライする
+        assert _run_with_timeout(lambda: balancer.synthesis({}, 1))["value"] == b"wav"
+        assert balancer.engines[0].consecutive_failures == 1
+        assert [engine.outstanding for engine in balancer.engines] == [0, 0]
+
+    def test_client_error_is_not_counted_as_failure(self):
+        stub = StubEngine(VoicevoxError("bad request", status_code=422))
+        balancer = _balancer(stub, StubEngine(b"wav"))
+        with pytest.raises(VoicevoxError):
+            balancer.synthesis({}, 1)
+        assert stub.calls == 1
+        assert balancer.engines[0].consecutive_failures == 0
+        assert balancer.engines[0].outstanding == 0
+
+    def test_engine_is_ejected_after_repeated_failures(self):
+        balancer = _balancer(StubEngine(VoicevoxError("503", status_code=503)), StubEngine(b"wav"))
+        balancer.eject_after_failures = 2
+        for _ in range(2):
+            balancer.synthesis({}, 1)
+        # engine1 のほうが処理数が少なくても、除外された engine0 には送られない
+        assert not balancer.engines[0].healthy
+        calls = balancer.engines[0].client.calls
+        balancer.synthesis({}, 1)
+        assert balancer.engines[0].client.calls == calls
+
+    def test_health_check_survives_exceptions_and_readmits(self):
+        flaky = StubEngine(requests.ReadTimeout("slow"), "0.14.0")
+        balancer = _balancer(flaky, StubEngine("0.14.0"))
+        balancer.check_health()
+        assert not balancer.engines[0].healthy
+        balancer.check_health()
+        assert balancer.engines[0].healthy
+
+    def test_health_loop_keeps_running(self, monkeypatch, caplog):
+        balancer = _balancer(StubEngine("0.14.0"))
+        balancer.health_check_interval = 0.01
+        passes = []
+
+        def check_health():
+            passes.append(1)
+            if len(passes) == 1:
+                raise RuntimeError("unexpected")
+            if len(passes) >= 3:
+                balancer._closed.set()
+
+        monkeypatch.setattr(balancer, "check_health", check_health)
+        with caplog.at_level(logging.ERROR, logger="voicevox_client"):
+            _run_with_timeout(balancer._health_check_loop)
+        assert len(passes) >= 3
+        assert "ヘルスチェックエラー: unexpected" in caplog.text
+
+    def test_initialize_speaker_fans_out_to_every_engine(self):
+        engines = [StubEngine(None), StubEngine(None), StubEngine(None)]
+        balancer = _balancer(*engines)
+        assert not balancer.is_initialized_speaker(3)
+        balancer.initialize_speaker(3)
+        assert [engine.calls for engine in engines] == [1, 1, 1]
+        assert balancer.is_initialized_speaker(3)
+        assert [engine.outstanding for engine in balancer.engines] == [0, 0, 0]
+
+    def test_initialize_speaker_continues_past_a_failing_engine(self):
+        failing = StubEngine(VoicevoxError("503", status_code=503))
+        healthy = StubEngine(None)
+        balancer = _balancer(failing, healthy)
+        with pytest.raises(VoicevoxError):
+            balancer.initialize_speaker(2)
+        assert healthy.is_initialized_speaker(2)
+        assert not balancer.is_initialized_speaker(2)
+
+
+class StubAsyncEngine:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def speakers(self, timeout=None):
+        self.calls += 1
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return self.result
+
+    async def initialize_speaker(self, speaker, skip_reinit=True, timeout=None):
+        self.calls += 1
+        if isinstance(self.result, BaseException):
+            raise self.result
+        self.initialized = getattr(self, "initialized", set()) | {speaker}
+
+    async def is_initialized_speaker(self, speaker, timeout=None):
+        return speaker in getattr(self, "initialized", set())
+
+    async def aclose(self):
+        pass
+
+
+def test_async_balancer_shares_state_and_fails_over(monkeypatch):
+    monkeypatch.setattr(voicevox_client, "AsyncVoicevoxClient", lambda url, **kwargs: None)
+    balancer = _balancer(StubEngine("0.14.0"), StubEngine("0.14.0"))
+    async_balancer = AsyncVoicevoxBalancer(balancer)
+    async_balancer.clients = {
+        "http://engine0": StubAsyncEngine(VoicevoxError("503", status_code=503)),
+        "http://engine1": StubAsyncEngine([{"name": "speaker"}]),
+    }
+
+    assert asyncio.run(async_balancer.speakers()) == [{"name": "speaker"}]
+    assert balancer.engines[0].consecutive_failures == 1
+    assert [engine.outstanding for engine in balancer.engines] == [0, 0]
+
+
+def test_async_initialize_speaker_fans_out(monkeypatch):
+    monkeypatch.setattr(voicevox_client, "AsyncVoicevoxClient", lambda url, **kwargs: None)
+    async_balancer = AsyncVoicevoxBalancer(_balancer(StubEngine("0.14.0"), StubEngine("0.14.0")))
+    async_balancer.clients = {"http://engine0": StubAsyncEngine(None), "http://engine1": StubAsyncEngine(None)}
+
+    async def run():
+        assert not await async_balancer.is_initialized_speaker(1)
+        await async_balancer.initialize_speaker(1)
+        return await async_balancer.is_initialized_speaker(1)
+
+    assert asyncio.run(run())
+    assert [client.calls for client in async_balancer.clients.values()] == [1, 1]
+
+    async_balancer.clients["http://engine1"] = StubAsyncEngine(VoicevoxError("503", status_code=503))
+    with pytest.raises(VoicevoxError):
+        asyncio.run(async_balancer.initialize_speaker(2))
+    assert asyncio.run(async_balancer.clients["http://engine0"].is_initialized_speaker(2))
+
+
+def test_async_client_is_balanced_for_multiple_engines():
+    client = voicevox_client.get_async_client("http://engine-a:50021,http://engine-b:50021")
+    assert isinstance(client, AsyncVoicevoxBalancer)
+    assert client.balancer.engine_urls == ["http://engine-a:50021", "http://engine-b:50021"]
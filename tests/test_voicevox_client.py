@@ -0,0 +1,51 @@
+"""
+VOICEVOXクライアントのエラー処理（タイムアウトのリトライと例外の包み直し）のテスト
+"""
+import pytest
+import requests
+
+from voicevox_client import VoicevoxClient, VoicevoxError
+
+
+def _response(status_code, content=b'"0.14.0"'):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+class TestClientErrors:
+    def test_read_timeout_is_retried_and_wrapped(self, monkeypatch):
+        client = VoicevoxClient("http://engine", max_retries=1, backoff_factor=0)
+        calls = []
+
+        def request(*args, **kwargs):
+            calls.append(1)
+            raise requests.ReadTimeout("slow synthesis")
+
+        monkeypatch.setattr(client.session, "request", request)
+        with pytest.raises(VoicevoxError) as excinfo:
+            client.version()
+        assert len(calls) == 2
+        assert excinfo.value.status_code is None
+
+    def test_other_request_errors_are_wrapped_without_retry(self, monkeypatch):
+        client = VoicevoxClient("http://engine", max_retries=3, backoff_factor=0)
+        calls = []
+
+        def request(*args, **kwargs):
+            calls.append(1)
+            raise requests.exceptions.InvalidURL("bad url")
+
+        monkeypatch.setattr(client.session, "request", request)
+        with pytest.raises(VoicevoxError):
+            client.version()
+        assert len(calls) == 1
+
+    def test_client_error_status_is_not_retried(self, monkeypatch):
+        client = VoicevoxClient("http://engine", max_retries=3, backoff_factor=0)
+        responses = [_response(422)]
+        monkeypatch.setattr(client.session, "request", lambda *a, **k: responses.pop(0))
+        with pytest.raises(VoicevoxError) as excinfo:
+            client.version()
+        assert excinfo.value.status_code == 422